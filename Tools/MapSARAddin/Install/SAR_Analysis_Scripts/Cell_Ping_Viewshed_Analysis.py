@@ -30,6 +30,13 @@ import time
 from arcpy import env
 from arcpy.sa import *
 
+# NumPy viewshed engine, if it can't be loaded the Spatial Analyst Viewshed tool is used
+try:
+    import viewshed_engine
+except ImportError:
+    viewshed_engine = None
+import ping_pool
+
 # Set enviroment, frames and layers
 arcpy.env.workspace
 arcpy.env.scratchGDB
@@ -40,6 +47,21 @@ arcpy.env.overwriteOutput = True
 
 templatePath = '{0}\{1}'.format(os.getcwd(),'Layer_Templates')
 
+# Calculate tower viewsheds with the NumPy engine instead of the Spatial Analyst Viewshed tool
+useViewshedEngine = viewshed_engine is not None
+
+# Number of worker processes for the tower viewsheds, 1 processes the pings one after another
+viewshedWorkers = 1
+
+# Build one raster of which pings see each cell instead of a viewshed feature
+# class per ping. Needs the NumPy viewshed engine
+cumulativeViewshed = False
+
+# Viewshed settings used for every tower
+zFactor = 1
+useEarthCurvature = "FLAT_EARTH"
+refractivityCoefficient = 0.13
+
 # Assure Scratch DB has been written to disk
 time.sleep(2)
 
@@ -307,13 +329,11 @@ def createTowerViewshed(clipped_raster,inAGL,working_cell_pings,featureView_Dict
     try:
         mxd, frame = getDataframe()
         CellLyr = arcpy.mapping.ListLayers(mxd,'*Scratch_Cell_Pings.lyr*',frame)[0]
-        # Set defaut variable values for viewshed
 
-        zFactor = 1
-        useEarthCurvature = "FLAT_EARTH"
-        refractivityCoefficient = 0.13
+        if viewshedWorkers > 1:
+            return(createTowerViewshedPool(clipped_raster,inAGL,working_cell_pings,featureView_Dict,zFactor,useEarthCurvature,refractivityCoefficient))
 
-        if arcpy.CheckOutExtension('Spatial'):
+        if useViewshedEngine or arcpy.CheckOutExtension('Spatial'):
             # Initialize counters and list for next section of processing
             featurelist = []
             iCount = 0
@@ -321,23 +341,49 @@ def createTowerViewshed(clipped_raster,inAGL,working_cell_pings,featureView_Dict
             # Loop through each feature in the FC
             pingField = arcpy.AddFieldDelimiters(CellLyr,"Ping_Number")
 
-            currPing = arcpy.SearchCursor(CellLyr)
+            if useViewshedEngine:
+                # Read the DEM once, every ping is calculated from the same array
+                dem, geotransform, nodata, demSR = viewshed_engine.readDEM(clipped_raster)
+                agl = None
+                if inAGL:
+                    agl = viewshed_engine.readAligned(inAGL, geotransform, dem.shape)
+                surface = viewshed_engine.surfaceArray(dem, zFactor, agl, nodata)
+
+                # Observer and target offsets are optional fields, same as Viewshed
+                pingFields = [f.name.upper() for f in arcpy.ListFields(CellLyr)]
+                shapeName = arcpy.Describe(CellLyr).shapeFieldName
+
+                # Return tower locations in the same coordinate system as the DEM
+                currPing = arcpy.SearchCursor(CellLyr, '', demSR)
+            else:
+                currPing = arcpy.SearchCursor(CellLyr)
+
             for cp in currPing:
                 current_ping = cp.getValue('Ping_Number')
                 arcpy.AddMessage('Processing Viewshed for Cell Ping {0}'.format(current_ping))
 
-                # Make a new selection for each record
-                cQuery = '{0} = {1}'.format(pingField,current_ping)
-                arcpy.SelectLayerByAttribute_management(CellLyr,'NEW_SELECTION',cQuery)
+                Raster_Viewshed_Ping ='{0}\Raster_Viewshed_Ping{1}'.format(scratchdb,current_ping)
 
-                # Create a raster viewshed for each cell pings
-                if inAGL:
-                    outViewshed = Viewshed(clipped_raster, CellLyr, zFactor, useEarthCurvature, refractivityCoefficient,inAGL)
+                if useViewshedEngine:
+                    point = cp.getValue(shapeName).firstPoint
+                    offsetA = cp.getValue('OFFSETA') if 'OFFSETA' in pingFields else None
+                    offsetB = cp.getValue('OFFSETB') if 'OFFSETB' in pingFields else None
+                    observer = (point.X, point.Y, offsetA, offsetB)
+
+                    visible = viewshed_engine.viewshed(None, geotransform, observer, zFactor, useEarthCurvature, refractivityCoefficient, surface=surface)
+                    viewshed_engine.writeVisibility(visible, geotransform, Raster_Viewshed_Ping, demSR)
                 else:
-                    outViewshed = Viewshed(clipped_raster, CellLyr, zFactor, useEarthCurvature, refractivityCoefficient)
+                    # Make a new selection for each record
+                    cQuery = '{0} = {1}'.format(pingField,current_ping)
+                    arcpy.SelectLayerByAttribute_management(CellLyr,'NEW_SELECTION',cQuery)
 
-                Raster_Viewshed_Ping ='{0}\Raster_Viewshed_Ping{1}'.format(scratchdb,current_ping)
-                outViewshed.save(Raster_Viewshed_Ping)
+                    # Create a raster viewshed for each cell pings
+                    if inAGL:
+                        outViewshed = Viewshed(clipped_raster, CellLyr, zFactor, useEarthCurvature, refractivityCoefficient,inAGL)
+                    else:
+                        outViewshed = Viewshed(clipped_raster, CellLyr, zFactor, useEarthCurvature, refractivityCoefficient)
+
+                    outViewshed.save(Raster_Viewshed_Ping)
 
                 # Turn each raster ping into a feature ping viewshed
                 Feature_Viewshed_Ping = '{0}\Feature_Viewshed_Ping{1}'.format(scratchdb,current_ping)
@@ -365,6 +411,82 @@ def createTowerViewshed(clipped_raster,inAGL,working_cell_pings,featureView_Dict
     except SystemExit as err:
             pass
 
+def createTowerViewshedPool(clipped_raster,inAGL,working_cell_pings,featureView_Dict,zFactor,useEarthCurvature,refractivityCoefficient):
+    """ Create the tower viewsheds in viewshedWorkers processes, each writing to its own scratch workspace """
+    try:
+        # Same ping order as the serial loop so the merged output matches
+        pings = [row[0] for row in arcpy.da.SearchCursor(str(working_cell_pings), ['Ping_Number'])]
+        tasks = [(p, featureView_Dict[p]) for p in pings]
+
+        arcpy.AddMessage('Processing {0} Cell Ping Viewsheds with {1} workers'.format(len(tasks),viewshedWorkers))
+        backend = ping_pool.ArcpyBackend(clipped_raster, working_cell_pings, zFactor, useEarthCurvature, refractivityCoefficient, inAGL)
+        results = ping_pool.runPings(backend, tasks, arcpy.env.scratchFolder, viewshedWorkers)
+
+        featurelist = [feature for ping, feature in results]
+        return(featurelist)
+
+    except SystemExit as err:
+            pass
+
+def createCumulativeViewshed(clipped_raster,inAGL,working_cell_pings,pingDict):
+    """ Build a single raster of which pings see each cell in one pass over all
+    towers, then polygonize it once. Each polygon gets the count and list of
+    pings that see it, Ping_Number, Date and Description are from the latest of those pings """
+    try:
+        dem, geotransform, nodata, demSR = viewshed_engine.readDEM(clipped_raster)
+        agl = None
+        if inAGL:
+            agl = viewshed_engine.readAligned(inAGL, geotransform, dem.shape)
+        surface = viewshed_engine.surfaceArray(dem, zFactor, agl, nodata)
+
+        # Observer and target offsets are optional fields, same as Viewshed
+        pingFields = [f.name.upper() for f in arcpy.ListFields(working_cell_pings)]
+        offsetFields = [f for f in ('OFFSETA','OFFSETB') if f in pingFields]
+
+        accumulator = viewshed_engine.VisibilityAccumulator(dem.shape)
+        with arcpy.da.SearchCursor(str(working_cell_pings), ['Ping_Number','SHAPE@XY'] + offsetFields, '', demSR) as rows:
+            for row in rows:
+                arcpy.AddMessage('Processing Viewshed for Cell Ping {0}'.format(row[0]))
+                offsets = dict(zip(offsetFields, row[2:]))
+                observer = (row[1][0], row[1][1], offsets.get('OFFSETA'), offsets.get('OFFSETB'))
+                visible = viewshed_engine.viewshed(None, geotransform, observer, zFactor, useEarthCurvature, refractivityCoefficient, surface=surface)
+                accumulator.add(row[0], visible)
+
+        # Raster value identifies the set of pings that see the cell, 0 = not visible
+        Raster_Cumulative_Viewshed = '{0}\Raster_Cumulative_Viewshed_{1}'.format(scratchdb,timestamp)
+        viewshed_engine.writeVisibility(accumulator.combination, geotransform, Raster_Cumulative_Viewshed, demSR)
+
+        arcpy.AddMessage('\nCreating Viewshed features for {0} combinations of pings\n'.format(len(accumulator.combinations)-1))
+        Feature_Cumulative_Viewshed = '{0}\Cumulative_Viewshed_FC{1}'.format(scratchdb,timestamp)
+        arcpy.RasterToPolygon_conversion(Raster_Cumulative_Viewshed,Feature_Cumulative_Viewshed, 'SIMPLIFY', 'Value')
+
+        # Remove non visable data
+        Feature_Cumulative_Viewshed = removeZeroRows(Feature_Cumulative_Viewshed)
+
+        pingsLength = max(len(','.join([str(p) for p in sorted(pingDict.keys())])), 50)
+        arcpy.AddField_management(Feature_Cumulative_Viewshed, 'Ping_Count', "SHORT", 0, "", "", "Ping Count", "NULLABLE", "NON_REQUIRED")
+        arcpy.AddField_management(Feature_Cumulative_Viewshed, 'Pings', "TEXT", 0, "", pingsLength, "Pings", "NULLABLE", "NON_REQUIRED")
+        arcpy.AddField_management(Feature_Cumulative_Viewshed, 'Ping_Number', "SHORT", 0, "", "", "Ping Number", "NULLABLE", "NON_REQUIRED")
+        arcpy.AddField_management(Feature_Cumulative_Viewshed, 'Date', "DATE", 0, "", "", "Date", "NULLABLE", "NON_REQUIRED")
+        arcpy.AddField_management(Feature_Cumulative_Viewshed, 'Description', "TEXT", 0, "", "250", "Description", "NULLABLE", "NON_REQUIRED")
+
+        fields = ['gridcode','Ping_Count','Pings','Ping_Number','Date','Description']
+        with arcpy.da.UpdateCursor(Feature_Cumulative_Viewshed, fields) as rows:
+            for row in rows:
+                pings = sorted(accumulator.combinations[row[0]])
+                latest = max(pings, key=lambda p: pingDict[p][0])
+                row[1] = len(pings)
+                row[2] = ','.join([str(p) for p in pings])
+                row[3] = latest
+                row[4] = pingDict[latest][0]
+                row[5] = pingDict[latest][1]
+                rows.updateRow(row)
+
+        return(Feature_Cumulative_Viewshed)
+
+    except SystemExit as err:
+            pass
+
 def mergeViewsheds(featurelist):
     """ Merge the viewsheds and add back the ping data """
     try:
@@ -525,15 +647,20 @@ def main():
     arcpy.AddMessage('Checking The DEM Rasters Extent and Spatial Reference\n')
     clipped_raster = checkSR(inRaster,clipped_raster)
 
-    # Add tower values to new FC for each ping
-    featureView_Dict = createPingData(working_cell_pings,buffered_area,pingDict)
+    if cumulativeViewshed and useViewshedEngine:
+        # One raster and one featureclass for all towers
+        arcpy.AddMessage('Creating Cumulative Viewshed For All Selected Towers\n')
+        dissolved_feature = createCumulativeViewshed(clipped_raster,inAGL,working_cell_pings,pingDict)
+    else:
+        # Add tower values to new FC for each ping
+        featureView_Dict = createPingData(working_cell_pings,buffered_area,pingDict)
 
-    # Create viewsheds from each tower
-    arcpy.AddMessage('Creating Viewsheds For Each Selected Tower\n')
-    featurelist = createTowerViewshed(clipped_raster,inAGL,working_cell_pings,featureView_Dict)
+        # Create viewsheds from each tower
+        arcpy.AddMessage('Creating Viewsheds For Each Selected Tower\n')
+        featurelist = createTowerViewshed(clipped_raster,inAGL,working_cell_pings,featureView_Dict)
 
-    # Create a merged featureclass containing viewsheds and their related data
-    dissolved_feature = mergeViewsheds(featurelist)
+        # Create a merged featureclass containing viewsheds and their related data
+        dissolved_feature = mergeViewsheds(featurelist)
 
     # Clip travel routes to viewshed and add layers to map
     if travel_route_1:
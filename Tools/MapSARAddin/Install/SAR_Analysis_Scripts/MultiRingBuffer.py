@@ -22,6 +22,11 @@ import sys
 import types
 import locale
 
+try:
+    import ring_engine
+except ImportError:
+    ring_engine = None
+
 gp = arcgisscripting.create(9.3)
 
 #Define message constants so they may be translated easily
@@ -85,6 +90,58 @@ def lowerLicenseUnion(gp, fcList):
     return unionFC
 
 
+def createPointRings(gp, input, output, distList, unit, fieldName):
+    # Build the dissolved rings of point input directly as annuli, without
+    #  the Buffer and Union tools. Returns False when the input can't use this
+    #  (not points, geographic coordinates, unknown unit) and the tools are used instead
+    if ring_engine is None:
+        return False
+    try:
+        import arcpy
+    except ImportError:
+        return False
+
+    desc = gp.Describe(input)
+    if desc.shapeType not in ("Point", "Multipoint"):
+        return False
+    if gp.OutputCoordinateSystem:
+        sr = gp.OutputCoordinateSystem
+    else:
+        sr = desc.spatialReference
+    if sr.type == "Geographic":
+        return False
+    factor = ring_engine.distanceFactor(unit, sr.metersPerUnit)
+    if factor is None:
+        return False
+
+    points = []
+    with arcpy.da.SearchCursor(input, ["SHAPE@XY"], "", sr, True) as rows:
+        for row in rows:
+            points.append(row[0])
+    if not points:
+        return False
+
+    # Rings come back sorted by distance, same order as the sorted distances
+    distances = sorted(set(distList))
+    gp.SetProgressorLabel(msgBuffRings + ", ".join([str(d) for d in distances]) + "...")
+    rings = ring_engine.dissolvedRings(points, [d * factor for d in distances],
+                                       lambda wkt: arcpy.FromWKT(wkt, sr))
+
+    gp.CreateFeatureclass_management(os.path.dirname(output), os.path.basename(output),
+                                     "POLYGON", "", "DISABLED", "DISABLED", sr)
+    gp.AddField_management(output, fieldName, "double")
+    with arcpy.da.InsertCursor(output, ["SHAPE@", fieldName]) as rows:
+        for dist, (ringDistance, ring) in zip(distances, rings):
+            rows.insertRow([ring, dist])
+
+    return True
+
+def setDefaultSymbology(gp):
+    params = gp.GetParameterInfo()
+    if len(params) > 0:
+        params[1].symbology = os.path.join(gp.GetInstallInfo()['InstallDir'],
+                                           "arctoolbox\\templates\\layers\\multipleringbuffer.lyr")
+
 def createMultiBuffers(gp, input, output, distances, unit, fieldName, dissolveOption, sideType):
     try:
         global scratchWks
@@ -102,6 +159,12 @@ def createMultiBuffers(gp, input, output, distances, unit, fieldName, dissolveOp
         # Convert the distances into a Python list for ease of use
         distList = convertValueTableToList(distances)
 
+        # Dissolved rings around points don't need a buffer per distance or
+        #  the Union, build them directly
+        if dissolveOption == "ALL" and createPointRings(gp, input, output, distList, unit, fieldName):
+            setDefaultSymbology(gp)
+            return
+
         # Loop through each distance creating a new layer and then buffering the input.
         #  Set the step progressor if there are > 1 rings
         if len(distList) > 1:
@@ -176,10 +239,7 @@ def createMultiBuffers(gp, input, output, distances, unit, fieldName, dissolveOp
                 gp.DeleteField_management(output, "buff_dist")
 
         # Set the default symbology
-        params = gp.GetParameterInfo()
-        if len(params) > 0:
-            params[1].symbology = os.path.join(gp.GetInstallInfo()['InstallDir'],
-                                               "arctoolbox\\templates\\layers\\multipleringbuffer.lyr")
+        setDefaultSymbology(gp)
 
     except arcgisscripting.ExecuteError:
         gp.AddError(gp.GetMessages(2))
@@ -0,0 +1,227 @@
+#-------------------------------------------------------------------------------
+# Name:        ping_pool
+# Purpose:     Run the per ping viewshed work of the cell ping analysis in a
+#              pool of worker processes
+#
+# Author:      SMSR
+# Copyright:   (c) SMSR 2013
+# Licence:
+#     MapSAR wilderness search and rescue GIS data model and related python scripting
+#     Copyright (C) 2012  - Jon Pedder & SMSR
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+#
+# Each ping goes through Viewshed, RasterToPolygon, removeZeroRows and
+# SpatialJoin. The pings don't depend on each other so they are handed out to
+# worker processes. Every worker writes to its own file geodatabase so two
+# workers never lock the same workspace, the joined features are returned in
+# the same order as the tasks and merged by mergeViewsheds.
+#
+# The geoprocessing is done by a backend object. ArcpyBackend runs the real
+# tools, StubBackend only sleeps so the pool can be timed without ArcGIS.
+# Run this file directly for the benchmark.
+
+import os, sys, time
+import multiprocessing
+
+try:
+    import viewshed_engine
+except ImportError:
+    viewshed_engine = None
+
+# Backend and workspace of the current worker process, set by initWorker
+_backend = None
+_workspace = None
+
+class ArcpyBackend(object):
+    """ Geoprocessing for a single ping using arcpy. All attributes are plain
+    values so the backend can be passed to the worker processes """
+    def __init__(self, inRaster, cellPings, zFactor=1, useEarthCurvature='FLAT_EARTH',
+                 refractivityCoefficient=0.13, inAGL=''):
+        self.inRaster = str(inRaster)
+        self.cellPings = str(cellPings)
+        self.zFactor = zFactor
+        self.useEarthCurvature = useEarthCurvature
+        self.refractivityCoefficient = refractivityCoefficient
+        self.inAGL = str(inAGL) if inAGL else ''
+        # DEM array for the viewshed engine, read once per worker
+        self._dem = None
+
+    def createWorkspace(self, folder, name):
+        """ Create the worker's file geodatabase and make it the current and scratch workspace """
+        import arcpy
+        workspace = arcpy.CreateFileGDB_management(folder, name).getOutput(0)
+        arcpy.env.workspace = workspace
+        arcpy.env.scratchWorkspace = workspace
+        arcpy.env.overwriteOutput = True
+        return(workspace)
+
+    def viewshed(self, pingNumber, outRaster):
+        """ Create the viewshed raster for a single ping """
+        import arcpy
+        pingField = arcpy.AddFieldDelimiters(self.cellPings, 'Ping_Number')
+        query = '{0} = {1}'.format(pingField, pingNumber)
+
+        if viewshed_engine is not None:
+            if self._dem is None:
+                dem, geotransform, nodata, demSR = viewshed_engine.readDEM(self.inRaster)
+                agl = None
+                if self.inAGL:
+                    agl = viewshed_engine.readAligned(self.inAGL, geotransform, dem.shape)
+                surface = viewshed_engine.surfaceArray(dem, self.zFactor, agl, nodata)
+                self._dem = (surface, geotransform, demSR)
+            surface, geotransform, demSR = self._dem
+
+            # Observer and target offsets are optional fields, same as Viewshed
+            pingFields = [f.name.upper() for f in arcpy.ListFields(self.cellPings)]
+            offsetFields = [f for f in ('OFFSETA', 'OFFSETB') if f in pingFields]
+            with arcpy.da.SearchCursor(self.cellPings, ['SHAPE@XY'] + offsetFields, query, demSR) as rows:
+                for row in rows:
+                    offsets = dict(zip(offsetFields, row[1:]))
+                    observer = (row[0][0], row[0][1], offsets.get('OFFSETA'), offsets.get('OFFSETB'))
+
+            visible = viewshed_engine.viewshed(None, geotransform, observer, self.zFactor, self.useEarthCurvature,
+                                               self.refractivityCoefficient, surface=surface)
+            viewshed_engine.writeVisibility(visible, geotransform, outRaster, demSR)
+        else:
+            from arcpy.sa import Viewshed
+            arcpy.CheckOutExtension('Spatial')
+            pingLayer = arcpy.MakeFeatureLayer_management(self.cellPings, 'Cell_Ping_{0}'.format(pingNumber), query)
+            if self.inAGL:
+                outViewshed = Viewshed(self.inRaster, pingLayer, self.zFactor, self.useEarthCurvature, self.refractivityCoefficient, self.inAGL)
+            else:
+                outViewshed = Viewshed(self.inRaster, pingLayer, self.zFactor, self.useEarthCurvature, self.refractivityCoefficient)
+            outViewshed.save(outRaster)
+
+        return(outRaster)
+
+    def rasterToPolygon(self, inRaster, outFeature):
+        import arcpy
+        arcpy.RasterToPolygon_conversion(inRaster, outFeature, 'SIMPLIFY', 'Value')
+        return(outFeature)
+
+    def removeZeroRows(self, feature):
+        """ remove zero grid values """
+        import arcpy
+        with arcpy.da.UpdateCursor(feature, ['gridcode'], 'gridcode = 0') as rows:
+            for row in rows:
+                rows.deleteRow()
+        return(feature)
+
+    def spatialJoin(self, feature, joinFeature, outFeature):
+        """ Pull the ping number, date and description from the ping's join area """
+        import arcpy
+        fieldmappings = arcpy.FieldMappings()
+        fieldmappings.addTable(feature)
+        fieldmappings.addTable(joinFeature)
+        arcpy.SpatialJoin_analysis(feature, joinFeature, outFeature, "#", "#", fieldmappings)
+        return(outFeature)
+
+class StubBackend(object):
+    """ Stand in for ArcpyBackend, each tool call sleeps for delay seconds and
+    returns the output name. Used to time the pool without ArcGIS """
+    def __init__(self, delay=0.05):
+        self.delay = delay
+
+    def createWorkspace(self, folder, name):
+        workspace = os.path.join(folder, name)
+        if not os.path.exists(workspace):
+            os.makedirs(workspace)
+        return(workspace)
+
+    def viewshed(self, pingNumber, outRaster):
+        time.sleep(self.delay)
+        return(outRaster)
+
+    def rasterToPolygon(self, inRaster, outFeature):
+        time.sleep(self.delay)
+        return(outFeature)
+
+    def removeZeroRows(self, feature):
+        time.sleep(self.delay)
+        return(feature)
+
+    def spatialJoin(self, feature, joinFeature, outFeature):
+        time.sleep(self.delay)
+        return(outFeature)
+
+def setExecutable():
+    """ Inside ArcMap sys.executable is ArcMap.exe, start the workers with pythonw.exe instead """
+    pythonw = os.path.join(sys.exec_prefix, 'pythonw.exe')
+    if os.path.isfile(pythonw):
+        multiprocessing.set_executable(pythonw)
+
+def initWorker(backend, folder):
+    """ Set the backend and create this process's own scratch workspace """
+    global _backend, _workspace
+    _backend = backend
+    _workspace = backend.createWorkspace(folder, 'Ping_Worker_{0}.gdb'.format(os.getpid()))
+
+def processPing(task):
+    """ Viewshed, polygon, remove non visible areas and join the ping data for one ping.
+    task = (pingNumber, joinFeature), returns (pingNumber, joined feature) """
+    pingNumber, joinFeature = task
+
+    rasterViewshed = os.path.join(_workspace, 'Raster_Viewshed_Ping{0}'.format(pingNumber))
+    featureViewshed = os.path.join(_workspace, 'Feature_Viewshed_Ping{0}'.format(pingNumber))
+    joinedFeature = os.path.join(_workspace, 'Spatial_Joined_Feature_ping{0}'.format(pingNumber))
+
+    _backend.viewshed(pingNumber, rasterViewshed)
+    _backend.rasterToPolygon(rasterViewshed, featureViewshed)
+    _backend.removeZeroRows(featureViewshed)
+    _backend.spatialJoin(featureViewshed, joinFeature, joinedFeature)
+
+    return(pingNumber, joinedFeature)
+
+def runPings(backend, tasks, folder, workers=1):
+    """ Process every task, workers > 1 spreads them over a process pool.
+    Results are returned in the same order as tasks """
+    if workers < 2:
+        initWorker(backend, folder)
+        return [processPing(task) for task in tasks]
+
+    setExecutable()
+    pool = multiprocessing.Pool(workers, initWorker, (backend, folder))
+    try:
+        # map keeps the task order regardless of which worker finishes first
+        results = pool.map(processPing, tasks, 1)
+    finally:
+        pool.close()
+        pool.join()
+
+    return(results)
+
+def benchmark(pings=40, delay=0.05, workerCounts=(1, 2, 4)):
+    """ Time the pool against the stub backend and check it matches the serial run """
+    import shutil, tempfile
+
+    tasks = [(p, 'Feature_join_area_ping_{0}'.format(p)) for p in range(1, pings + 1)]
+    serial = None
+    for workers in workerCounts:
+        folder = tempfile.mkdtemp()
+        try:
+            start = time.time()
+            results = runPings(StubBackend(delay), tasks, folder, workers)
+            elapsed = time.time() - start
+        finally:
+            shutil.rmtree(folder)
+
+        outputs = [(p, os.path.basename(f)) for p, f in results]
+        if serial is None:
+            serial = outputs
+        print('{0} pings, {1} workers: {2:.2f} sec, same as serial run: {3}'.format(pings, workers, elapsed, outputs == serial))
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,183 @@
+#-------------------------------------------------------------------------------
+# Name:        ring_engine
+# Purpose:     Build concentric ring buffers around points (IPP / PLS) directly
+#              as annuli, one dissolved feature per distance
+#
+# Author:      SMSR
+# Copyright:   (c) SMSR 2013
+# Licence:
+#     MapSAR wilderness search and rescue GIS data model and related python scripting
+#     Copyright (C) 2012  - Jon Pedder & SMSR
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+#
+# Buffer plus Union computes the area between two buffer distances the hard
+# way. Around a point that area is simply the circle of the larger distance
+# with the circle of the smaller distance as a hole, so every ring of every
+# point is generated at once from a unit circle.
+#
+# When the rings of different points don't touch, the dissolved ring for a
+# distance is the multipart of the annuli of all points and no topology is
+# needed. When they do touch, dissolvedRings merges the circles with the
+# geometry union / difference methods, one distance at a time.
+#
+# Geometry is returned as WKT so the engine runs without arcpy. Run this file
+# directly for the benchmark.
+
+import numpy
+
+# Vertices in each circle, the Buffer tool densifies a full circle to about
+# the same number of vertices
+CIRCLE_VERTICES = 120
+
+# Meters in each linear unit accepted by the Buffer tool
+METERS_PER_UNIT = {'meters': 1.0,
+                   'kilometers': 1000.0,
+                   'centimeters': 0.01,
+                   'decimeters': 0.1,
+                   'millimeters': 0.001,
+                   'feet': 0.3048,
+                   'inches': 0.0254,
+                   'yards': 0.9144,
+                   'miles': 1609.344,
+                   'nauticalmiles': 1852.0}
+
+_circleCache = {}
+
+def unitCircle(vertices=CIRCLE_VERTICES):
+    """ Closed clockwise unit circle starting at north, shape (vertices + 1, 2) """
+    if vertices not in _circleCache:
+        angle = numpy.linspace(0.0, 2.0 * numpy.pi, vertices + 1)
+        circle = numpy.column_stack((numpy.sin(angle), numpy.cos(angle)))
+        circle[-1] = circle[0]
+        _circleCache[vertices] = circle
+    return _circleCache[vertices]
+
+def distanceFactor(unit, metersPerUnit):
+    """ Multiplier from buffer distances in unit to coordinate units. unit '' means
+    the distances are already in coordinate units. Returns None for an unknown unit """
+    if not unit:
+        return(1.0)
+    meters = METERS_PER_UNIT.get(unit.replace(' ', '').lower())
+    if meters is None or not metersPerUnit:
+        return(None)
+    return(meters / metersPerUnit)
+
+def circles(points, distances, vertices=CIRCLE_VERTICES):
+    """ Every circle for every point in one step. Returns an array of shape
+    (points, distances, vertices + 1, 2) """
+    points = numpy.asarray(points, dtype=numpy.float64).reshape(-1, 2)
+    distances = numpy.asarray(distances, dtype=numpy.float64)
+    return points[:, None, None, :] + distances[None, :, None, None] * unitCircle(vertices)[None, None, :, :]
+
+def ringsOverlap(points, maxDistance):
+    """ True when the outer rings of any two points touch """
+    points = numpy.asarray(points, dtype=numpy.float64).reshape(-1, 2)
+    if len(points) < 2:
+        return(False)
+    delta = points[:, None, :] - points[None, :, :]
+    separation = numpy.sqrt((delta ** 2).sum(axis=2))
+    separation[numpy.diag_indices(len(points))] = numpy.inf
+    return(bool((separation <= 2.0 * maxDistance).any()))
+
+def _ringTexts(rings):
+    """ WKT coordinate lists for an array of rings, formatted with a single
+    pattern per ring size instead of one format call per vertex. Six decimals
+    is well below the resolution of any coordinate system MapSAR uses """
+    pattern = '({0})'.format(', '.join(['%.6f %.6f'] * rings.shape[-2]))
+    return [pattern % tuple(ring) for ring in rings.reshape(-1, rings.shape[-2] * 2).tolist()]
+
+def annuli(points, distances, vertices=CIRCLE_VERTICES):
+    """ Annuli of each point, assuming the rings of different points don't touch.
+    distances are sorted and made unique. Returns a list of (distance, wkt)
+    with one multipolygon per distance, the first distance is a full circle """
+    distances = sorted(set(distances))
+    rings = circles(points, distances, vertices)
+    count = rings.shape[0]
+
+    # Each circle is the outer ring at its own distance and, running
+    # counterclockwise, the hole of the next distance out
+    outer = _ringTexts(rings)
+    holes = _ringTexts(rings[:, :, ::-1, :])
+
+    result = []
+    for k, distance in enumerate(distances):
+        if k == 0:
+            polygons = ['({0})'.format(outer[p * len(distances)]) for p in range(count)]
+        else:
+            polygons = ['({0}, {1})'.format(outer[p * len(distances) + k], holes[p * len(distances) + k - 1])
+                        for p in range(count)]
+        result.append((distance, 'MULTIPOLYGON ({0})'.format(', '.join(polygons))))
+
+    return result
+
+def disks(points, distances, vertices=CIRCLE_VERTICES):
+    """ Circle polygons of every point for each distance as (distance, [wkt, ...]) """
+    distances = sorted(set(distances))
+    rings = circles(points, distances, vertices)
+    texts = _ringTexts(rings)
+    return [(distance, ['POLYGON ({0})'.format(texts[p * len(distances) + k]) for p in range(rings.shape[0])])
+            for k, distance in enumerate(distances)]
+
+def dissolvedRings(points, distances, fromWKT, vertices=CIRCLE_VERTICES):
+    """ Dissolved ring for each distance as (distance, geometry). fromWKT turns
+    WKT into a geometry with union and difference methods (arcpy.FromWKT).
+    Points whose rings don't touch skip the geometry methods entirely """
+    distances = sorted(set(distances))
+    if not ringsOverlap(points, distances[-1]):
+        return [(distance, fromWKT(wkt)) for distance, wkt in annuli(points, distances, vertices)]
+
+    result = []
+    inside = None
+    for distance, polygons in disks(points, distances, vertices):
+        merged = fromWKT(polygons[0])
+        for polygon in polygons[1:]:
+            merged = merged.union(fromWKT(polygon))
+        if inside is None:
+            result.append((distance, merged))
+        else:
+            result.append((distance, merged.difference(inside)))
+        inside = merged
+
+    return result
+
+def benchmark(subjects=200, distances=(0.6, 1.6, 3.2, 7.9), repeat=10):
+    """ Time the 25/50/75/95% ring set of many subjects """
+    import time
+
+    rng = numpy.random.RandomState(0)
+    # Subjects spaced far enough apart that their rings stay separate
+    points = numpy.column_stack((numpy.arange(subjects) * 20.0, rng.rand(subjects) * 5.0))
+
+    start = time.time()
+    for i in range(repeat):
+        rings = circles(points, distances)
+    elapsed = (time.time() - start) / repeat
+    print('{0} subjects x {1} rings, vertices: {2:.2f} ms'.format(subjects, len(distances), elapsed * 1000))
+
+    start = time.time()
+    for i in range(repeat):
+        result = annuli(points, distances)
+    elapsed = (time.time() - start) / repeat
+    print('{0} subjects x {1} rings, dissolved WKT: {2:.2f} ms'.format(subjects, len(distances), elapsed * 1000))
+
+    start = time.time()
+    for i in range(repeat):
+        result = annuli(points[:1], distances)
+    elapsed = (time.time() - start) / repeat
+    print('1 subject x {0} rings, dissolved WKT: {1:.2f} ms'.format(len(distances), elapsed * 1000))
+
+if __name__ == '__main__':
+    benchmark()
@@ -29,6 +29,15 @@ import time
 from arcpy import env
 from arcpy.sa import *
 
+try:
+    import slope_engine
+except ImportError:
+    slope_engine = None
+
+# Use the NumPy slope engine in place of the Spatial Analyst Slope and Aspect
+# tools. The engine processes the DEM in tiles so large rasters stay in memory
+useSlopeEngine = slope_engine is not None
+
 # Set enviroment, frames and layers
 arcpy.env.workspace
 arcpy.env.scratchGDB
@@ -81,6 +90,26 @@ def clipDEM(inRaster,clippedRasterName):
 
     return(clipped_raster)
 
+def createSlope(inRaster,slopeRasterName):
+    """ Degree slope of inRaster saved to slopeRasterName """
+    if useSlopeEngine:
+        slope_engine.slopeAspectRaster(inRaster, slopeRasterName)
+    else:
+        outSlope = Slope(inRaster, "DEGREE",1)
+        outSlope.save(slopeRasterName)
+
+    return(slopeRasterName)
+
+def createAspect(inRaster,aspectRasterName):
+    """ Aspect of inRaster saved to aspectRasterName """
+    if useSlopeEngine:
+        slope_engine.slopeAspectRaster(inRaster, None, aspectRasterName)
+    else:
+        outAspect = Aspect(inRaster)
+        outAspect.save(aspectRasterName)
+
+    return(aspectRasterName)
+
 def main():
 
     # Set date and time vars
@@ -100,6 +129,7 @@ def main():
     clippedRasterName = "{0}\Clipped_Raster_{1}".format(scratchdb,timestamp)
     slopeRasterName = "{0}\Slope_Raster_{1}".format(scratchdb,timestamp)
     aspectRasterName = "{0}\Aspect_Raster_{1}".format(scratchdb,timestamp)
+    maskedRasterName = "{0}\Masked_Raster_{1}".format(scratchdb,timestamp)
 
 
     # Add Slope Raster to dataframe
@@ -114,24 +144,21 @@ def main():
     if inFeature > "":
         arcpy.AddMessage('Analysing Slopes on Selected Features {0}\n'.format(inFeature))
         outExtractByMask = ExtractByMask(clippedRaster, inFeature)
-        outExtractByMask.save(slopeRasterName)
+        outExtractByMask.save(maskedRasterName)
 
         # Slope analysis
-        outSlope = Slope(slopeRasterName, "DEGREE",1)
-        outSlope.save(slopeRasterName)
+        createSlope(maskedRasterName,slopeRasterName)
 
     if inFeature == '':
         arcpy.AddMessage('Analysing Slopes for DEM Only\n')
 
          # Slope analysis
-        outSlope = Slope(clippedRaster, "DEGREE",1)
-        outSlope.save(slopeRasterName)
+        createSlope(clippedRaster,slopeRasterName)
 
         # Process Aspect if True
         if inAspect == 'true':
             arcpy.AddMessage('Analysing Aspect for DEM\n')
-            outAspect = Aspect(inRaster)
-            outAspect.save(aspectRasterName)
+            createAspect(inRaster,aspectRasterName)
 
             # Define the name of the output Layer
             if '\\' in inAspect:
@@ -0,0 +1,215 @@
+#-------------------------------------------------------------------------------
+# Name:        slope_engine
+# Purpose:     Slope and aspect of a DEM using NumPy, processed in tiles so
+#              large DEMs can be handled in bounded memory
+#
+# Author:      SMSR
+# Copyright:   (c) SMSR 2013
+# Licence:
+#     MapSAR wilderness search and rescue GIS data model and related python scripting
+#     Copyright (C) 2012  - Jon Pedder & SMSR
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+#
+# Uses Horn's method, the same 3x3 window the Spatial Analyst Slope and Aspect
+# tools use, so the output classifies the same with the slope and aspect
+# symbology layers.
+#
+#     a b c      dz/dx = ((c + 2f + i) - (a + 2d + g)) / (8 * cellWidth)
+#     d e f      dz/dy = ((g + 2h + i) - (a + 2b + c)) / (8 * cellHeight)
+#     g h i
+#
+# Slope is in degrees, aspect is degrees clockwise from north with -1 for flat
+# cells. Neighbours that are NoData or off the edge of the raster take the
+# value of the centre cell, as Spatial Analyst does.
+#
+# Each tile is read with a one cell halo around it, so tiled output is
+# identical to processing the whole array at once. Run this file directly for
+# the whole array / tiled benchmark.
+
+import numpy
+
+# NoData value written to the output rasters
+OUTPUT_NODATA = -9999.0
+
+# Rows and columns per tile, plus the one cell halo
+TILE_SIZE = 2048
+
+def hornSlopeAspect(window, cellWidth, cellHeight, zFactor=1, aspect=True):
+    """ Slope and aspect for the inner cells of window. window is a float array
+    with a one cell halo on every side, NoData as nan. Returns slope, aspect
+    (aspect is None when not requested), both two rows and columns smaller than window """
+    z = window * zFactor
+    e = z[1:-1, 1:-1]
+    valid = ~numpy.isnan(e)
+
+    def neighbour(rows, cols):
+        n = z[rows, cols]
+        return numpy.where(numpy.isnan(n), e, n)
+
+    a = neighbour(slice(None, -2), slice(None, -2))
+    b = neighbour(slice(None, -2), slice(1, -1))
+    c = neighbour(slice(None, -2), slice(2, None))
+    d = neighbour(slice(1, -1), slice(None, -2))
+    f = neighbour(slice(1, -1), slice(2, None))
+    g = neighbour(slice(2, None), slice(None, -2))
+    h = neighbour(slice(2, None), slice(1, -1))
+    i = neighbour(slice(2, None), slice(2, None))
+
+    dzdx = ((c + 2 * f + i) - (a + 2 * d + g)) / (8.0 * cellWidth)
+    dzdy = ((g + 2 * h + i) - (a + 2 * b + c)) / (8.0 * cellHeight)
+
+    slope = numpy.degrees(numpy.arctan(numpy.sqrt(dzdx * dzdx + dzdy * dzdy)))
+    slope[~valid] = numpy.nan
+
+    if not aspect:
+        return(slope, None)
+
+    angle = numpy.degrees(numpy.arctan2(dzdy, -dzdx))
+    direction = numpy.where(angle > 90.0, 450.0 - angle, 90.0 - angle)
+    direction[(dzdx == 0) & (dzdy == 0)] = -1.0
+    direction[~valid] = numpy.nan
+
+    return(slope, direction)
+
+def padWindow(dem):
+    """ Add a halo of nan around a whole DEM array """
+    window = numpy.empty((dem.shape[0] + 2, dem.shape[1] + 2))
+    window.fill(numpy.nan)
+    window[1:-1, 1:-1] = dem
+    return window
+
+def slopeAspect(dem, cellWidth, cellHeight, zFactor=1, nodata=None, aspect=True):
+    """ Slope and aspect of a whole DEM array in one pass """
+    surface = numpy.array(dem, dtype=numpy.float64)
+    if nodata is not None:
+        surface[numpy.asarray(dem) == nodata] = numpy.nan
+    return hornSlopeAspect(padWindow(surface), cellWidth, cellHeight, zFactor, aspect)
+
+def tiles(nrows, ncols, tileSize=TILE_SIZE):
+    """ Yield row, col, rows, cols of each tile covering the raster """
+    for row in range(0, nrows, tileSize):
+        for col in range(0, ncols, tileSize):
+            yield(row, col, min(tileSize, nrows - row), min(tileSize, ncols - col))
+
+def readWindow(reader, nrows, ncols, row, col, rows, cols):
+    """ Read a tile plus its one cell halo. reader(row, col, rows, cols) returns a
+    float array with NoData as nan, only called for cells inside the raster """
+    top = max(row - 1, 0)
+    left = max(col - 1, 0)
+    bottom = min(row + rows + 1, nrows)
+    right = min(col + cols + 1, ncols)
+
+    window = numpy.empty((rows + 2, cols + 2))
+    window.fill(numpy.nan)
+    window[top - row + 1:bottom - row + 1, left - col + 1:right - col + 1] = reader(top, left, bottom - top, right - left)
+    return window
+
+def slopeAspectTiled(reader, writer, nrows, ncols, cellWidth, cellHeight, zFactor=1, aspect=True, tileSize=TILE_SIZE):
+    """ Process the raster one tile at a time. Tiles are read through reader (see
+    readWindow) and the results handed to writer(row, col, slope, aspect) """
+    for row, col, rows, cols in tiles(nrows, ncols, tileSize):
+        window = readWindow(reader, nrows, ncols, row, col, rows, cols)
+        slope, direction = hornSlopeAspect(window, cellWidth, cellHeight, zFactor, aspect)
+        writer(row, col, slope, direction)
+
+def slopeAspectRaster(inRaster, outSlope, outAspect=None, zFactor=1, tileSize=TILE_SIZE):
+    """ Create degree slope and / or aspect rasters from inRaster, pass None for
+    an output that isn't needed. Rasters larger than one tile are written a tile
+    at a time and mosaicked """
+    import arcpy, os
+
+    raster = arcpy.Raster(str(inRaster))
+    extent = raster.extent
+    cellWidth = raster.meanCellWidth
+    cellHeight = raster.meanCellHeight
+    nrows, ncols = raster.height, raster.width
+    nodata = raster.noDataValue
+    sr = raster.spatialReference
+
+    def lowerLeft(row, col, rows):
+        return arcpy.Point(extent.XMin + col * cellWidth, extent.YMax - (row + rows) * cellHeight)
+
+    def reader(row, col, rows, cols):
+        if nodata is None:
+            block = arcpy.RasterToNumPyArray(raster, lowerLeft(row, col, rows), cols, rows)
+        else:
+            block = arcpy.RasterToNumPyArray(raster, lowerLeft(row, col, rows), cols, rows, nodata)
+        window = block.astype(numpy.float64)
+        if nodata is not None:
+            window[block == nodata] = numpy.nan
+        return window
+
+    # Output raster, tiles written so far and which of slope / aspect it holds
+    outputs = [(outRaster, [], index) for index, outRaster in enumerate((outSlope, outAspect)) if outRaster]
+
+    def writer(row, col, slope, direction):
+        for outRaster, tileList, index in outputs:
+            values = (slope, direction)[index]
+            values = numpy.where(numpy.isnan(values), OUTPUT_NODATA, values).astype(numpy.float32)
+            block = arcpy.NumPyArrayToRaster(values, lowerLeft(row, col, values.shape[0]), cellWidth, cellHeight, OUTPUT_NODATA)
+            if nrows <= tileSize and ncols <= tileSize:
+                tileName = outRaster
+            else:
+                tileName = arcpy.CreateScratchName('tile', '', 'RasterDataset', arcpy.env.scratchGDB)
+            block.save(tileName)
+            tileList.append(tileName)
+
+    slopeAspectTiled(reader, writer, nrows, ncols, cellWidth, cellHeight, zFactor, bool(outAspect), tileSize)
+
+    for outRaster, tileList, index in outputs:
+        if tileList != [outRaster]:
+            arcpy.MosaicToNewRaster_management(tileList, os.path.dirname(outRaster), os.path.basename(outRaster),
+                                               sr, '32_BIT_FLOAT', cellWidth, 1)
+            for tileName in tileList:
+                arcpy.Delete_management(tileName)
+        else:
+            arcpy.DefineProjection_management(outRaster, sr)
+
+    return(outSlope, outAspect)
+
+def benchmark(shape=(6000, 6000), tileSize=1024, cellSize=10.0):
+    """ Compare whole array and tiled throughput on a synthetic DEM """
+    import time
+
+    rng = numpy.random.RandomState(0)
+    dem = numpy.cumsum(numpy.cumsum(rng.standard_normal(shape), 0), 1) * 0.05 + 1000.0
+    cells = dem.size
+
+    start = time.time()
+    slope, direction = slopeAspect(dem, cellSize, cellSize)
+    whole = time.time() - start
+
+    tiledSlope = numpy.empty(shape)
+    tiledAspect = numpy.empty(shape)
+
+    def reader(row, col, rows, cols):
+        return dem[row:row + rows, col:col + cols]
+
+    def writer(row, col, s, a):
+        tiledSlope[row:row + s.shape[0], col:col + s.shape[1]] = s
+        tiledAspect[row:row + a.shape[0], col:col + a.shape[1]] = a
+
+    start = time.time()
+    slopeAspectTiled(reader, writer, shape[0], shape[1], cellSize, cellSize, tileSize=tileSize)
+    tiled = time.time() - start
+
+    print('{0} x {1} DEM'.format(shape[0], shape[1]))
+    print('whole array: {0:.2f} sec, {1:.1f} million cells/sec'.format(whole, cells / whole / 1e6))
+    print('tiled {0}: {1:.2f} sec, {2:.1f} million cells/sec'.format(tileSize, tiled, cells / tiled / 1e6))
+    print('tiled output identical: {0}'.format(numpy.array_equal(slope, tiledSlope) and numpy.array_equal(direction, tiledAspect)))
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,268 @@
+#-------------------------------------------------------------------------------
+# Name:        viewshed_engine
+# Purpose:     Line of sight viewshed for DEM arrays using NumPy. Used by the
+#              cell ping analysis in place of the Spatial Analyst Viewshed tool
+#
+# Author:      SMSR
+# Copyright:   (c) SMSR 2013
+# Licence:
+#     MapSAR wilderness search and rescue GIS data model and related python scripting
+#     Copyright (C) 2012  - Jon Pedder & SMSR
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+#
+# The DEM is a 2D array, row 0 is the north edge. Cell positions are described
+# with a GDAL style geotransform (originX, cellWidth, 0, originY, 0, -cellHeight)
+# where originX, originY is the upper left corner of the raster.
+#
+# Visibility is calculated with a sweep outward from the observer one ring of
+# cells at a time (XDraw). Each cell takes the horizon of the line of sight
+# from the two cells of the previous ring it falls between, so a whole ring is
+# solved with a handful of array operations.
+#
+# arcpy is only needed by readDEM and writeVisibility, the engine itself runs on
+# plain arrays so it can be checked against synthetic DEMs.
+
+import numpy
+
+# Earth diameter in meters, same value the Spatial Analyst Viewshed tool uses
+EARTH_DIAMETER = 12740000.0
+
+# Viewshed defaults when the observer has no OFFSETA / OFFSETB values
+DEFAULT_OFFSETA = 1.0
+DEFAULT_OFFSETB = 0.0
+
+# Horizon slope used before anything blocks the line of sight. Kept finite so
+# the interpolation between cells never produces nan
+_OPEN_HORIZON = -1.0e300
+
+# Ring geometry relative to the observer, shared by every observer
+_ringCache = {}
+
+def mapToCell(geotransform, x, y):
+    """ Return the (row, col) of the cell containing map coordinate x, y """
+    row = int(numpy.floor((y - geotransform[3]) / geotransform[5]))
+    col = int(numpy.floor((x - geotransform[0]) / geotransform[1]))
+    return(row, col)
+
+def cellToMap(geotransform, row, col):
+    """ Return the map coordinate of the centre of cell row, col """
+    x = geotransform[0] + (col + 0.5) * geotransform[1]
+    y = geotransform[3] + (row + 0.5) * geotransform[5]
+    return(x, y)
+
+def ringGeometry(r):
+    """ Offsets of the cells r steps from the observer and the two cells of
+    ring r-1 each one takes its horizon from. Returns di, dj, di0, dj0, di1, dj1, weight """
+    if r in _ringCache:
+        return _ringCache[r]
+
+    side = numpy.arange(-r, r + 1)
+    inner = numpy.arange(-r + 1, r)
+    di = numpy.concatenate((numpy.repeat(-r, side.size), numpy.repeat(r, side.size), inner, inner))
+    dj = numpy.concatenate((side, side, numpy.repeat(-r, inner.size), numpy.repeat(r, inner.size)))
+
+    if r == 1:
+        # Neighbours of the observer have nothing in between
+        geometry = (di, dj, di, dj, di, dj, numpy.zeros(di.size))
+    else:
+        # Step one cell back toward the observer along the major axis, the
+        # minor axis then falls between two cells of the previous ring
+        rowMajor = numpy.abs(di) == r
+        major = numpy.where(rowMajor, di, dj)
+        minor = numpy.where(rowMajor, dj, di) * ((r - 1.0) / r)
+        lo = numpy.floor(minor).astype(int)
+        weight = minor - lo
+        hi = numpy.where(weight > 0, lo + 1, lo)
+        back = major - numpy.sign(major)
+
+        di0 = numpy.where(rowMajor, back, lo)
+        dj0 = numpy.where(rowMajor, lo, back)
+        di1 = numpy.where(rowMajor, back, hi)
+        dj1 = numpy.where(rowMajor, hi, back)
+        geometry = (di, dj, di0, dj0, di1, dj1, weight)
+
+    _ringCache[r] = geometry
+    return geometry
+
+def surfaceArray(dem, zFactor=1, agl=None, nodata=None):
+    """ Convert the DEM to float elevations with zFactor and any above ground
+    level heights (vegetation, buildings) applied. Returns surface, valid """
+    surface = numpy.array(dem, dtype=numpy.float64) * zFactor
+    valid = ~numpy.isnan(surface)
+    if nodata is not None:
+        valid &= numpy.asarray(dem) != nodata
+    if agl is not None:
+        surface += numpy.nan_to_num(numpy.asarray(agl, dtype=numpy.float64))
+    surface[~valid] = 0.0
+    return(surface, valid)
+
+def viewshed(dem, geotransform, observer, zFactor=1, useEarthCurvature='FLAT_EARTH',
+             refractivityCoefficient=0.13, agl=None, nodata=None, surface=None):
+    """ Boolean visibility grid for a single observer.
+    observer is (x, y), (x, y, offsetA) or (x, y, offsetA, offsetB) in map units.
+    useEarthCurvature is 'FLAT_EARTH' / 'CURVED_EARTH' as used by Viewshed, or a boolean.
+    surface may be a (surface, valid) pair from surfaceArray to skip converting the DEM again """
+    if surface is None:
+        surface = surfaceArray(dem, zFactor, agl, nodata)
+    z, valid = surface
+    nrows, ncols = z.shape
+
+    x, y = observer[0], observer[1]
+    offsetA = DEFAULT_OFFSETA
+    offsetB = DEFAULT_OFFSETB
+    if len(observer) > 2 and observer[2] is not None:
+        offsetA = float(observer[2])
+    if len(observer) > 3 and observer[3] is not None:
+        offsetB = float(observer[3])
+
+    visible = numpy.zeros((nrows, ncols), dtype=bool)
+
+    oi, oj = mapToCell(geotransform, x, y)
+    if not (0 <= oi < nrows and 0 <= oj < ncols):
+        raise ValueError('Observer {0}, {1} is outside of the elevation raster'.format(x, y))
+    if not valid[oi, oj]:
+        return visible
+
+    if useEarthCurvature is True or useEarthCurvature == 'CURVED_EARTH':
+        curvature = (1.0 - refractivityCoefficient) / EARTH_DIAMETER
+    else:
+        curvature = 0.0
+
+    cellWidth = abs(geotransform[1])
+    cellHeight = abs(geotransform[5])
+    zObserver = z[oi, oj] + offsetA
+
+    # Steepest slope from the observer seen so far along each line of sight
+    horizon = numpy.zeros((nrows, ncols))
+    visible[oi, oj] = True
+
+    maxRing = max(oi, nrows - 1 - oi, oj, ncols - 1 - oj)
+    for r in range(1, maxRing + 1):
+        di, dj, di0, dj0, di1, dj1, weight = ringGeometry(r)
+
+        rows = di + oi
+        cols = dj + oj
+        inside = (rows >= 0) & (rows < nrows) & (cols >= 0) & (cols < ncols)
+        if not inside.all():
+            rows, cols = rows[inside], cols[inside]
+            di, dj = di[inside], dj[inside]
+            di0, dj0, di1, dj1 = di0[inside], dj0[inside], di1[inside], dj1[inside]
+            weight = weight[inside]
+
+        if r == 1:
+            horizonIn = numpy.repeat(_OPEN_HORIZON, rows.size)
+        else:
+            horizonIn = (1.0 - weight) * horizon[di0 + oi, dj0 + oj] + weight * horizon[di1 + oi, dj1 + oj]
+
+        dist = numpy.sqrt((di * cellHeight) ** 2 + (dj * cellWidth) ** 2)
+        zCell = z[rows, cols] - curvature * dist * dist
+        surfaceSlope = (zCell - zObserver) / dist
+        targetSlope = (zCell + offsetB - zObserver) / dist
+
+        # NoData cells are never visible and do not block the cells behind them
+        ok = valid[rows, cols]
+        visible[rows, cols] = (targetSlope >= horizonIn) & ok
+        horizon[rows, cols] = numpy.where(ok, numpy.maximum(surfaceSlope, horizonIn), horizonIn)
+
+    return visible
+
+def viewsheds(dem, geotransform, observers, zFactor=1, useEarthCurvature='FLAT_EARTH',
+              refractivityCoefficient=0.13, agl=None, nodata=None):
+    """ Visibility grid for each observer, returned in the same order as observers """
+    surface = surfaceArray(dem, zFactor, agl, nodata)
+    grids = []
+    for observer in observers:
+        grids.append(viewshed(dem, geotransform, observer, zFactor, useEarthCurvature,
+                              refractivityCoefficient, surface=surface))
+    return grids
+
+class VisibilityAccumulator(object):
+    """ Combines the visibility grids of many observers in one pass.
+    count is the number of observers that see each cell. combination is an id
+    for the set of observers that see each cell, combinations[id] is the tuple
+    of observer keys in that set. Id 0 is always the empty set. Unlike a bit
+    per observer in the cell value this is not limited to 31 observers """
+    def __init__(self, shape):
+        self.count = numpy.zeros(shape, dtype=numpy.int32)
+        self.combination = numpy.zeros(shape, dtype=numpy.int32)
+        self.combinations = [()]
+
+    def add(self, key, visible):
+        """ Add the visibility grid of the observer identified by key """
+        self.count += visible
+
+        # Every existing set splits in two, cells that see this observer and
+        # cells that don't. Renumber the sets that are actually in use
+        split = self.combination.astype(numpy.int64) * 2 + visible
+        used = numpy.zeros(len(self.combinations) * 2, dtype=bool)
+        used[0] = True
+        used[split.ravel()] = True
+        renumber = numpy.cumsum(used) - 1
+
+        self.combination = renumber[split].astype(numpy.int32)
+        self.combinations = [self.combinations[s // 2] + ((key,) if s % 2 else ()) for s in numpy.nonzero(used)[0]]
+
+def cumulativeViewshed(dem, geotransform, observers, keys=None, zFactor=1, useEarthCurvature='FLAT_EARTH',
+                       refractivityCoefficient=0.13, agl=None, nodata=None):
+    """ Visibility of all observers combined into a VisibilityAccumulator.
+    keys identify each observer in the combinations, default is the observer index """
+    if keys is None:
+        keys = range(len(observers))
+    surface = surfaceArray(dem, zFactor, agl, nodata)
+    accumulator = VisibilityAccumulator(surface[0].shape)
+    for key, observer in zip(keys, observers):
+        accumulator.add(key, viewshed(dem, geotransform, observer, zFactor, useEarthCurvature,
+                                      refractivityCoefficient, surface=surface))
+    return accumulator
+
+def readDEM(inRaster):
+    """ Read a raster into an array. Returns dem, geotransform, nodata, spatialReference """
+    import arcpy
+
+    raster = arcpy.Raster(str(inRaster))
+    extent = raster.extent
+    nodata = raster.noDataValue
+    if nodata is None:
+        dem = arcpy.RasterToNumPyArray(raster)
+    else:
+        dem = arcpy.RasterToNumPyArray(raster, nodata_to_value=nodata)
+    geotransform = (extent.XMin, raster.meanCellWidth, 0.0, extent.YMax, 0.0, -raster.meanCellHeight)
+
+    return(dem, geotransform, nodata, raster.spatialReference)
+
+def readAligned(inRaster, geotransform, shape, fillValue=0):
+    """ Read a second raster (such as an above ground level raster) over the
+    same cells as a DEM read with readDEM """
+    import arcpy
+
+    lowerLeft = arcpy.Point(geotransform[0], geotransform[3] + shape[0] * geotransform[5])
+    return arcpy.RasterToNumPyArray(str(inRaster), lowerLeft, shape[1], shape[0], fillValue)
+
+def writeVisibility(grid, geotransform, outRaster, spatialReference=None):
+    """ Save a visibility grid as an integer raster, 1 = visible 0 = not visible,
+    matching the values written by Viewshed. Also used for the combination grid
+    of a VisibilityAccumulator """
+    import arcpy
+
+    nrows = grid.shape[0]
+    lowerLeft = arcpy.Point(geotransform[0], geotransform[3] + nrows * geotransform[5])
+    raster = arcpy.NumPyArrayToRaster(grid.astype(numpy.int32), lowerLeft,
+                                      abs(geotransform[1]), abs(geotransform[5]))
+    raster.save(outRaster)
+    if spatialReference is not None:
+        arcpy.DefineProjection_management(outRaster, spatialReference)
+
+    return(outRaster)
@@ -24,11 +24,42 @@
 #-------------------------------------------------------------------------------
 #-------------------------------------------------------------------------------
 
+import time
+
+def countRows(path):
+    """ Rows in the table at path """
+    import arcpy
+    return int(arcpy.GetCount_management(path).getOutput(0))
+
+def clearTable(table):
+    """ Delete every row of table, with TruncateTable or, where that is refused,
+    a delete cursor that reads no fields. Returns (table, rows, seconds, method, error) """
+    import arcpy
+    start = time.time()
+    try:
+        # TruncateTable empties the whole table behind a layer, count and delete
+        # through the table too rather than the layer's selection
+        path = arcpy.Describe(table).catalogPath
+        rows = countRows(path)
+        try:
+            arcpy.TruncateTable_management(table)
+            method = 'truncated'
+        except arcpy.ExecuteError:
+            # TruncateTable refuses versioned data and tables in a relationship
+            # with messaging
+            with arcpy.da.UpdateCursor(path, ['OID@']) as cursor:
+                for row in cursor:
+                    cursor.deleteRow()
+            method = 'deleted'
+        return (table, rows, time.time() - start, method, None)
+    except Exception as err:
+        return (table, None, time.time() - start, None, str(err))
+
 def ClearData():
     """ Clears data from selected feature classes """
     fcList = {}
     fcList['Incident_Information'] = arcpy.GetParameter(1)
-    fcList['Operation_Periods'] = arcpy.GetParameter(2)
+    fcList['Operation_Period'] = arcpy.GetParameter(2)
     fcList['PLS_Subject_Information'] = arcpy.GetParameter(3)
     fcList['2 Incident_Assets'] = arcpy.GetParameter(4)
     fcList['Teams'] = arcpy.GetParameter(5)
@@ -37,16 +68,19 @@ def ClearData():
     fcList['Search_Segments'] = arcpy.GetParameter(8)
     fcList['Clues_Point'] = arcpy.GetParameter(9)
 
-    for k in fcList.keys():
-        if fcList[k] == True:
-            arcpy.AddMessage('\nDeleting data from {0}\n'.format(k))
-            with arcpy.da.UpdateCursor(k,'*') as cursor:
-                for c in cursor:
-                    arcpy.AddWarning('Deleting row {0}'.format(c))
-                    cursor.deleteRow()
-
+    tables = [k for k in fcList.keys() if fcList[k] == True]
 
-            # arcpy.DeleteFeatures_management(k)
+    # One table at a time, arcpy is not thread safe
+    start = time.time()
+    cleared = 0
+    for table in tables:
+        table, rows, seconds, method, error = clearTable(table)
+        if error is None:
+            cleared += 1
+            arcpy.AddMessage('{0}: {1} rows {2} in {3:.2f} sec'.format(table, rows, method, seconds))
+        else:
+            arcpy.AddWarning('{0}: not cleared, {1}'.format(table, error))
+    arcpy.AddMessage('{0} of {1} tables cleared in {2:.2f} sec'.format(cleared, len(tables), time.time() - start))
 
 if __name__ == '__main__':
 
@@ -54,4 +88,3 @@ if __name__ == '__main__':
    import arcpy
    from arcpy import env
    ClearData()
-
@@ -26,11 +26,8 @@
 # ---------------------------------------------------------------------------
 
 # Import arcpy module
-import arcpy, sys, os, distutils
-from arcpy import env
-from os.path import join, abspath
-from os import walk
-from distutils.core import setup
+import arcpy
+import mxd_batch
 
 # Get parameters from user input
 # 0. Input folder to walk to look for all mxd files - folder
@@ -51,6 +48,9 @@ arcpy.env.workspace = InputDatabase
 OutputDatabase = "SAR_Default.gdb"
 OutputWorkspace = '{0}\\{1}'.format(OutputFolder,OutputDatabase)
 
+# Processes setting the spatial reference on the mxd files, 1 sets them one at a time
+mxdWorkers = 1
+
 def createDatabase():
 
     arcpy.AddMessage("Creating database, processing features and tables")
@@ -71,47 +71,38 @@ def createDatabase():
     # Copy Tables to the new database
     arcpy.TableToGeodatabase_conversion(tables, OutputWorkspace)
 
+def copyFolders(folders, manifest):
+    """ Copy the folders of MXDFolder to OutputFolder, only files that changed since the last run """
+    for folder in folders:
+        copied, skipped = mxd_batch.copyTree(MXDFolder+'/'+folder, OutputFolder+'/'+folder, manifest)
+        arcpy.AddMessage('{0}: {1} files copied, {2} unchanged'.format(folder, copied, skipped))
+    manifest.save()
+
 def createMXD():
     arcpy.AddMessage("Creating MapSAR mxd's")
-    distutils.file_util.copy_file(MXDFolder+'/'+'MapSAR.mxd',OutputFolder+'/'+'MapSAR.mxd')
-    distutils.file_util.copy_file(MXDFolder+'/'+'MapSAR_Basic.mxd',OutputFolder+'/'+'MapSAR_Basic.mxd')
+    manifest = mxd_batch.Manifest(OutputFolder)
+    mxd_batch.copyFile(MXDFolder+'/'+'MapSAR.mxd',OutputFolder+'/'+'MapSAR.mxd',manifest)
+    mxd_batch.copyFile(MXDFolder+'/'+'MapSAR_Basic.mxd',OutputFolder+'/'+'MapSAR_Basic.mxd',manifest)
 
     # Copy map template folders and files
     arcpy.AddMessage("Building template folders and Templates")
-    distutils.dir_util.copy_tree(MXDFolder+'/'+'Export',OutputFolder+'/'+'Export')
-    distutils.dir_util.copy_tree(MXDFolder+'/'+'Layer_Templates',OutputFolder+'/'+'Layer_Templates')
-    distutils.dir_util.copy_tree(MXDFolder+'/'+'Map_Templates',OutputFolder+'/'+'Map_Templates')
+    copyFolders(['Export','Layer_Templates','Map_Templates'], manifest)
 
-    # Walk through the folder structure, look at each mxd, set it's new spatial reference
+    # Set the new spatial reference on each mxd that changed since the last run
     # and adjust the source data path to match the new database.
     arcpy.AddMessage('Seting spatial reference on mxd files')
-    for root, dirs, files in walk(OutputFolder):
-         for file in files:
-                abspath = (join(root, file))
-                if abspath.find(".mxd")>0:
-                    arcpy.AddMessage('Setting Spatial Reference on file {0}'.format(abspath))
-                    mxd = arcpy.mapping.MapDocument(abspath)
-                    # Update the data source to point to the new database
-                    mxd.findAndReplaceWorkspacePaths(InputDatabase,OutputWorkspace)
-                    for df in arcpy.mapping.ListDataFrames(mxd):
-                        df.spatialReference = newSpatialReference
-                        lyr = arcpy.mapping.ListLayers(mxd,'PLS_Subject_Information',df)[0]
-                        df.panToExtent(lyr.getSelectedExtent())
-                        df.scale = 50000
-                    mxd.save()
-                    del mxd
+    settings = {'spatialReference': newSpatialReference, 'panLayer': 'PLS_Subject_Information',
+                'scale': 50000, 'replace': (InputDatabase, OutputWorkspace)}
+    mxd_batch.setMxds(OutputFolder, settings, mxdWorkers, arcpy.AddMessage, arcpy.AddWarning)
 
 def createFolders():
     arcpy.AddMessage('Copying directory structures')
     # Create other directory structures
-    distutils.dir_util.copy_tree(MXDFolder+'/'+'Base_Data',OutputFolder+'/'+'Base_Data')
-    distutils.dir_util.copy_tree(MXDFolder+'/'+'Backups',OutputFolder+'/'+'Backups')
-    distutils.dir_util.copy_tree(MXDFolder+'/'+'Documents',OutputFolder+'/'+'Documents')
-    distutils.dir_util.copy_tree(MXDFolder+'/'+'Products',OutputFolder+'/'+'Products')
-    distutils.dir_util.copy_tree(MXDFolder+'/'+'Incident_data',OutputFolder+'/'+'Incident_data')
-    distutils.dir_util.copy_tree(MXDFolder+'/'+'Report_Templates_rlf',OutputFolder+'/'+'Report_Templates_rlf')
+    copyFolders(['Base_Data','Backups','Documents','Products','Incident_data','Report_Templates_rlf'],
+                mxd_batch.Manifest(OutputFolder))
 
 # Run functions
-createDatabase()
-createMXD()
-createFolders()
\ No newline at end of file
+if __name__ == '__main__':
+    createDatabase()
+    createMXD()
+    createFolders()
@@ -26,11 +26,8 @@
 # ---------------------------------------------------------------------------
 
 # Import arcpy module
-import arcpy, sys, os, distutils, time
-from arcpy import env
-from os.path import join, abspath
-from os import walk
-from distutils.core import setup
+import arcpy, time
+import mxd_batch
 
 # Get parameters from user input
 # 0. Input folder to walk to look for all mxd files - folder
@@ -49,8 +46,15 @@ arcpy.AddMessage('Target Database is {0}'.format(targetDatabase))
 # Set Vars and overwrite option to true
 arcpy.env.overwriteOutput = True
 
-distutils.dir_util.copy_tree(sourceStructure,targetStructure)
-time.sleep(2)
+# Processes setting the spatial reference on the mxd files, 1 sets them one at a time
+mxdWorkers = 1
+
+def copyStructure():
+    """ Copy the files of sourceStructure that changed since the last run to targetStructure """
+    manifest = mxd_batch.Manifest(targetStructure)
+    copied, skipped = mxd_batch.copyTree(sourceStructure, targetStructure, manifest, arcpy.AddMessage)
+    manifest.save()
+    arcpy.AddMessage('{0} files copied, {1} unchanged'.format(copied, skipped))
 
 def localizeDatabase():
 
@@ -66,25 +70,14 @@ def localizeDatabase():
 
 def localizeMXD():
 
-    # Walk through the folder structure, look at each mxd, set it's new spatial reference
-    # and adjust the source data path to match the new database.
+    # Set the new spatial reference on each mxd that changed since the last run
     arcpy.AddMessage('Seting spatial reference on mxd files')
-    for root, dirs, files in walk(targetStructure):
-         for file in files:
-                abspath = (join(root, file))
-                if abspath.find(".mxd")>0:
-                    arcpy.AddMessage('Setting Spatial Reference on file {0}'.format(abspath))
-                    mxd = arcpy.mapping.MapDocument(abspath)
-                    for df in arcpy.mapping.ListDataFrames(mxd):
-                        df.spatialReference = sr
-                        lyr = arcpy.mapping.ListLayers(mxd,'Assignments',df)[0]
-                        df.panToExtent(lyr.getSelectedExtent())
-                        df.scale = 50000
-
-                    mxd.save()
-                    del mxd
+    settings = {'spatialReference': sr, 'panLayer': 'Assignments', 'scale': 50000, 'replace': None}
+    mxd_batch.setMxds(targetStructure, settings, mxdWorkers, arcpy.AddMessage, arcpy.AddWarning)
 
 def main():
+    copyStructure()
+    time.sleep(2)
     localizeDatabase()
     localizeMXD()
 
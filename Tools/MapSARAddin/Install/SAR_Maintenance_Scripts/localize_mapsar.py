@@ -26,11 +26,8 @@
 # ---------------------------------------------------------------------------
 
 # Import arcpy module
-import arcpy, sys, os, distutils
-from arcpy import env
-from os.path import join, abspath
-from os import walk
-from distutils.core import setup
+import arcpy
+import mxd_batch
 
 # Get parameters from user input
 # 0. Input folder to walk to look for all mxd files - folder
@@ -45,6 +42,9 @@ InputDatabase = '{0}\\SAR_Default.gdb'.format(MXDFolder)
 arcpy.env.overwriteOutput = True
 arcpy.env.workspace = InputDatabase
 
+# Processes setting the spatial reference on the mxd files, 1 sets them one at a time
+mxdWorkers = 1
+
 def localizeDatabase():
 
     # Copy FC's to the new database
@@ -59,21 +59,10 @@ def localizeDatabase():
 
 def localizeMXD():
 
-    # Walk through the folder structure, look at each mxd, set it's new spatial reference
-    # and adjust the source data path to match the new database.
+    # Set the new spatial reference on each mxd that changed since the last run
     arcpy.AddMessage('Seting spatial reference on mxd files')
-    for root, dirs, files in walk(MXDFolder):
-         for file in files:
-                abspath = (join(root, file))
-                if abspath.find(".mxd")>0:
-                    arcpy.AddMessage('Setting Spatial Reference on file {0}'.format(abspath))
-                    mxd = arcpy.mapping.MapDocument(abspath)
-                    for df in arcpy.mapping.ListDataFrames(mxd):
-                        df.scale = 100000
-                        df.spatialReference = newSpatialReference
-
-                    mxd.save()
-                    del mxd
+    settings = {'spatialReference': newSpatialReference, 'panLayer': None, 'scale': 100000, 'replace': None}
+    mxd_batch.setMxds(MXDFolder, settings, mxdWorkers, arcpy.AddMessage, arcpy.AddWarning)
 
 def main():
     localizeDatabase()
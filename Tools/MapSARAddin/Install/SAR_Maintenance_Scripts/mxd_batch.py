@@ -0,0 +1,263 @@
+#-------------------------------------------------------------------------------
+# Name:        mxd_batch
+# Purpose:     Set the spatial reference, extent and scale of every map document
+#              in a MapSAR folder structure from a pool of processes, skipping
+#              documents that have not changed since the last run
+#
+# Author:      SMSR
+# Copyright:   (c) SMSR 2013
+# Licence:
+#     MapSAR wilderness search and rescue GIS data model and related python scripting
+#     Copyright (C) 2012  - Jon Pedder & SMSR
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+#
+# A manifest in the top folder keeps, for each map document, the modification
+# time and size it had after it was last saved and the settings it was saved
+# with. A document whose time, size and settings still match is left alone.
+# Files copied from a source structure are kept in the manifest by the time and
+# size of the source, so only new or changed files are copied again.
+# Run processMxds or setMxds from a script's __main__ block, on Windows every worker
+# imports the main script again.
+#
+# settings is a dict with
+#   spatialReference   spatial reference set on every data frame
+#   panLayer           layer whose extent every data frame pans to, or None
+#   scale              scale set on every data frame, or None
+#   replace            (old, new) workspace paths to replace, or None
+#
+# Run this file directly for the benchmark with a stand in for ArcGIS.
+
+import hashlib, json, os, shutil, sys, time
+
+MANIFEST_NAME = 'mxd_manifest.json'
+
+def findMxds(folder):
+    """ Every map document under folder """
+    found = []
+    for root, dirs, files in os.walk(folder):
+        for name in files:
+            if name.lower().endswith('.mxd'):
+                found.append(os.path.join(root, name))
+    return(sorted(found))
+
+def fileStamp(path):
+    """ [modification time, size] of path """
+    stat = os.stat(path)
+    return([stat.st_mtime, stat.st_size])
+
+def settingsKey(settings):
+    return(hashlib.md5(repr(sorted(settings.items()))).hexdigest())
+
+class Manifest(object):
+    """ File stamps from the last run, kept in MANIFEST_NAME in folder """
+    def __init__(self, folder):
+        self.folder = folder
+        self.path = os.path.join(folder, MANIFEST_NAME)
+        self.copied = {}
+        self.mxds = {}
+        if os.path.isfile(self.path):
+            f = open(self.path)
+            try:
+                saved = json.load(f)
+            except ValueError:
+                saved = {}
+            finally:
+                f.close()
+            self.copied = saved.get('copied', {})
+            self.mxds = saved.get('mxds', {})
+
+    def key(self, path):
+        return(os.path.normcase(os.path.relpath(path, self.folder)))
+
+    def isCurrent(self, path, key):
+        """ True if the document is as it was saved with the settings of key """
+        entry = self.mxds.get(self.key(path))
+        return entry is not None and os.path.isfile(path) and entry == fileStamp(path) + [key]
+
+    def record(self, path, key):
+        self.mxds[self.key(path)] = fileStamp(path) + [key]
+
+    def save(self):
+        if not os.path.isdir(self.folder):
+            os.makedirs(self.folder)
+        f = open(self.path, 'w')
+        try:
+            json.dump({'copied': self.copied, 'mxds': self.mxds}, f, indent=0, sort_keys=True)
+        finally:
+            f.close()
+
+def copyFile(sourcePath, targetPath, manifest):
+    """ Copy sourcePath to targetPath unless it is unchanged since it was last copied.
+    Returns True if it was copied """
+    key = manifest.key(targetPath)
+    stamp = fileStamp(sourcePath)
+    if manifest.copied.get(key) == stamp and os.path.exists(targetPath):
+        return False
+    folder = os.path.dirname(targetPath)
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    shutil.copy2(sourcePath, targetPath)
+    manifest.copied[key] = stamp
+    return True
+
+def copyTree(source, target, manifest, log=None):
+    """ Copy the files of source to target that are new or have changed since they
+    were last copied, or are missing from target. A file geodatabase is copied
+    whole when any of its files changed. Returns (copied, skipped) """
+    copied = 0
+    skipped = 0
+    for root, dirs, files in os.walk(source):
+        targetRoot = os.path.join(target, os.path.relpath(root, source))
+        pairs = [(os.path.join(root, name), os.path.join(targetRoot, name)) for name in files
+                 if name != MANIFEST_NAME]
+        if root.lower().endswith('.gdb'):
+            if all(manifest.copied.get(manifest.key(targetPath)) == fileStamp(sourcePath) and
+                   os.path.exists(targetPath) for sourcePath, targetPath in pairs):
+                skipped += len(pairs)
+                continue
+            for sourcePath, targetPath in pairs:
+                manifest.copied.pop(manifest.key(targetPath), None)
+        for sourcePath, targetPath in pairs:
+            if copyFile(sourcePath, targetPath, manifest):
+                copied += 1
+                if log and copied % 500 == 0:
+                    log('{0} files copied'.format(copied))
+            else:
+                skipped += 1
+    return(copied, skipped)
+
+def processMxd(task):
+    """ Apply settings to one map document and save it. Returns (path, seconds, error) """
+    path, settings = task
+    start = time.time()
+    try:
+        import arcpy
+        mxd = arcpy.mapping.MapDocument(path)
+        try:
+            if settings.get('replace'):
+                mxd.findAndReplaceWorkspacePaths(settings['replace'][0], settings['replace'][1])
+            for df in arcpy.mapping.ListDataFrames(mxd):
+                df.spatialReference = settings['spatialReference']
+                if settings.get('panLayer'):
+                    lyr = arcpy.mapping.ListLayers(mxd, settings['panLayer'], df)[0]
+                    df.panToExtent(lyr.getSelectedExtent())
+                if settings.get('scale'):
+                    df.scale = settings['scale']
+            mxd.save()
+        finally:
+            del mxd
+    except Exception as err:
+        return(path, time.time() - start, str(err))
+    return(path, time.time() - start, None)
+
+def _setExecutable():
+    """ Inside ArcMap sys.executable is ArcMap.exe, the workers must run python """
+    if os.name == 'nt' and not os.path.basename(sys.executable).lower().startswith('python'):
+        import multiprocessing
+        multiprocessing.set_executable(os.path.join(sys.exec_prefix, 'pythonw.exe'))
+
+def processMxds(folder, settings, workers=1, log=None, process=processMxd):
+    """ Apply settings to the map documents under folder that changed since the
+    last run, from workers processes. Returns (processed, skipped, failed) """
+    manifest = Manifest(folder)
+    key = settingsKey(settings)
+    paths = findMxds(folder)
+    todo = [path for path in paths if not manifest.isCurrent(path, key)]
+    if log:
+        log('{0} map documents, {1} unchanged'.format(len(paths), len(paths) - len(todo)))
+
+    tasks = [(path, settings) for path in todo]
+    if workers < 2 or len(tasks) < 2:
+        results = [process(task) for task in tasks]
+    else:
+        import multiprocessing
+        _setExecutable()
+        pool = multiprocessing.Pool(min(workers, len(tasks)))
+        try:
+            results = pool.map(process, tasks, 1)
+        finally:
+            pool.close()
+            pool.join()
+
+    failed = []
+    for path, seconds, error in results:
+        if error is None:
+            manifest.record(path, key)
+            if log:
+                log('Set {0} in {1:.1f} sec'.format(path, seconds))
+        else:
+            failed.append((path, error))
+    manifest.save()
+    return(len(results) - len(failed), len(paths) - len(todo), failed)
+
+def setMxds(folder, settings, workers=1, log=None, warn=None):
+    """ processMxds, reporting each document that failed to warn and the totals
+    to log. Returns (processed, skipped, failed) """
+    processed, skipped, failed = processMxds(folder, settings, workers, log)
+    if warn:
+        for path, error in failed:
+            warn('Could not set spatial reference on file {0}: {1}'.format(path, error))
+    if log:
+        log('{0} mxd files set, {1} unchanged'.format(processed, skipped))
+    return(processed, skipped, failed)
+
+def _fakeProcess(task):
+    """ Stands in for processMxd, rewrites the document after a delay """
+    path, settings = task
+    time.sleep(0.05)
+    f = open(path, 'ab')
+    try:
+        f.write(b'saved')
+    finally:
+        f.close()
+    return(path, 0.05, None)
+
+def benchmark(templates=60, workers=4):
+    """ Copy and localize a structure of templates three times, as a first run, an
+    unchanged rerun and a rerun after one template changed """
+    import tempfile
+
+    base = tempfile.mkdtemp()
+    try:
+        source = os.path.join(base, 'source')
+        target = os.path.join(base, 'target')
+        for i in range(templates):
+            folder = os.path.join(source, 'Map_Templates', 'Group{0}'.format(i % 6))
+            if not os.path.isdir(folder):
+                os.makedirs(folder)
+            f = open(os.path.join(folder, 'Template{0}.mxd'.format(i)), 'wb')
+            f.write(b'mxd' * 1000)
+            f.close()
+
+        settings = {'spatialReference': 'NAD 1983 UTM Zone 11N', 'panLayer': 'Assignments', 'scale': 50000, 'replace': None}
+        for run in ('first run', 'unchanged', 'one changed'):
+            if run == 'one changed':
+                time.sleep(0.01)
+                f = open(os.path.join(source, 'Map_Templates', 'Group0', 'Template0.mxd'), 'ab')
+                f.write(b'edit')
+                f.close()
+            start = time.time()
+            manifest = Manifest(target)
+            copied, skipped = copyTree(source, target, manifest)
+            manifest.save()
+            processed, unchanged, failed = processMxds(target, settings, workers, process=_fakeProcess)
+            print('{0}: {1} copied, {2} processed, {3} unchanged in {4:.2f} sec'.format(
+                run, copied, processed, unchanged, time.time() - start))
+    finally:
+        shutil.rmtree(base)
+
+if __name__ == '__main__':
+    benchmark()
@@ -26,72 +26,66 @@
 #-------------------------------------------------------------------------------
 #-------------------------------------------------------------------------------
 
-import arcpy
+import arcpy, time
 import Make_Assignments_Tasks as tasks
 import MapSARfunctions as mapsar
 import SetMapElements as mapElms
+import ddp_export
 
 # Set enviroment
 from arcpy import env
 
-# Gather input parameters from user
-# 0. SourceFile must be DDP enabled - string
-# 1. Folder to store pdf product - string
-# 2. Select ALL or SELECTION - string
-# 3. PageRange (1,2,5-7 etc) - string
-# 4. Map scale
-# 5. Include the Task form - boolean
-
-TargetFile = arcpy.GetParameterAsText(0)
-mxd = arcpy.mapping.MapDocument(TargetFile)
-
-PDFlocation = arcpy.GetParameterAsText(1)
-aSelection = arcpy.GetParameterAsText(2)
-Printpages = arcpy.GetParameterAsText(3)
-if Printpages != '':
-    PageRange = mapsar.getPrintRange(Printpages)
-aMapScale = arcpy.GetParameterAsText(4)
-aTask = arcpy.GetParameterAsText(5)
-aLayers = arcpy.GetParameterAsText(6)
-aKML = arcpy.GetParameterAsText(7)
-# Set Vars and overwrite option to true
-arcpy.env.overwriteOutput = True
-
-
-
-def doDDP(aSelection, pageNum, aTask,PDFlocation,mxd):
-    """ Input aSelection, pageNum, aTask, mxd """
-    try:
-        # Get current date and time from system
-        now = datetime.datetime.now()
-        todaydate = now.strftime("%m-%d-%Y")
-        todaytime = now.strftime("%H.%M %p")
-
-        # For 10.2 compatibility removed quotes from query
-        # iQuery = '"Assignments.Assignment_Number" = {0}'.format(pageNum)
-
-        iQuery = 'Assignments.Assignment_Number = {0}'.format(pageNum)
-
-        ddp = mxd.dataDrivenPages
-        indexLayer = ddp.indexLayer
-        arcpy.SelectLayerByAttribute_management(indexLayer, "NEW_SELECTION",iQuery)
-
-        # Set Team Logo, Declination and Scale Bar
-        mapElms.setMapElements(mxd)
-
-        arcpy.AddMessage("Creating Map for Assignment # {0} : {1}\Assignment_Map_{2}.pdf".format(str(pageNum), PDFlocation, str(pageNum)))
-
-        # Set map scale
-        df = arcpy.mapping.ListDataFrames(mxd, "MapSAR")[0]
-        df.scale = aMapScale
-
-        ddp.exportToPDF('{0}/Team_Assignment_Map_{1}.pdf'.format(PDFlocation,pageNum), "SELECTED")
-        if aTask == 'true':
-            aRows = arcpy.SearchCursor(indexLayer)
-            tasks.assignmentExport(PDFlocation, aSelection, aRows)
-
-    except:
-        arcpy.AddWarning('There is no assignment # {0} in the system'.format(pageNum))
+# Processes used to export the maps, 1 exports them in ArcMap one after the other.
+# With more, each process opens its own copy of the saved map document
+ddpWorkers = 1
+
+def prepareDDP(mxd, PDFlocation, workers):
+    """ The part of the export that is the same on every page. Sets the scale bar,
+    logo and declination once, returns the exporter arguments and the seconds taken """
+    start = time.time()
+    # Set Team Logo, Declination and Scale Bar
+    mapElms.setMapElements(mxd)
+    if workers > 1:
+        # Worker processes open their own copy, so the elements are saved in it first
+        mxd.save()
+        args = (mxd.filePath, PDFlocation, aMapScale)
+    else:
+        args = (None, PDFlocation, aMapScale, mxd)
+    return(args, time.time() - start)
+
+def exportPages(pages, aTask, PDFlocation, mxd):
+    """ Export the maps of pages, with ddpWorkers processes when there is more than
+    one, then the task forms of every map made in one batch """
+    args, prepareTime = prepareDDP(mxd, PDFlocation, ddpWorkers)
+
+    if ddpWorkers > 1:
+        arcpy.AddMessage("Exporting {0} maps with {1} processes".format(len(pages), ddpWorkers))
+    start = time.time()
+    # Each page only selects its assignment and exports
+    results = ddp_export.exportPages(pages, ddpWorkers, ddp_export.ArcpyExporter, args)
+    exportTime = time.time() - start
+
+    made = []
+    pageTime = 0.0
+    for page, filename, seconds, pid, error in results:
+        pageTime += seconds
+        if error is None:
+            arcpy.AddMessage("Created Map for Assignment # {0} : {1} in {2:.1f} sec".format(page, filename, seconds))
+            made.append(page)
+        elif error == ddp_export.NO_ASSIGNMENT:
+            arcpy.AddWarning('There is no assignment # {0} in the system'.format(page))
+        else:
+            arcpy.AddWarning('Could not create the map for assignment # {0}: {1}'.format(page, error))
+
+    if results:
+        arcpy.AddMessage("Prepare {0:.1f} sec, {1} pages {2:.1f} sec, {3:.2f} sec a page".format(
+            prepareTime, len(results), exportTime, pageTime / len(results)))
+
+    if aTask == 'true' and made:
+        indexLayer = mxd.dataDrivenPages.indexLayer
+        iQuery = 'Assignments.Assignment_Number IN ({0})'.format(','.join([str(p) for p in made]))
+        arcpy.SelectLayerByAttribute_management(indexLayer, "NEW_SELECTION", iQuery)
+        tasks.assignmentExport(PDFlocation, aSelection, arcpy.SearchCursor(indexLayer), taskLookups)
 
 def exportKML(Assignments_KML,aMapScale):
     # Local variables:
@@ -107,42 +101,72 @@ def exportKML(Assignments_KML,aMapScale):
         err = arcpy.GetMessages()
         arcpy.AddWarning('Unable to produce GPS assignments\nError {0}'.format(err))
 
-# Check that DDP is enabled on the mxd. If not exit with an error
-if(mxd.isDDPEnabled):
-
-    # First check selected layers and turn them on
-    aSelectedLayers = aLayers.split(';')
-    mapsar.layersOn(mxd,aSelectedLayers)
-    # Populate the current analysis and base data to target mxd
-    mapsar.populateBaseData(mxd)
-
-    if 'Analysis' in aSelectedLayers:
-        mapsar.populateAnalysisData(Targetmxd)
-
-    # Print the DDP assignment
-    # Check the selection parameter aSelection, process either the SELECTION or ALL assignments
-    if aSelection == "SELECTION":
-        arcpy.AddMessage("Assignments Selected are  " + str(sorted(PageRange)))
-        for p in sorted(PageRange):
-            doDDP(aSelection,p,aTask,PDFlocation,mxd)
-
-    if aSelection == "ALL":
-        fc = "Assignments"
-        arcpy.SelectLayerByAttribute_management (fc, "CLEAR_SELECTION")
-        PageRange = [row[0] for row in arcpy.da.SearchCursor(fc, ("Assignments.Assignment_Number"))]
-        arcpy.AddMessage("Assignments Selected are  " + str(sorted(PageRange)))
-        for p in sorted(PageRange):
-            doDDP(aSelection,p,aTask,PDFlocation,mxd)
-
-    if aKML == 'true':
-        Assignments_KML = '{0}/Team_Assignments_GPS.kmz'.format(PDFlocation)
-        exportKML(Assignments_KML, aMapScale)
-
-    # Clear the selection and refresh the active view
-    arcpy.SelectLayerByAttribute_management("Assignments", "CLEAR_SELECTION")
-    arcpy.RefreshActiveView()
-
-else:
-  arcpy.AddError("Select another template, " + SourceFile + " doesn't have DDP enabled")
-
-del mxd
+if __name__ == '__main__':
+    # Gather input parameters from user
+    # 0. SourceFile must be DDP enabled - string
+    # 1. Folder to store pdf product - string
+    # 2. Select ALL or SELECTION - string
+    # 3. PageRange (1,2,5-7 etc) - string
+    # 4. Map scale
+    # 5. Include the Task form - boolean
+
+    TargetFile = arcpy.GetParameterAsText(0)
+    mxd = arcpy.mapping.MapDocument(TargetFile)
+
+    PDFlocation = arcpy.GetParameterAsText(1)
+    aSelection = arcpy.GetParameterAsText(2)
+    Printpages = arcpy.GetParameterAsText(3)
+    if Printpages != '':
+        PageRange = mapsar.getPrintRange(Printpages)
+    aMapScale = arcpy.GetParameterAsText(4)
+    aTask = arcpy.GetParameterAsText(5)
+    aLayers = arcpy.GetParameterAsText(6)
+    aKML = arcpy.GetParameterAsText(7)
+    # Set Vars and overwrite option to true
+    arcpy.env.overwriteOutput = True
+
+    # Lookup tables for the task forms, shared by every page of the run
+    taskLookups = tasks.AssignmentLookups()
+
+    # Check that DDP is enabled on the mxd. If not exit with an error
+    if(mxd.isDDPEnabled):
+
+        # First check selected layers and turn them on
+        aSelectedLayers = aLayers.split(';')
+        mapIndex = mapsar.layersOn(mxd,aSelectedLayers)
+        # Populate the current analysis and base data to target mxd
+        mapsar.populateBaseData(mxd, mapIndex)
+
+        if 'Analysis' in aSelectedLayers:
+            mapsar.populateAnalysisData(mxd, mapIndex)
+
+        # Print the DDP assignment
+        # Check the selection parameter aSelection, process either the SELECTION or ALL assignments
+        pages = []
+        if aSelection == "SELECTION":
+            pages = sorted(PageRange)
+
+        if aSelection == "ALL":
+            fc = "Assignments"
+            arcpy.SelectLayerByAttribute_management (fc, "CLEAR_SELECTION")
+            pages = sorted([row[0] for row in arcpy.da.SearchCursor(fc, ("Assignments.Assignment_Number"))])
+
+        if pages:
+            arcpy.AddMessage("Assignments Selected are  " + str(pages))
+            exportPages(pages, aTask, PDFlocation, mxd)
+
+        if aKML == 'true':
+            Assignments_KML = '{0}/Team_Assignments_GPS.kmz'.format(PDFlocation)
+            exportKML(Assignments_KML, aMapScale)
+
+        if aTask == 'true':
+            taskLookups.report()
+
+        # Clear the selection and refresh the active view
+        arcpy.SelectLayerByAttribute_management("Assignments", "CLEAR_SELECTION")
+        arcpy.RefreshActiveView()
+
+    else:
+        arcpy.AddError("Select another template, " + TargetFile + " doesn't have DDP enabled")
+
+    del mxd
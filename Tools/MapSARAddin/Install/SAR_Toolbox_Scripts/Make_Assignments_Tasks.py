@@ -24,201 +24,128 @@
 #-------------------------------------------------------------------------------
 ########################################################################
 
-import arcpy, datetime
+import arcpy
 import MapSARfunctions as mapsar
+import fdf_writer
 
 # Set enviroment
 from arcpy import env
 
-def readPeriods(Period):
-    """ # loops through operation periods and reads values into vars based on Op number pVar for Period
-    # pList = [0] Weather, [1] Incident_Commander, [2] Planning_Chief, [3] Operations_Chief, [4] Logistics_Chief,
-    [5] Air_Ops_Chief, [6] Safety_Message, [7] Primary_Comms, [8] Emergency_Comms, [9] Start_Date """
-    if Period:
-        iField = arcpy.AddFieldDelimiters("Operation_Period", "Period")
-        iQuery = "{0} = {1}".format(iField, Period)
-        rowPeriod = arcpy.SearchCursor("Operation_Period", iQuery)
-        pList = []
-        x = None
-        for p in rowPeriod:
-            pList = [p.Weather, p.Incident_Commander, p.Planning_Chief, p.Operations_Chief, \
-                     p.Logistics_Chief, p.Air_Operations_Chief, p.Safety_Message, p.Primary_Comms, p.Emergency_Comms, p.Start_Date]
-        return(pList)
-
-def readTeams(Team):
-    """     # loops through Teams and reads values into vars based on Team name tList for Team
-    # tList = [0] Team_Type, [1] radio_Call_Sign """
-    if Team:
-        iField = arcpy.AddFieldDelimiters("Teams", "Team_Name")
-        iQuery = "{0} = '{1}'".format(iField, Team)
-        rowTeam = arcpy.SearchCursor("Teams", iQuery)
-        tList = []
-        t = None
-        for t in rowTeam:
-            tList = [t.Team_Type, t.radio_Call_Sign]
-
-        return(tList)
-
-
-def readTeamMembers(Team):
-    """ Loop through team members FC reads in the field values to
-    # mDict is a dictionary using role as the Key and the mList tuple for field values
-    # mList Fields read: [0] Name, [1] Role, [2] Team_Name, [3] Originating_Team, [4] Skills, [5] Total_Weight """
-    if Team:
-        fcTM = "Team_Members"
-        qTeam = "{0} = '{1}'".format(arcpy.AddFieldDelimiters(fcTM,"Team_Name"),Team)
-        members = arcpy.SearchCursor(fcTM,qTeam)
-
-        memNum = 0
-        vRole = ""
-        mList = []
-        mDict = {}
-
-        for m in members:
-            if m.isLeader == 1:
-                vRole = "Team Leader"
-            else:
-                memNum += 1
-                vRole = "{0}.{1}".format("Team Member",memNum)
-            mList = [m.Name, m.Role, m.Team_Name, m.Originating_Team, m.Skills, m.Total_Weight]
-            mDict[vRole] = mList;
-        return(mDict)
-
-def readIncident():
-    """ Reads information from the Incident_Information FC """
-    # Pull data from Incident_Information FC
-    iRows = arcpy.SearchCursor("Incident_Information")
-    # iList = [0] Incident_Name
-    iList = []
-    for i in iRows:
-        iList.append(i.Incident_Name)
-    return(iList)
-
-def clearNulls(myList):
-    """ Pass in list parameter, clears out NULL values in list items """
-        # Determine item type
-    for i in range(len(myList)):
-        myType = type(myList[i])
-        if myType is str or myType is unicode:
-            if 'NULL' in myList[i]:
-                myList[i] = ''
-
-        elif myType is int or myType is float or myType is long:
-            if not myList[i] > 0:
-                myList[i] = None
-    return(myList)
-
-def assignmentExport(output, aSelection, aRows):
+# Record keys for the values of the assignment, period and team lists
+ASSIGNMENT_KEYS = ['Assignment_Number', 'Description', 'Mileage', 'Status', 'Period', 'Team_Name',
+                   'Transportation', 'Personal_Equipment', 'Team_Equipment', 'Comm_Instructions', 'DeBrief_Location']
+PERIOD_KEYS = ['Weather', 'Incident_Commander', 'Planning_Chief', 'Operations_Chief', 'Logistics_Chief',
+               'Air_Operations_Chief', 'Safety_Message', 'Primary_Comms', 'Emergency_Comms', 'Start_Date']
+TEAM_KEYS = ['Team_Type', 'Radio_Call_Sign']
+
+class AssignmentLookups(object):
+    """ Operation periods, teams, team members and incident information for a run
+    of task forms. Each table is read once, the first time it is needed, and every
+    later lookup is answered from memory. period returns the values of PERIOD_KEYS,
+    team the values of TEAM_KEYS, members a dict of role to [Name, Role, Team_Name,
+    Originating_Team, Skills, Total_Weight] and incident the incident names """
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._incident = None
+        self._periods = None
+        self._teams = None
+        self._members = None
+
+    def _loaded(self, table):
+        """ Count the lookup, True if the table is already in memory """
+        if table is None:
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+
+    def incident(self):
+        if not self._loaded(self._incident):
+            self._incident = [row[0] for row in arcpy.da.SearchCursor("Incident_Information", ["Incident_Name"])]
+        return(list(self._incident))
+
+    def period(self, Period):
+        if not Period:
+            return None
+        if not self._loaded(self._periods):
+            fields = ["Period", "Weather", "Incident_Commander", "Planning_Chief", "Operations_Chief", "Logistics_Chief",
+                      "Air_Operations_Chief", "Safety_Message", "Primary_Comms", "Emergency_Comms", "Start_Date"]
+            self._periods = {}
+            with arcpy.da.SearchCursor("Operation_Period", fields) as rows:
+                for row in rows:
+                    self._periods[row[0]] = list(row[1:])
+        return(list(self._periods.get(Period, [])))
+
+    def team(self, Team):
+        if not Team:
+            return None
+        if not self._loaded(self._teams):
+            self._teams = {}
+            with arcpy.da.SearchCursor("Teams", ["Team_Name", "Team_Type", "Radio_Call_Sign"]) as rows:
+                for row in rows:
+                    self._teams[row[0]] = list(row[1:])
+        return(list(self._teams.get(Team, [])))
+
+    def members(self, Team):
+        if not Team:
+            return None
+        if not self._loaded(self._members):
+            # The leader is "Team Leader", the others "Team Member.1", ".2" ... per team in table order
+            fields = ["Team_Name", "isLeader", "Name", "Role", "Originating_Team", "Skills", "Total_Weight"]
+            self._members = {}
+            memNum = {}
+            with arcpy.da.SearchCursor("Team_Members", fields) as rows:
+                for row in rows:
+                    mDict = self._members.setdefault(row[0], {})
+                    if row[1] == 1:
+                        vRole = "Team Leader"
+                    else:
+                        memNum[row[0]] = memNum.get(row[0], 0) + 1
+                        vRole = "{0}.{1}".format("Team Member", memNum[row[0]])
+                    mDict[vRole] = [row[2], row[3], row[0], row[4], row[5], row[6]]
+        mDict = self._members.get(Team, {})
+        return(dict((k, list(v)) for k, v in mDict.iteritems()))
+
+    def report(self):
+        arcpy.AddMessage("Task form lookups: {0} from memory, {1} table reads".format(self.hits, self.misses))
+
+def assignmentExport(output, aSelection, aRows, lookups=None):
+    """ Write a task form for each assignment in aRows. Pass the same AssignmentLookups
+    to every call of a run so the lookup tables are only read once """
+    if lookups is None:
+        lookups = AssignmentLookups()
+    # Same time stamp on every form of the run
+    prepared = fdf_writer.prepStamp()
+    forms = []
     for row in aRows:
-        # Clean out list and dict for each iteration
-        aList = []
-        iList = []
-        pList = []
-        tList = []
-        mDict = {}
-
         # Assignments: aList [0] Assignment_Number, [1] Description, [2] Mileage, [3] Status, [4] Period, [5] Team_Name, [6] Transportation, [7] Personal_Equipment, [8] Team_Equipment
         # [9] Comm_Instructions, [10] DeBrief_Location
+        aList = [row.getValue("Assignments.{0}".format(key)) for key in ASSIGNMENT_KEYS]
 
-        aList = [row.getValue("Assignments.Assignment_Number"), row.getValue("Assignments.Description"), row.getValue("Assignments.Mileage"), \
-                row.getValue("Assignments.Status"), row.getValue("Assignments.Period"), row.getValue("Assignments.Team_Name"), \
-                row.getValue("Assignments.Transportation"), row.getValue("Assignments.Personal_Equipment"), row.getValue("Assignments.Team_Equipment"), \
-                row.getValue("Assignments.Comm_Instructions"), row.getValue("Assignments.DeBrief_Location")]
-
-        iList = readIncident()
-        pList = readPeriods(aList[4])
-        tList = readTeams(aList[5])
-        mDict = readTeamMembers(aList[5])
-
-
-        # Get current date and time from system
-        now = datetime.datetime.now()
-        todaydate = now.strftime("%m-%d-%Y")
-        todaytime = now.strftime("%H.%M %p")
-
-        # CREATE FDF File, Adobe format that requires an PDF file template.
-
-        # Tuples containing data, iList = Incident, aList = Assignment, tList = Teams, pList = Periods
-        # iList =   [0] Incident_Name
-        # aList     [0] Assignment_Number, [1] Description, [2] Mileage, [3] Status, [4] Period, [5] Team_Name,
-        #           [6] Transportation, [7] Personal_Equipment, [8] Team_Equipment
-        #           [9] Comm_Instructions, [10] DeBrief_Location
-        # tList =   [0] Team_Type, [1] radio_Call_Sign
-        # pList =   [0] Weather, [1] Incident_Commander, [2] Planning_Chief, [3] Operations_Chief, [4] Logistics_Chief,
-        #           [5] Air_Ops_Chief, [6] Safety_Message, [7] Primary_Comms, [8] Emergency_Comms, [9] Start_Date
-
-        filename = "{0}\Assignment_Task_{1}_.fdf".format(output, str(aList[0]))
-        arcpy.AddMessage("Creating Task Form for Assignment {0} : {1} ".format(str(aList[0]),filename))
-
-        # Open new FDF file
-        txt = open (filename, "w")
-        txt.write("%FDF-1.2\n")
-        txt.write("%????\n")
-        txt.write("1 0 obj<</FDF<</F(Task_Assignment_Template.pdf)/Fields 2 0 R>>>>\n")
-        txt.write("endobj\n")
-        txt.write("2 0 obj[\n")
-        txt.write ("\n")
+        iList = lookups.incident()
+        pList = lookups.period(aList[4])
+        tList = lookups.team(aList[5])
+        mDict = lookups.members(aList[5])
 
+        # Form values keyed by field name, tables with no match add nothing
+        record = dict(prepared)
         if iList:
-            iList = clearNulls(iList)
-            txt.write("<</T(IncidentName)/V({0})>>\n".format(iList[0]))
+            record['Incident_Name'] = iList[0]
         if pList:
-            pList = clearNulls(pList)
-            txt.write("<</T(Weather)/V({0})>>\n".format(pList[0]))
-            txt.write("<</T(IC)/V({0})>>\n".format(pList[1]))
-            txt.write("<</T(PreparedBy)/V({0})>>\n".format(pList[2]))
-            txt.write("<</T(Operations)/V({0})>>\n".format(pList[3]))
-            txt.write("<</T(Logistics)/V({0})>>\n".format(pList[4]))
-            txt.write("<</T(AirOps)/V({0})>>\n".format(pList[5]))
-            txt.write("<</T(SafetyMessage)/V({0})>>\n".format(pList[6]))
-            txt.write("<</T(PrimaryComs)/V({0})>>\n".format(pList[7]))
-            txt.write("<</T(EmergencyComs)/V({0})>>\n".format(pList[8]))
-            txt.write("<</T(StartDate)/V({0})>>\n".format(pList[9]))
-        if aList:
-            aList = clearNulls(aList)
-            txt.write("<</T(AssignmentNum)/V({0})>>\n".format(aList[0]))
-            txt.write("<</T(AssignDescription)/V({0})>>\n".format(aList[1]))
-            txt.write("<</T(AssignMileage)/V({0})>>\n".format(aList[2]))
-            txt.write("<</T(AssignStatus)/V({0})>>\n".format(aList[3]))
-            txt.write("<</T(AssignPeriod)/V({0})>>\n".format(aList[4]))
-            txt.write("<</T(AssignTeam)/V({0})>>\n".format(aList[5]))
-            txt.write("<</T(AssignTransportation)/V({0})>>\n".format(aList[6]))
-            txt.write("<</T(AssignPersonalEquipment)/V({0})>>\n".format(aList[7]))
-            txt.write("<</T(AssignTeamEquipment)/V({0})>>\n".format(aList[8]))
-            txt.write("<</T(AssignComInstructions)/V({0})>>\n".format(aList[9]))
-            txt.write("<</T(Assignlocation)/V({0})>>\n".format(aList[10]))
+            record.update(zip(PERIOD_KEYS, pList))
+        record.update(zip(ASSIGNMENT_KEYS, aList))
         if tList:
-            tList = clearNulls(tList)
-            txt.write("<</T(TeamType)/V({0})>>\n".format(tList[0]))
-            txt.write("<</T(TeamCallSign)/V({0})>>\n".format(tList[1]))
-
-        # Loop through each team member in mDict and write the the field and value value
-        # Fields read: [0] Name, [1] Role, [2] Team_Name, [3] Originating_Team, [4] Skills, [5] Total_Weight
+            record.update(zip(TEAM_KEYS, tList))
         if mDict:
-            for k, v in mDict.iteritems():
+            record['Members'] = mDict
 
-                v = clearNulls(v)
-                txt.write("<</T({0}.name)/V({1})>>\n".format(k,v[0]))
-                if v[1] != None:
-                    txt.write("<</T({0}.roll)/V({1})>>\n".format(k,v[1]))
-
-                txt.write("<</T({0}.team)/V({1})>>\n".format(k,v[2]))
-                txt.write("<</T({0}.origteam)/V({1})>>\n".format(k,v[3]))
-                if v[5] > 0:
-                    txt.write("<</T({0}.skillsandweight)/V({1} - weight = {2})>>\n".format(k,v[4],v[5]))
-                elif v[5] == None:
-                    txt.write("<</T({0}.skillsandweight)/V({1})>>\n".format(k,v[4]))
-
-        txt.write("<</T(PrepDate)/V({0})>>\n".format(todaydate))
-        txt.write("<</T(PrepTime)/V({0})>>\n".format(todaytime))
+        # CREATE FDF File, Adobe format that requires an PDF file template.
+        filename = "{0}\Assignment_Task_{1}_.fdf".format(output, str(aList[0]))
+        arcpy.AddMessage("Creating Task Form for Assignment {0} : {1} ".format(str(aList[0]),filename))
+        forms.append((filename, record))
 
-        # Close and write FDF file
-        txt.write("]\n")
-        txt.write("endobj\n")
-        txt.write("trailer\n")
-        txt.write("<</Root 1 0 R>>\n")
-        txt.write("%%EO\n")
-        txt.close ()
+    fdf_writer.writeForms(forms)
 
 
 if __name__ == '__main__':
@@ -234,26 +161,28 @@ if __name__ == '__main__':
         PageRange = mapsar.getPrintRange(Printpages)
 
     fc = "Assignments"
+    lookups = AssignmentLookups()
 
     # Print the Task assignments
-    # Check the selection parameter aSelection, process either the SELECTION or ALL assignments
-    if aSelection == "SELECTION":
+    # Check the selection parameter aSelection, process either the SELECTION or ALL assignments.
+    # All the assignments are selected at once and written in a single batch
+    aRows = None
+    if aSelection == "SELECTION" and PageRange:
         arcpy.AddMessage("Assignments Selected are  " + str(sorted(PageRange)))
-        for p in sorted(PageRange):
-            iQuery = 'Assignments.Assignment_Number = {0}'.format(p)
-            arcpy.SelectLayerByAttribute_management(fc, "NEW_SELECTION",iQuery)
-            aRows = arcpy.SearchCursor(fc)
-            assignmentExport(PDFlocation, aSelection, aRows)
+        iQuery = 'Assignments.Assignment_Number IN ({0})'.format(','.join([str(p) for p in sorted(PageRange)]))
+        arcpy.SelectLayerByAttribute_management(fc, "NEW_SELECTION",iQuery)
+        aRows = arcpy.SearchCursor(fc)
 
     if aSelection == "ALL":
         arcpy.SelectLayerByAttribute_management (fc, "CLEAR_SELECTION")
         PageRange = [row[0] for row in arcpy.da.SearchCursor(fc, ("Assignments.Assignment_Number"))]
         arcpy.AddMessage("Assignments Selected are  " + str(sorted(PageRange)))
-        for p in sorted(PageRange):
-            iQuery = 'Assignments.Assignment_Number = {0}'.format(p)
-            arcpy.SelectLayerByAttribute_management(fc, "NEW_SELECTION",iQuery)
-            aRows = arcpy.SearchCursor(fc)
-            assignmentExport(PDFlocation, aSelection, aRows)
+        aRows = arcpy.SearchCursor(fc)
+
+    if aRows is not None:
+        assignmentExport(PDFlocation, aSelection, aRows, lookups)
+
+    lookups.report()
 
     # Clear the selection and refresh the active view
     arcpy.SelectLayerByAttribute_management("Assignments", "CLEAR_SELECTION")
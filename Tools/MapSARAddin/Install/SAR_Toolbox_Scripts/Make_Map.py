@@ -71,14 +71,14 @@ else:
     # Set visable layers first, then populate base data
     selectedParams = aLayers.split(';')
     arcpy.AddMessage(selectedParams)
-    mapsar.layersOn(Targetmxd,selectedParams)
+    mapIndex = mapsar.layersOn(Targetmxd,selectedParams)
 
      # Gather information to copy over base_data and analysis data
     if 'Analysis' in selectedParams:
-        mapsar.populateAnalysisData(Targetmxd)
+        mapsar.populateAnalysisData(Targetmxd, mapIndex)
     if aBase_Data == "true":
         # Populate the current base data to target mxd
-        mapsar.populateBaseData(Targetmxd)
+        mapsar.populateBaseData(Targetmxd, mapIndex)
 
     # EXPORT MAP STARTS HERE #
     ##########################
@@ -100,56 +100,11 @@ else:
     # Set Team Logo, Declination and Scale Bar
     mapElms.setMapElements(Targetmxd)
 
-    # Load dictionary of fetaure and field names
-    # DcenterOn = mapsar.initializeDcenterOn()
-    DcenterOn = mapsar.initializeDcenterOn()
-
-    # Build SQL query to get selection to center map around
-    # Keys = PLS,Single Asset,Single Clue,Single Assignment,Single Segment,All Assignments,All Segments
-    intList = ['Single Asset','Single Clue','Single Assignment','All Assignments']
-    strList = ['Single Segment','PLS','All Segments']
-
-    # Determine Featureclass and field name
-    # Tuple format - Feature class, display text, Layername, (Optional fields - field 1, field 2)
-    MapFC = DcenterOn[aKeyvalue][2]
-    MapField = DcenterOn[aKeyvalue][3]
+    # Layer and query to center the map on
+    MapFC, iQuery = mapsar.centerOnQuery(aKeyvalue, aSelectedvalue)
 
     arcpy.AddMessage("Generating Map {0}".format(MapName))
 
-    # arcpy.Addfieldelimiters here. Code revised for 10.2 compatability
-    # qField = arcpy.AddFieldDelimiters(MapFC, MapField)
-    if MapFC != 'Assignments':
-        qField = arcpy.AddFieldDelimiters(MapFC, MapField)
-    else:
-        qField = MapField
-
-    # Check if the selection is all features or single feature
-    # If it's all features
-    if aKeyvalue.startswith('All'):
-        # Check if the selection is an number or string
-        if aKeyvalue in intList:
-            iQuery = ('{0} > 0').format(qField)
-        elif aKeyvalue in strList:
-            iQuery = ("{0} > ''").format(qField)
-    # If it's a single feature
-    elif not aKeyvalue.startswith('All'):
-        # Check if the selection is an number or...
-        if aKeyvalue in intList:
-            # Pull search value from selection
-             if '-' in aSelectedvalue:
-                queryVal = aSelectedvalue.split('-')
-                iQuery = ('{0} = {1}').format(qField,int(queryVal[0]))
-             elif '-' not in aSelectedvalue:
-                iQuery = ('{0} = {1}').format(qField,int(aSelectedvalue))
-        # Check if the selection is an number or string
-        elif aKeyvalue in strList:
-            # Pull search value from selection
-            if '-' in aSelectedvalue:
-                queryVal = aSelectedvalue.split('-')
-                iQuery = ("{0} = '{1}'").format(qField,queryVal[0])
-            elif '-' not in aSelectedvalue:
-                iQuery = ("{0} = '{1}'").format(qField,aSelectedvalue)
-
     df = arcpy.mapping.ListDataFrames(Targetmxd, "MapSAR")[0]
     lyr = arcpy.mapping.ListLayers(Targetmxd, MapFC, df)[0]
 
@@ -172,4 +127,4 @@ else:
 
     # Clear vars
     Targetmxd.save()
-    del Targetmxd, df, lyr, MapFC, MapField
+    del Targetmxd, df, lyr, MapFC
@@ -0,0 +1,244 @@
+#-------------------------------------------------------------------------------
+# Name:        Make_Map_Batch.py
+# Purpose:     Make a batch of maps, standard or multiscale, from a job list.
+#              Each template is opened once, set up once and every map made
+#              from it is exported without saving the document in between.
+#
+# Author:      SMSR
+# Copyright:   (c) SMSR 2013
+# Use:          Run using Toolbox
+# Licence:
+#     MapSAR wilderness search and rescue GIS data model and related python scripting
+#     Copyright (C) 2012  - Jon Pedder & SMSR
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+#
+# The job list is a CSV file with a row per map and these columns, the same
+# values as the Make_Map and Make_MultiScale_Map tools take:
+#
+#   Template     mxd to make the map from
+#   Map_Name     name of the map and of the pdf
+#   Map_Title    title of the map
+#   Center_On    PLS, Single Asset, Single Clue, Single Assignment, Single Segment,
+#                All Assignments or All Segments
+#   Value        value picked for a Single key, e.g. 12 - Hasty trail search
+#   Scale        map scale, AUTO for standard maps. Main frame of multiscale maps
+#   Inset_Scale  inset frame scale, multiscale maps only
+#   DPI          pdf resolution, default 300
+#   Quality      pdf image quality, default BEST
+#   Layers       layers to make visible, separated by ;
+#   Base_Data    true to copy the current base data into the map
+#
+# Jobs are grouped by template in the order the templates first appear. The base
+# data and analysis layer files are saved once for the whole batch.
+
+# Import modules
+import arcpy, csv, os, time
+import MapSARfunctions as mapsar
+import SetMapElements as mapElms
+
+# Set enviroment
+from arcpy import env
+arcpy.env.overwriteOutput = True
+
+JOB_DEFAULTS = {'Map_Title': '', 'Value': '', 'Scale': 'AUTO', 'Inset_Scale': '',
+                'DPI': '300', 'Quality': 'BEST', 'Layers': '', 'Base_Data': 'false'}
+
+def readJobs(jobFile):
+    """ Read the job list, returns a list of job dicts keyed by column name """
+    jobs = []
+    f = open(jobFile, 'rb')
+    try:
+        for row in csv.DictReader(f, dialect='excel'):
+            job = dict(JOB_DEFAULTS)
+            for key, value in row.items():
+                if key is not None and value is not None and value.strip() != '':
+                    job[key.strip()] = value.strip()
+            if job.get('Template') and job.get('Map_Name') and job.get('Center_On'):
+                jobs.append(job)
+            else:
+                arcpy.AddWarning('Skipping job without a Template, Map_Name or Center_On: {0}'.format(row))
+    finally:
+        f.close()
+    return(jobs)
+
+def groupJobs(jobs):
+    """ Jobs grouped by template, templates in the order they first appear """
+    order = []
+    groups = {}
+    for job in jobs:
+        template = os.path.normcase(os.path.abspath(job['Template']))
+        if template not in groups:
+            order.append(template)
+            groups[template] = []
+        groups[template].append(job)
+    return([(template, groups[template]) for template in order])
+
+def jobSetup(job):
+    """ The part of a job applied to the document as a whole, jobs with the same
+    setup share it """
+    layers = tuple(sorted([l for l in job['Layers'].split(';') if l]))
+    return(layers, job['Base_Data'] == 'true')
+
+class BatchLayers(object):
+    """ Base data and analysis layer files, saved from the current map the first
+    time they are needed and reused for the rest of the batch """
+    def __init__(self):
+        self.baseLayer = None
+        self.analysisLayer = None
+
+    def base(self):
+        if self.baseLayer is None:
+            self.baseLayer = mapsar.saveBaseLayer()
+            arcpy.AddMessage('Base data copied to {0}'.format(self.baseLayer))
+        return(self.baseLayer)
+
+    def analysis(self):
+        if self.analysisLayer is None:
+            self.analysisLayer = mapsar.saveAnalysisLayer()
+        return(self.analysisLayer)
+
+def applySetup(mxd, index, setup, layerFiles):
+    """ Layer visibility, analysis and base data for a group of jobs """
+    layers, baseData = setup
+    mapsar.layersOn(mxd, list(layers), index)
+    if 'Analysis' in layers:
+        mapsar.populateAnalysisData(mxd, index, layerFiles.analysis(), save=False)
+    if baseData:
+        mapsar.populateBaseData(mxd, index, layerFiles.base(), save=False)
+
+def setText(elements, text):
+    for elm in elements:
+        elm.text = text
+
+def exportStandard(mxd, index, job, pdfFolder, DcenterOn):
+    """ Center, scale and export a standard map """
+    MapFC, iQuery = mapsar.centerOnQuery(job['Center_On'], job['Value'], DcenterOn)
+
+    df = [frame for frame in index.frames if frame.name == 'MapSAR'][0]
+    lyr = index.find(df, MapFC)[0]
+
+    # Use the SelectLayerByAttribute tool to select the center and zoom to the selection
+    arcpy.SelectLayerByAttribute_management(lyr, "NEW_SELECTION", iQuery)
+    df.zoomToSelectedFeatures()
+    if job['Scale'] == "AUTO":
+        df.scale = df.scale * 1.1
+    else:
+        df.scale = job['Scale']
+
+    # Clear the selection for printing, so it's not highlighted
+    arcpy.SelectLayerByAttribute_management(lyr, "CLEAR_SELECTION")
+
+    MapLocation = '{0}/{1}.pdf'.format(pdfFolder, job['Map_Name'])
+    arcpy.mapping.ExportToPDF(mxd, MapLocation, resolution=job['DPI'], image_quality=job['Quality'], georef_info="true")
+    return(MapLocation)
+
+def exportMultiScale(mxd, index, job, pdfFolder, DcenterOn):
+    """ Center and scale each frame and export a multiscale map """
+    MapFC, iQuery = mapsar.centerOnQuery(job['Center_On'], job['Value'], DcenterOn)
+
+    for df in index.frames:
+        lyr = index.find(df, MapFC)[0]
+        arcpy.SelectLayerByAttribute_management(lyr, "NEW_SELECTION", iQuery)
+
+        result = int(arcpy.GetCount_management(lyr).getOutput(0))
+        if result == 0:
+            arcpy.AddError('No Features Found, invalid query')
+        elif result == 1:
+            df.panToExtent(lyr.getSelectedExtent())
+            if 'Main' in df.name:
+                df.scale = job['Scale']
+            elif 'Inset' in df.name:
+                df.scale = job['Inset_Scale']
+
+        # clear selection so highlights don't print
+        arcpy.SelectLayerByAttribute_management(lyr, "CLEAR_SELECTION")
+
+    MapLocation = '{0}/{1}.pdf'.format(pdfFolder, job['Map_Name'])
+    arcpy.mapping.ExportToPDF(mxd, MapLocation, resolution=job['DPI'], image_quality=job['Quality'], georef_info="false")
+    return(MapLocation)
+
+def runTemplate(template, jobs, pdfFolder, layerFiles, DcenterOn):
+    """ Open template once and make every map of jobs from it.
+    Returns a list of (map name, pdf or None, seconds) """
+    results = []
+    start = time.time()
+    mxd = arcpy.mapping.MapDocument(template)
+    try:
+        if mxd.isDDPEnabled:
+            arcpy.AddError('{0} is enabled with DataDrivenPages, use Make Assignment Maps for it'.format(template))
+            return([(job['Map_Name'], None, 0.0) for job in jobs])
+
+        isMultiScale = 'multiscale' in mxd.tags
+        export = exportMultiScale if isMultiScale else exportStandard
+
+        index = mapsar.LayerIndex(mxd)
+        titleElms = arcpy.mapping.ListLayoutElements(mxd, "TEXT_ELEMENT", "MapTitle")
+        nameElms = arcpy.mapping.ListLayoutElements(mxd, "TEXT_ELEMENT", "MapName")
+
+        # Set Team Logo, Declination and Scale Bar
+        mapElms.setMapElements(mxd)
+        arcpy.AddMessage('Opened {0} in {1:.1f} sec'.format(template, time.time() - start))
+
+        # Jobs with the same layer setup together, so each setup is applied once
+        setup = None
+        for job in sorted(jobs, key=jobSetup):
+            jobStart = time.time()
+            try:
+                if jobSetup(job) != setup:
+                    setup = jobSetup(job)
+                    applySetup(mxd, index, setup, layerFiles)
+
+                setText(titleElms, "<BOL> " + job.get('Map_Title', '') + "</BOL>")
+                setText(nameElms, job['Map_Name'])
+
+                arcpy.AddMessage("Generating Map {0}".format(job['Map_Name']))
+                pdf = export(mxd, index, job, pdfFolder, DcenterOn)
+                seconds = time.time() - jobStart
+                arcpy.AddMessage('{0} done in {1:.1f} sec'.format(pdf, seconds))
+                results.append((job['Map_Name'], pdf, seconds))
+            except Exception as err:
+                seconds = time.time() - jobStart
+                arcpy.AddWarning('Map {0} failed: {1}'.format(job['Map_Name'], err))
+                results.append((job['Map_Name'], None, seconds))
+
+        # Save once, the template keeps the base data as the single map tools leave it
+        mxd.save()
+    finally:
+        del mxd
+
+    return(results)
+
+def runBatch(jobs, pdfFolder):
+    """ Make every map in jobs, returns a list of (map name, pdf or None, seconds) """
+    layerFiles = BatchLayers()
+    DcenterOn = mapsar.initializeDcenterOn()
+    start = time.time()
+    results = []
+    for template, templateJobs in groupJobs(jobs):
+        results.extend(runTemplate(template, templateJobs, pdfFolder, layerFiles, DcenterOn))
+
+    made = len([r for r in results if r[1] is not None])
+    arcpy.AddMessage('{0} of {1} maps made in {2:.1f} sec'.format(made, len(results), time.time() - start))
+    return(results)
+
+if __name__ == '__main__':
+    # Gather input parameters from user
+    # 0. Job list - csv file
+    # 1. Folder to store pdf products - string
+    jobFile = arcpy.GetParameterAsText(0)
+    PDFlocation = arcpy.GetParameterAsText(1)
+
+    runBatch(readJobs(jobFile), PDFlocation)
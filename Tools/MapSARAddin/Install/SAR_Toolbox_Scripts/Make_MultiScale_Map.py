@@ -73,10 +73,11 @@ if('multiscale' in Targetmxd.tags):
     # Set visable layers first, then populate base data
     selectedParams = aLayers.split(';')
     arcpy.AddMessage(selectedParams)
-    mapsar.layersOn(Targetmxd,selectedParams)
+    # Layers of the map, read once and shared by the steps below
+    mapIndex = mapsar.layersOn(Targetmxd,selectedParams)
 
     if 'Analysis' in selectedParams:
-        mapsar.populateAnalysisData(Targetmxd)
+        mapsar.populateAnalysisData(Targetmxd, mapIndex)
 
     # Use parameters from user input
     MapTitle = aMapTitle
@@ -85,7 +86,7 @@ if('multiscale' in Targetmxd.tags):
 
     # Populate the current base data to target mxd and frames
     if aBase_Data == "true":
-       mapsar.populateBaseData(Targetmxd)
+       mapsar.populateBaseData(Targetmxd, mapIndex)
 
     # Add text elements to the map
     for elm in arcpy.mapping.ListLayoutElements(Targetmxd, "TEXT_ELEMENT","MapTitle"):
@@ -98,65 +99,22 @@ if('multiscale' in Targetmxd.tags):
     mapElms.setMapElements(Targetmxd)
 
     # Load dictionary of fetaure and field names
-    # DcenterOn = mapsar.initializeDcenterOn()
     DcenterOn = mapsar.initializeDcenterOn()
 
-    # Build SQL query to get selection to center map around
-    # Keys = PLS,Single Asset,Single Clue,Single Assignment,Single Segment,All Assignments,All Segments
-    intList = ['Single Asset','Single Clue','Single Assignment','All Assignments']
-    strList = ['Single Segment','PLS','All Segments']
-
-    # Determine Featureclass and field name
-    # Tuple format - Feature class, display text, Layername, (Optional fields - field 1, field 2)
+    # Feature class to count the selection in, layer and query to center the map on
     fc = DcenterOn[aKeyvalue][0]
-    MapFC = DcenterOn[aKeyvalue][2]
-    MapField = DcenterOn[aKeyvalue][3]
+    MapFC, iQuery = mapsar.centerOnQuery(aKeyvalue, aSelectedvalue, DcenterOn)
 
     arcpy.AddMessage("Generating Map {0}".format(MapName))
 
-    # arcpy.Addfieldelimiters here. Code revised for 10.2 compatability
-    # qField = arcpy.AddFieldDelimiters(MapFC, MapField)
-    if MapFC != 'Assignments':
-        qField = arcpy.AddFieldDelimiters(MapFC, MapField)
-    else:
-        qField = MapField
-
-
-    # Check if the selection is all features or single feature
-    # If it's all features
-    if aKeyvalue.startswith('All'):
-        # Check if the selection is an number or string
-        if aKeyvalue in intList:
-            iQuery = ('{0} > 0').format(qField)
-        elif aKeyvalue in strList:
-            iQuery = ("{0} > ''").format(qField)
-    # If it's a single feature
-    elif not aKeyvalue.startswith('All'):
-        # Check if the selection is an number or...
-        if aKeyvalue in intList:
-            # Pull search value from selection
-             if '-' in aSelectedvalue:
-                queryVal = aSelectedvalue.split('-')
-                iQuery = ('{0} = {1}').format(qField,int(queryVal[0]))
-             elif '-' not in aSelectedvalue:
-                iQuery = ('{0} = {1}').format(qField,int(aSelectedvalue))
-        # Check if the selection is an number or string
-        elif aKeyvalue in strList:
-            # Pull search value from selection
-            if '-' in aSelectedvalue:
-                queryVal = aSelectedvalue.split('-')
-                iQuery = ("{0} = '{1}'").format(qField,queryVal[0])
-            elif '-' not in aSelectedvalue:
-                iQuery = ("{0} = '{1}'").format(qField,aSelectedvalue)
-
     # Zoom to the selected features
     # Use the SelectLayerByAttribute tool to select the center and zoom to the selection
 
     # center and set scales
-    frames = arcpy.mapping.ListDataFrames(Targetmxd)
+    frames = mapIndex.frames
     # Set map scale
     for df in frames:
-        lyr = arcpy.mapping.ListLayers(Targetmxd,MapFC,df)[0]
+        lyr = mapIndex.find(df,MapFC)[0]
         arcpy.SelectLayerByAttribute_management(lyr, "NEW_SELECTION",iQuery)
 
         result = int(arcpy.GetCount_management(fc).getOutput(0))
@@ -179,6 +137,6 @@ if('multiscale' in Targetmxd.tags):
     arcpy.mapping.ExportToPDF(Targetmxd,MapLocation, resolution = aDPI, image_quality = aQuality,georef_info = "false")
 
     # Clear vars
-    del Targetmxd, lyr, MapFC, MapField
+    del Targetmxd, lyr, MapFC
 else:
     arcpy.AddError('\nPlease select a map from the Multi_Scale_Maps templates\n')
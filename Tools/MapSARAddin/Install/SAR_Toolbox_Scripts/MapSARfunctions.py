@@ -30,17 +30,87 @@
 # import os, sys, pythonaddins
 # from arcpy import env
 
-def layersOn(mxd, selectedParams):
+class LayerIndex(object):
+    """ Layers of an mxd read once per data frame. Layers are looked up by name
+    (case insensitive, as ListLayers does) or by group path (layer.longName).
+    Use the frames in index.frames, layers removed or added through the index
+    keep it current """
+    def __init__(self, mxd):
+        import arcpy
+        self.mxd = mxd
+        self.frames = arcpy.mapping.ListDataFrames(mxd)
+        self._frames = {}
+        for frame in self.frames:
+            self.refresh(frame)
+
+    def refresh(self, frame):
+        """ Read the layers of frame again """
+        import arcpy
+        layers = arcpy.mapping.ListLayers(self.mxd, '', frame)
+        byName = {}
+        byPath = {}
+        for layer in layers:
+            byName.setdefault(layer.name.lower(), []).append(layer)
+            byPath[layer.longName.lower()] = layer
+        self._frames[id(frame)] = (layers, byName, byPath, {})
+
+    def layers(self, frame):
+        """ Every layer in frame, in table of contents order """
+        return self._frames[id(frame)][0]
+
+    def find(self, frame, name):
+        """ Layers named name in frame """
+        return self._frames[id(frame)][1].get(name.lower(), [])
+
+    def path(self, frame, longName):
+        """ The layer at group path longName, e.g. '1 Incident_Group\\PLS_Subject_Information' """
+        return self._frames[id(frame)][2].get(longName.lower())
+
+    def containing(self, frame, text):
+        """ Layers of frame whose name contains text """
+        matches = self._frames[id(frame)][3]
+        if text not in matches:
+            matches[text] = [layer for layer in self.layers(frame) if text in layer.name]
+        return matches[text]
+
+    def remove(self, frame, layer):
+        """ Remove layer, and the layers in it if it is a group, from the frame.
+        Layers already removed with their group are skipped """
+        import arcpy
+        layers, byName, byPath, matches = self._frames[id(frame)]
+        removed = layer.longName.lower()
+        if removed not in byPath:
+            return
+        prefix = removed + '\\'
+        arcpy.mapping.RemoveLayer(frame, layer)
+        keep = [l for l in layers if l.longName.lower() != removed and not l.longName.lower().startswith(prefix)]
+        byName.clear()
+        byPath.clear()
+        for l in keep:
+            byName.setdefault(l.name.lower(), []).append(l)
+            byPath[l.longName.lower()] = l
+        self._frames[id(frame)] = (keep, byName, byPath, {})
+
+    def add(self, frame, layer, position='AUTO_ARRANGE'):
+        """ Add layer to the frame """
+        import arcpy
+        arcpy.mapping.AddLayer(frame, layer, position)
+        self.refresh(frame)
+
+def layersOn(mxd, selectedParams, index=None):
     """ Requires an mxd as arg 1 and a list of values for arg 2 (to match the dict keys)
-    returns no values, just turns on/off selected layers """
+    turns on/off selected layers. Returns the LayerIndex of the mxd, pass one in
+    to reuse it """
     import arcpy
-    # layers = arcpy.mapping.ListDataFrames(mxd,'')[0]
+
+    if index is None:
+        index = LayerIndex(mxd)
 
     pls = '1 Incident_Group','PLS_Subject_Information'
     found = '1 Incident_Group','Subject_Found'
-    assets = '2 Incident_Assets'
+    assets = '2 Incident_Assets',
     assignments = '3 Assignments_Group','Assignments'
-    teamstatus = '5 Resource_Team_Status'
+    teamstatus = '5 Resource_Team_Status',
     clues = '6 Clues_Group','Clues_All'
     tracks = '7 GPS_Tracks_And_Routes','Routes'
     Search_Segments = '8 Segments_Group','Search_Segments'
@@ -50,27 +120,28 @@ def layersOn(mxd, selectedParams):
 
     layerDict = {'PLS':pls,'Found':found,'Assets':assets,'Assignments':assignments,'Team_Status':teamstatus,'Clues':clues,'Tracks':tracks,'Segments_Filled':Search_Segments,'Segments_Outline':Search_Segments_Outline,'Segments_POA':Search_Segments_POA,'Boundary':boundary}
 
-    for frame in arcpy.mapping.ListDataFrames(mxd):
+    # Names of every layer to turn on
+    visibleNames = set()
+    for sp in selectedParams:
+        if sp in layerDict:
+            visibleNames.update(layerDict[sp])
+
+    for frame in index.frames:
 
-    # Strip out base data to avoid issues with layer compatability
-        for l in arcpy.mapping.ListLayers(mxd,'',frame):
-             if 'Base_Data_Group' in l.name:
-                arcpy.mapping.RemoveLayer(frame,l)
-             else:
-                 # Then set all layers to NOT visible (False)
-                l.visible = False
+        # Strip out base data to avoid issues with layer compatability
+        for l in list(index.containing(frame, 'Base_Data_Group')):
+            index.remove(frame, l)
 
-        for sp in selectedParams: # loop through the selection list
-            if layerDict.has_key(sp):
-                for lyr in arcpy.mapping.ListLayers(mxd,'',frame):
-                    currLyr = layerDict[sp]
-                    if 'Assignments_DDP' in lyr.name:
-                        lyr.visible = False
-                    elif 'Assignments_DDP' not in lyr.name:
-                        if lyr.name in currLyr:
-                            lyr.visible = True
+        # Then set all layers to NOT visible (False)
+        for l in index.layers(frame):
+            l.visible = False
 
-    return
+        for name in visibleNames:
+            for lyr in index.find(frame, name):
+                if 'Assignments_DDP' not in lyr.name:
+                    lyr.visible = True
+
+    return(index)
 
 def initializeDcenterOn():
     """ Creates a dictionary of feature class names, field names """
@@ -95,6 +166,46 @@ def initializeDcenterOn():
     DcenterOn = {'PLS':pls,'Single Asset':asset,'Single Clue':clue,'Single Assignment': assignment, 'Single Segment':segment,'All Assignments':allAssignments,'All Segments':allSegments}
     return(DcenterOn)
 
+def centerOnQuery(keyValue, selectedValue, DcenterOn=None):
+    """ Layer name and SQL query selecting the features to center a map on.
+    keyValue is a DcenterOn key, selectedValue the value picked from its list """
+    import arcpy
+
+    if DcenterOn is None:
+        DcenterOn = initializeDcenterOn()
+
+    # Keys = PLS,Single Asset,Single Clue,Single Assignment,Single Segment,All Assignments,All Segments
+    intList = ['Single Asset','Single Clue','Single Assignment','All Assignments']
+    strList = ['Single Segment','PLS','All Segments']
+
+    # Tuple format - Feature class, display text, Layername, (Optional fields - field 1, field 2)
+    MapFC = DcenterOn[keyValue][2]
+    MapField = DcenterOn[keyValue][3]
+
+    # arcpy.Addfieldelimiters here. Code revised for 10.2 compatability
+    if MapFC != 'Assignments':
+        qField = arcpy.AddFieldDelimiters(MapFC, MapField)
+    else:
+        qField = MapField
+
+    # Values picked from a list look like 12 - Description, keep the part before the dash
+    value = selectedValue.split('-')[0]
+
+    iQuery = None
+    # Check if the selection is all features or single feature
+    if keyValue.startswith('All'):
+        if keyValue in intList:
+            iQuery = '{0} > 0'.format(qField)
+        elif keyValue in strList:
+            iQuery = "{0} > ''".format(qField)
+    else:
+        if keyValue in intList:
+            iQuery = '{0} = {1}'.format(qField,int(value))
+        elif keyValue in strList:
+            iQuery = "{0} = '{1}'".format(qField,value)
+
+    return(MapFC, iQuery)
+
 def getPrintRange(strValues):
     """ Parser which returns a list of single digit values for input of string separated by commas or dashes """
     import arcpy
@@ -124,22 +235,64 @@ def getPrintRange(strValues):
     # Return a list of unique values
     return(printrange)
 
-def populateAnalysisData(mxd):
-    """ Saves current Incident_Analysis file to disk, loads lyr file from disk to target mxd"""
+# Symbology properties arcpy exposes, read from whichever the symbology type has
+SYMBOLOGY_PROPERTIES = ('valueField', 'classValues', 'classLabels', 'classDescriptions', 'showOtherValues',
+                        'classBreakValues', 'classBreakLabels', 'classBreakDescriptions', 'normalization',
+                        'numClasses', 'excludedValues', 'reclassify')
+
+def layerSignature(lyr):
+    """ The properties a layer file stores for lyr that arcpy can read """
+    entry = [lyr.longName, lyr.visible, lyr.minScale, lyr.maxScale]
+    if lyr.supports('DATASOURCE'):
+        entry.append(lyr.dataSource)
+    if lyr.supports('DEFINITIONQUERY'):
+        entry.append(lyr.definitionQuery)
+    if lyr.supports('TRANSPARENCY'):
+        entry.append(lyr.transparency)
+    if lyr.supports('BRIGHTNESS'):
+        entry.append(lyr.brightness)
+    if lyr.supports('CONTRAST'):
+        entry.append(lyr.contrast)
+    if lyr.supports('SHOWLABELS'):
+        entry.append(lyr.showLabels)
+    if lyr.supports('LABELCLASSES'):
+        entry.append([(lc.className, lc.expression, lc.SQLQuery, lc.showClassLabels) for lc in lyr.labelClasses])
+    if lyr.supports('SYMBOLOGYTYPE'):
+        entry.append(lyr.symbologyType)
+        if lyr.symbologyType != 'OTHER':
+            symbology = lyr.symbology
+            entry.append([(name, getattr(symbology, name)) for name in SYMBOLOGY_PROPERTIES
+                          if hasattr(symbology, name)])
+    return(entry)
+
+def groupSignature(mxdlayer):
+    """ md5 of the data sources, display, label and symbology settings of the layers
+    in the group mxdlayer of the current map. None when the group can't be read """
+    import arcpy, hashlib
+
+    try:
+        mxd = arcpy.mapping.MapDocument('CURRENT')
+        groups = arcpy.mapping.ListLayers(mxd, mxdlayer)
+        if not groups:
+            return None
+        signature = [layerSignature(lyr) for lyr in arcpy.mapping.ListLayers(groups[0])]
+    except (RuntimeError, ValueError, AttributeError):
+        return None
+    return(hashlib.md5(repr(signature)).hexdigest())
+
+def saveLayerFile(mxdlayer, LayerName, force=False):
+    """ Save mxdlayer of the current map to LayerName in the Base_Data\Layers folder
+    next to the workspace, returns the path of the layer file. The signature of the
+    group is kept in LayerName.sig, the file is only saved again when the group
+    has changed or force is True. Symbol colours and sizes can't be read through
+    arcpy, Populate Base Data saves with force so edits to them are picked up """
     import arcpy
     from arcpy import env
 
     import os
     arcpy.env.overwriteOutput = True
 
-    # Gather information to copy over base_data
-
-    # Define vars
-    mxdlayer = "13 Incident_Analysis"
-    LayerFile = "Incident_Analysis"
-    LayerName = LayerFile + '.lyr'
-
-    # Save base_data layer file to disk in c:\MapSAR\TempDir from current mxd.
+    # Save layer file to disk in the Base_Data\Layers folder from current mxd.
     # If directory does not exist create it
     # TempDir = r'c:\mapsar\Tools\Layer_Templates'
     # baselayer = '{0}\{1}'.format(TempDir,LayerName)
@@ -147,79 +300,107 @@ def populateAnalysisData(mxd):
     TempDir = '{0}Base_Data\Layers'.format(env.workspace.rstrip('SAR_Default.gdb'))
 
     baselayer = '{0}\{1}'.format(TempDir,LayerName)
+    signatureFile = '{0}.sig'.format(baselayer)
+
+    signature = groupSignature(mxdlayer)
+    if not force and signature is not None and os.path.isfile(baselayer) and os.path.isfile(signatureFile):
+        f = open(signatureFile)
+        try:
+            saved = f.read().strip()
+        finally:
+            f.close()
+        if saved == signature:
+            arcpy.AddMessage('{0} is up to date'.format(baselayer))
+            return(baselayer)
+
+    if not os.path.exists(TempDir):
+          os.makedirs(TempDir)
+    arcpy.SaveToLayerFile_management(mxdlayer,baselayer,"RELATIVE")
+
+    if signature is not None:
+        f = open(signatureFile, 'w')
+        try:
+            f.write(signature)
+        finally:
+            f.close()
+    elif os.path.isfile(signatureFile):
+        os.remove(signatureFile)
+
+    return(baselayer)
+
+def saveAnalysisLayer(force=False):
+    """ Save the current Incident_Analysis group to a layer file, returns its path """
+    return(saveLayerFile("13 Incident_Analysis", "Incident_Analysis.lyr", force))
+
+def saveBaseLayer(force=False):
+    """ Save the current base data group to a layer file, returns its path """
+    return(saveLayerFile("14 Base_Data_Group", "Base_Layer.lyr", force))
+
+def populateAnalysisData(mxd, index=None, layerFile=None, save=True):
+    """ Saves current Incident_Analysis file to disk, loads lyr file from disk to target mxd.
+    index is the LayerIndex of mxd, if one has been built. Pass the layerFile
+    from saveAnalysisLayer to reuse it, save=False leaves the mxd unsaved """
+    import arcpy
+
+    import os
+
+    if layerFile is None:
+        layerFile = saveAnalysisLayer()
+    baselayer = layerFile
 
     arcpy.AddMessage('Analysis layer is {0}'.format(baselayer))
 
-    if os.path.exists(TempDir):
-          arcpy.SaveToLayerFile_management(mxdlayer,baselayer,"RELATIVE")
-    else:
-          os.makedirs(TempDir)
-          arcpy.SaveToLayerFile_management(mxdlayer,baselayer,"RELATIVE")
+    if index is None:
+        index = LayerIndex(mxd)
 
     # Check for existing Incident_Analysis layers in target. If present remove them
-    for df in arcpy.mapping.ListDataFrames(mxd):
-         for lyr in arcpy.mapping.ListLayers(mxd, "", df):
-             if 'Incident_Analysis' in lyr.name:
-                  arcpy.mapping.RemoveLayer(df,lyr)
+    for df in index.frames:
+         for lyr in list(index.containing(df, 'Incident_Analysis')):
+              index.remove(df,lyr)
 
     # Check if the layer exists on disk
 
     if os.path.isfile(baselayer):
           addLayer = arcpy.mapping.Layer(baselayer)
-          arcpy.mapping.AddLayer(df, addLayer, "BOTTOM")
-          mxd.save()
+          index.add(df, addLayer, "BOTTOM")
+          if save:
+              mxd.save()
     else:
           # If not alert user of an error
           arcpy.AddMessage(baselayer +' does not exist')
 
-def populateBaseData(mxd):
+def populateBaseData(mxd, index=None, layerFile=None, save=True):
     """ Params are source mxd, Feature Layer name, file layer name
-    Saves current base lyr file to disk, loads lyr file from disk to target mxd"""
+    Saves current base lyr file to disk, loads lyr file from disk to target mxd.
+    index is the LayerIndex of mxd, if one has been built. Pass the layerFile
+    from saveBaseLayer to reuse it, save=False leaves the mxd unsaved """
     import arcpy
-    from arcpy import env
 
     import os
-    arcpy.env.overwriteOutput = True
-
-    # Gather information to copy over base_data
 
-    # Define vars
-    mxdlayer = "14 Base_Data_Group"
-    LayerFile = "Base_Layer"
-    LayerName = LayerFile + '.lyr'
+    if layerFile is None:
+        layerFile = saveBaseLayer()
+        arcpy.AddMessage('Base data copied to {0}'.format(os.path.dirname(layerFile)))
+    baselayer = layerFile
 
-    # Save base_data layer file to disk in c:\MapSAR\TempDir from current mxd.
-    # If directory does not exist create it
-    #TempDir = r'c:\mapsar\Tools\Layer_Templates'
-    #baselayer = '{0}\{1}'.format(TempDir,LayerName)
-
-    TempDir = '{0}Base_Data\Layers'.format(env.workspace.rstrip('SAR_Default.gdb'))
-
-    baselayer = '{0}\{1}'.format(TempDir,LayerName)
-
-    arcpy.AddMessage('Base data copied to {0}'.format(TempDir, ))
-
-    if os.path.exists(TempDir):
-          arcpy.SaveToLayerFile_management(mxdlayer,baselayer,"RELATIVE")
-    else:
-          os.makedirs(TempDir)
-          arcpy.SaveToLayerFile_management(mxdlayer,baselayer,"RELATIVE")
+    if index is None:
+        index = LayerIndex(mxd)
 
     # Check for existing Base_Data layers in target. If present remove them
-    for df in arcpy.mapping.ListDataFrames(mxd):
-         for lyr in arcpy.mapping.ListLayers(mxd, "", df):
-             if 'Base_Data' in lyr.name:
-                  arcpy.mapping.RemoveLayer(df,lyr)
+    for df in index.frames:
+         for lyr in list(index.containing(df, 'Base_Data')):
+              index.remove(df,lyr)
 
     # Check if the layer exists on disk
 
     if os.path.isfile(baselayer):
         arcpy.AddMessage('Base Data Layer Loaded')
-        frames = arcpy.mapping.ListDataFrames(mxd)
-        for frame in frames:
-            addLayer = arcpy.mapping.Layer(baselayer)
-            arcpy.mapping.AddLayer(frame, addLayer, "BOTTOM")
-        mxd.save()
+        # Read the layer file once, AddLayer puts a copy of it in each frame
+        addLayer = arcpy.mapping.Layer(baselayer)
+        for frame in index.frames:
+            index.add(frame, addLayer, "BOTTOM")
+        if save:
+            mxd.save()
     else:
           # If not alert user of an error
           arcpy.AddMessage(baselayer +' does not exist')
@@ -309,101 +490,220 @@ def clearNulls(myList):
                 myList[i] = None
     return(myList)
 
-def updateAAvalues():
-    """ Manually updates values created with Attribute Assistant """
+def truncateTable(fc):
+    """ Delete every record in fc in a single operation """
+    import arcpy
+    try:
+        arcpy.TruncateTable_management(fc)
+    except arcpy.ExecuteError:
+        # TruncateTable refuses versioned data and tables in a relationship
+        # with messaging, DeleteRows works for those
+        arcpy.DeleteRows_management(fc)
+
+def insertRows(fc, fields, rows, batchSize=500, oids=None):
+    """ Insert rows (sequences of values in fields order) into fc through one
+    InsertCursor, reporting progress once per batch. Rows that fail are
+    skipped. Returns the number inserted and a list of (row number, error).
+    The OBJECTID of each new row is added to the oids list if one is passed """
+    import arcpy
+    inserted = 0
+    failed = []
+    with arcpy.da.InsertCursor(fc, fields) as cursor:
+        for rowNumber, row in enumerate(rows, 1):
+            try:
+                oid = cursor.insertRow(row)
+                inserted += 1
+                if oids is not None:
+                    oids.append(oid)
+            except Exception as err:
+                failed.append((rowNumber, err))
+            if rowNumber % batchSize == 0:
+                arcpy.AddMessage('{0} rows added to {1}'.format(inserted, fc))
+    arcpy.AddMessage('{0} rows added to {1}, {2} failed'.format(inserted, fc, len(failed)))
+
+    return(inserted, failed)
+
+def totalWeight(body, gear):
+    """ Total_Weight is the weights that are filled in added together """
+    if body is None and gear is None:
+        return None
+    return (body or 0) + (gear or 0)
+
+def teamAvailable(status, name):
+    """ Team_Available is the team name unless the team is Unavailable """
+    if status != 'Unavailable':
+        return name
+    return '<NULL>'
+
+def numberText(number):
+    """ Text copy of a number field, used for the domain descriptions """
+    if number is None:
+        return None
+    return str(number)
+
+def clueNumText(number):
+    if number is not None and number > 0:
+        return str(number)
+    return '<NULL>'
+
+def mileage(length):
+    """ Assignment mileage, half the length of the route in meters as miles """
+    if length is None:
+        return None
+    return (length * 0.00062137119) / 2
+
+# Fields kept up to date by Attribute Assistant, recalculated by updateAAvalues.
+# Each table lists (derived field, source fields, function of the source values)
+DERIVED_FIELDS = [('Team_Members', [('Total_Weight', ['Body_Weight', 'Gear_Weight'], totalWeight)]),
+                  ('Teams', [('Team_Available', ['Status', 'Team_Name'], teamAvailable)]),
+                  ('Operation_Period', [('PeriodText', ['Period'], numberText)]),
+                  ('Clues_Point', [('Clue_NumText', ['Clue_Number'], clueNumText)]),
+                  ('hidden_assignments', [('AssignNumText', ['Assignment_Number'], numberText),
+                                          ('Mileage', ['SHAPE_Length'], mileage)])]
+
+# Layer the derived fields of a table are updated through, when it is not the table itself
+DERIVED_LAYERS = {'Assignments': 'hidden_assignments'}
+
+def _differs(old, new):
+    if isinstance(old, float) and isinstance(new, float):
+        return abs(old - new) > 1e-9 * max(1.0, abs(new))
+    return old != new
+
+def updateDerivedFields(fc, derived, oids=None):
+    """ Recalculate the derived fields of fc in one cursor pass, only rows whose
+    values change are written. oids limits the pass to those OBJECTIDs.
+    Returns the number of rows checked and changed """
     import arcpy
 
-    # Team Members
-    fc = 'Team_Members'
-    fields = ['Total_Weight', 'Body_Weight','Gear_Weight']
-    arcpy.AddMessage('Updating {0} values'.format(fc))
-    with arcpy.da.UpdateCursor(fc,fields ) as rows:
-        for row in rows:
-            if row[2] != None and row[2] != None:
-                row[0] = row[1] + row[2]
-            rows.updateRow(row)
-
-    # Teams
-    fc = 'Teams'
-    fields = ['Status', 'Team_Available','Team_Name']
-    arcpy.AddMessage('Updating {0} values'.format(fc))
-    with arcpy.da.UpdateCursor(fc,fields ) as rows:
-        for row in rows:
-            if row[0] != 'Unavailable':
-                row[1] = row[2]
-            else:
-                row[1] = '<NULL>'
-            rows.updateRow(row)
-
-
-    # Periods
-    fc = 'Operation_Period'
-    fields = ['PeriodText', 'Period']
-    arcpy.AddMessage('Updating {0} values'.format(fc))
-    with arcpy.da.UpdateCursor(fc,fields ) as rows:
-        for row in rows:
-            row[0] = row[1]
-            rows.updateRow(row)
-
-    # Clues
-    fc = 'Clues_Point'
-    fields = ['Clue_Number', 'Clue_NumText']
-    arcpy.AddMessage('Updating {0} values'.format(fc))
-    with arcpy.da.UpdateCursor(fc,fields ) as rows:
+    fields = ['OID@']
+    plan = []
+    for field, sources, function in derived:
+        for source in sources:
+            if source not in fields:
+                fields.append(source)
+        if field not in fields:
+            fields.append(field)
+        plan.append((fields.index(field), [fields.index(source) for source in sources], function))
+
+    where = None
+    if oids is not None:
+        oids = set(oids)
+        if not oids:
+            return 0, 0
+        if len(oids) <= 1000:
+            oidField = arcpy.AddFieldDelimiters(fc, arcpy.Describe(fc).OIDFieldName)
+            where = '{0} IN ({1})'.format(oidField, ','.join([str(oid) for oid in sorted(oids)]))
+
+    checked = 0
+    changed = 0
+    with arcpy.da.UpdateCursor(fc, fields, where) as rows:
         for row in rows:
-            if row[0] > 0:
-                row[1] = str(row[0])
-            else:
-                row[1] = '<NULL>'
-            rows.updateRow(row)
-
-    # Assignments
-    fc = 'hidden_assignments'
-    arcpy.AddMessage('Updating {0} values'.format(fc))
-    rows = arcpy.UpdateCursor(fc)
-    for row in rows:
+            if oids is not None and row[0] not in oids:
+                continue
+            checked += 1
+            isChanged = False
+            for target, sources, function in plan:
+                value = function(*[row[i] for i in sources])
+                if _differs(row[target], value):
+                    row[target] = value
+                    isChanged = True
+            if isChanged:
+                rows.updateRow(row)
+                changed += 1
+
+    return(checked, changed)
+
+def updateAAvalues(touched=None):
+    """ Manually updates values created with Attribute Assistant. touched limits
+    the update to {table: OBJECTIDs} from an import, None for a table checks
+    all of its rows. Without touched every table is checked """
+    import arcpy
 
-        row.AssignNumText = str(row.Assignment_Number)
-        row.Mileage = (row.SHAPE_Length * 0.00062137119) / 2
-        rows.updateRow(row)
+    for fc, derived in DERIVED_FIELDS:
+        oids = None
+        if touched is not None:
+            if fc not in touched:
+                continue
+            oids = touched[fc]
+        arcpy.AddMessage('Updating {0} values'.format(fc))
+        try:
+            checked, changed = updateDerivedFields(fc, derived, oids)
+            arcpy.AddMessage('{0} rows checked, {1} changed'.format(checked, changed))
+        except Exception as err:
+            arcpy.AddWarning('Passing on {0} due to error {1}'.format(fc, err))
+
+# Domains rebuilt by updateValueLists. (table, path in the workspace, code field,
+# description field, domain name, domain description)
+DOMAIN_SOURCES = [('Search_Segments', 'Search_Segments', 'Area_Name', 'Area_Name', 'Areas', 'Areas'),
+                  ('Teams', 'Teams', 'Team_Name', 'Team_Name', 'Teams', 'Teams'),
+                  ('Operation_Period', 'Incident\\Operation_Period', 'Period', 'PeriodText', 'Period', 'PeriodText'),
+                  ('PLS', 'Incident\\PLS', 'Victim_Number', 'Name', 'Victim_Number', 'Victim_Number'),
+                  ('Incident', 'Incident\\Incident', 'Incident_Name', 'Incident_Name', 'Incident_Name', 'Incident_Name'),
+                  ('Clues_Point', 'Resources_Clues_Routes\\Clues_Point', 'Clue_Number', 'Clue_NumText', 'Clue_Number', 'Clue_NumText'),
+                  ('Assignments', 'Assignments', 'Assignment_Number', 'AssignNumText', 'Assignment_Number', 'AssignNumText')]
+
+# Fingerprint of the values last published to each (workspace, domain)
+_publishedDomains = {}
+
+def _domainText(value):
+    if value is None:
+        return u''
+    if isinstance(value, unicode):
+        return value
+    return unicode(str(value), 'utf-8', 'replace')
+
+def domainFingerprint(pairs):
+    """ Fingerprint of (code, description) pairs, independent of their order """
+    import hashlib
+    pairs = sorted([(_domainText(code), _domainText(description)) for code, description in pairs])
+    return(hashlib.md5(repr(pairs)).hexdigest())
+
+def tableFingerprint(table, codeField, descriptionField):
+    """ Fingerprint of the (code, description) pairs TableToDomain would publish from table """
+    import arcpy
+    with arcpy.da.SearchCursor(table, [codeField, descriptionField]) as rows:
+        return(domainFingerprint([row for row in rows if row[0] is not None]))
 
+def publishedFingerprints(workspace):
+    """ Fingerprint of each coded value domain in workspace, by domain name """
+    import arcpy
+    return(dict((domain.name, domainFingerprint(domain.codedValues.items()))
+                for domain in arcpy.da.ListDomains(workspace) if domain.domainType == 'CodedValue'))
 
-def updateValueLists(launched):
-    """ UpdateValueLists populates all db domains with data. pass launched = 'script' or 'tool' to change error message delivery """
+def updateValueLists(launched, force=False):
+    """ UpdateValueLists populates all db domains with data. pass launched = 'script' or 'tool' to change error message delivery.
+    A domain is only rebuilt when the values in its table differ from the published
+    values, force rebuilds every domain """
     import arcpy
     import pythonaddins
+    import time
 
     # Set enviroment
     from arcpy import env
     workspace = arcpy.env.workspace
 
     try:
-        # Define FC's
-        Search_Segments = workspace+"\\Search_Segments"
-        Teams = workspace+"\\Teams"
-        Operation_Period = workspace+"\\Incident\\Operation_Period"
-        Incident = workspace+"\\Incident\\Incident"
-        PLS = workspace+"\\Incident\\PLS"
-        Clues_Point = workspace+"\\Resources_Clues_Routes\\Clues_Point"
-        Assignments = workspace+"\\Assignments"
-
         errorString = ''
-        # Process: Table To Domain
-        fc = 'Search_Segments'
-        arcpy.TableToDomain_management(Search_Segments, "Area_Name", "Area_Name", workspace, "Areas", "Areas", "REPLACE")
-        fc = 'Teams'
-        arcpy.TableToDomain_management(Teams, "Team_Name", "Team_Name", workspace, "Teams", "Teams", "REPLACE")
-        fc = 'Operation_Period'
-        arcpy.TableToDomain_management(Operation_Period, "Period", "PeriodText", workspace, "Period", "PeriodText", "REPLACE")
-        fc = 'PLS'
-        arcpy.TableToDomain_management(PLS, "Victim_Number", "Name", workspace, "Victim_Number", "Victim_Number", "REPLACE")
-        fc = 'Incident'
-        arcpy.TableToDomain_management(Incident, "Incident_Name", "Incident_Name", workspace, "Incident_Name", "Incident_Name", "REPLACE")
-        fc = 'Clues_Point'
-        arcpy.TableToDomain_management(Clues_Point, "Clue_Number", "Clue_NumText", workspace, "Clue_Number", "Clue_NumText", "REPLACE")
-        fc = 'Assignments'
-        arcpy.TableToDomain_management(Assignments, "Assignment_Number", "AssignNumText", workspace, "Assignment_Number", "AssignNumText", "REPLACE")
-
+        published = None
+        timing = []
+        for fc, path, codeField, descriptionField, domain, domainDescription in DOMAIN_SOURCES:
+            start = time.time()
+            table = workspace+"\\"+path
+            fingerprint = tableFingerprint(table, codeField, descriptionField)
+            status = 'unchanged'
+            if force or _publishedDomains.get((workspace, domain)) != fingerprint:
+                # Not published from this session, compare with the domain in the workspace
+                if published is None and not force:
+                    published = publishedFingerprints(workspace)
+                if force or published.get(domain) != fingerprint:
+                    # Process: Table To Domain
+                    arcpy.TableToDomain_management(table, codeField, descriptionField, workspace, domain, domainDescription, "REPLACE")
+                    status = 'rebuilt'
+                _publishedDomains[(workspace, domain)] = fingerprint
+            timing.append('{0} {1} in {2:.3f} sec'.format(domain, status, time.time() - start))
+
+        for line in timing:
+            arcpy.AddMessage(line)
         if launched == 'script': arcpy.AddMessage('Values Have Been Updated')
 
     except:
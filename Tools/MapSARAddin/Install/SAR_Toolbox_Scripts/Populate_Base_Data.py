@@ -61,12 +61,16 @@ LayerName = LayerFile + '.lyr'
 ### Message to user
 ##arcpy.AddMessage("Base Data Saved as "+ LayerFile)
 
+# Save the base data as it is now, whether or not the saved layer file looks current
+baseLayer = mapsar.saveBaseLayer(force=True)
+arcpy.AddMessage("Base Data Saved as " + baseLayer)
+
 # Check to see if we're processing a single file or a directory of files
 if TargetFile > "":
         # Message to user
         arcpy.AddMessage("Target File is True = " +TargetFile)
         mxd = arcpy.mapping.MapDocument(TargetFile)
-        mapsar.populateBaseData(mxd)
+        mapsar.populateBaseData(mxd, layerFile=baseLayer)
 
 elif TargetDir != "":
         arcpy.AddMessage("Target Directory is true")
@@ -78,7 +82,7 @@ elif TargetDir != "":
                 arcpy.AddMessage('Processing file '+abspath)
                 # Loop for each file in the mxd collection
                 for df in arcpy.mapping.ListDataFrames(mxd):
-                    mapsar.populateBaseData(mxd)
+                    mapsar.populateBaseData(mxd, layerFile=baseLayer)
 
 # Clear vars and release files
 del TargetFile, TargetDir, mxd
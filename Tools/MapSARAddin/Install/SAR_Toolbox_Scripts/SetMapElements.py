@@ -54,11 +54,28 @@ def swapScalePositions(milesBar,milesList,kiloBar,kiloList):
     kiloBar.elementHeight = milesList[2]
     kiloBar.elementWidth = milesList[3]
 
-def setScaleBar(mxd,mapScale):
+def layoutElements(mxd):
+    """ The scale bars, logo and declination elements of the layout, found in one pass
+    over the elements. Returns a dict of element lists keyed by element type """
+    elements = {'MAPSURROUND_ELEMENT': [], 'PICTURE_ELEMENT': [], 'TEXT_ELEMENT': []}
+    for elm in arcpy.mapping.ListLayoutElements(mxd):
+        if elm.type == 'MAPSURROUND_ELEMENT':
+            if 'Miles' in elm.name or 'Kilo' in elm.name:
+                elements[elm.type].append(elm)
+        elif elm.type == 'PICTURE_ELEMENT':
+            if 'teamlogo' in elm.name:
+                elements[elm.type].append(elm)
+        elif elm.type == 'TEXT_ELEMENT':
+            if 'mapdec' in elm.name:
+                elements[elm.type].append(elm)
+    return(elements)
+
+def setScaleBar(mxd,mapScale,elms=None):
     """ Set the positions of the Miles and Kilo scale bars based on Incident preferences"""
     milesList = []
     kiloList = []
-    elms = arcpy.mapping.ListLayoutElements(mxd,'MAPSURROUND_ELEMENT')
+    if elms is None:
+        elms = arcpy.mapping.ListLayoutElements(mxd,'MAPSURROUND_ELEMENT')
 
     # arcpy.AddMessage('mapScale = {0}'.format(mapScale))
     # read current element positions and populate lists
@@ -75,6 +92,9 @@ def setScaleBar(mxd,mapScale):
             kiloList.append(kiloBar.elementPositionY)
             kiloList.append(kiloBar.elementHeight)
             kiloList.append(kiloBar.elementWidth)
+    # Layouts without both scale bars have nothing to swap
+    if not milesList or not kiloList:
+        return
     # arcpy.AddMessage('milesList[0] = {0} kiloList[0] = {1}'.format(milesList[0],kiloList[0]))
     if 'Miles' in mapScale:
         if milesList[1] < kiloList[1]:
@@ -85,18 +105,20 @@ def setScaleBar(mxd,mapScale):
             arcpy.AddMessage('Setting Kilos')
             swapScalePositions(milesBar,milesList,kiloBar,kiloList)
 
-def setLogo(mxd,path):
+def setLogo(mxd,path,elms=None):
     """ Set the teamlogo element to the value of path """
     # arcpy.AddMessage('Setting Logo')
-    elms = arcpy.mapping.ListLayoutElements(mxd,"PICTURE_ELEMENT")
+    if elms is None:
+        elms = arcpy.mapping.ListLayoutElements(mxd,"PICTURE_ELEMENT")
     for i in elms:
         if 'teamlogo' in i.name:
             i.sourceImage = path
 
-def setDeclination(mxd,declination):
+def setDeclination(mxd,declination,elms=None):
     """ Set the mapdec element to the value of declination """
     # arcpy.AddMessage('Setting Declination')
-    elms = arcpy.mapping.ListLayoutElements(mxd,"TEXT_ELEMENT")
+    if elms is None:
+        elms = arcpy.mapping.ListLayoutElements(mxd,"TEXT_ELEMENT")
     for i in elms:
         if 'mapdec' in i.name:
             if declination != '':
@@ -104,45 +126,71 @@ def setDeclination(mxd,declination):
             elif declination == '':
                 i.text = ' '
 
-def setMapElements(mxd):
-    # Script starts here
-    import arcpy
-    from arcpy import env
-
-    milesBar = None
-    kiloBar = None
-    fc = 'Incident_Information'
-    field = ['MapUnit','Declination','logo']
-
-    result = int(arcpy.GetCount_management(fc).getOutput(0))
-
-    if result == 0:
-        mapScale = 'Miles'
-        setScaleBar(mxd,mapScale)
-        declination = ''
-        setDeclination(mxd,declination)
-
-        logopath = '{0}Base_Data\Logos\SMSR.jpg'.format(env.workspace.rstrip('SAR_Default.gdb'))
-        if os.path.isfile(logopath):
-            setLogo(mxd,logopath)
-
-    elif result == 1:
-        # arcpy.AddMessage('result is == 1')
-        values = [row for row in arcpy.da.SearchCursor(fc, (field))]
-        mapScale = values[0][0]
-        declination = values[0][1]
-        logopath = values[0][2]
-
-        setScaleBar(mxd,mapScale)
-        setDeclination(mxd,declination)
-
-        if os.path.isfile(logopath):
-            setLogo(mxd,logopath)
+class IncidentSettings(object):
+    """ MapUnit, Declination and logo path of the incident. Incident_Information is
+    read the first time and again only when its modification stamp changes """
+    def __init__(self, fc='Incident_Information'):
+        self.fc = fc
+        self.reads = 0
+        self._catalogPath = None
+        self._stamp = None
+        self._values = None
+
+    def stamp(self):
+        """ Latest change to a table of the file geodatabase holding fc and the
+        workspace, None when it can't be told and the table must be read """
+        try:
+            # The table is found again when the workspace changes to another incident
+            if self._catalogPath is None or self._catalogPath[0] != env.workspace:
+                self._catalogPath = (env.workspace, arcpy.Describe(self.fc).catalogPath)
+            path = self._catalogPath[1]
+            end = path.lower().find('.gdb')
+            gdb = path[:end + 4]
+            if end < 0 or not os.path.isdir(gdb):
+                return None
+            changed = max([os.path.getmtime(os.path.join(gdb, name)) for name in os.listdir(gdb)
+                           if name.endswith('.gdbtable')] or [0])
+        except (IOError, OSError, AttributeError):
+            return None
+        return (gdb, changed, env.workspace)
+
+    def read(self):
+        """ Values from the table, None when it has more than one record """
+        rows = [row for row in arcpy.da.SearchCursor(self.fc, ('MapUnit', 'Declination', 'logo'))]
+        if len(rows) == 0:
+            logopath = '{0}Base_Data\Logos\SMSR.jpg'.format(env.workspace.rstrip('SAR_Default.gdb'))
+            return(('Miles', '', logopath))
+        if len(rows) == 1:
+            return(tuple(rows[0]))
+        return None
+
+    def values(self):
+        """ (MapUnit, Declination, logo path) or None """
+        stamp = self.stamp()
+        if stamp is None or stamp != self._stamp or self.reads == 0:
+            self._values = self.read()
+            self._stamp = stamp
+            self.reads += 1
+        return(self._values)
+
+# Shared by every map tool run in this session
+incidentSettings = IncidentSettings()
+
+def setMapElements(mxd, settings=None):
+    """ Set the scale bar, declination and logo of mxd from the incident settings """
+    if settings is None:
+        settings = incidentSettings
+    values = settings.values()
+    if values is None:
+        return
+
+    mapScale, declination, logopath = values
+    elements = layoutElements(mxd)
+    setScaleBar(mxd, mapScale, elements['MAPSURROUND_ELEMENT'])
+    setDeclination(mxd, declination, elements['TEXT_ELEMENT'])
+    if logopath and os.path.isfile(logopath):
+        setLogo(mxd, logopath, elements['PICTURE_ELEMENT'])
 
 if __name__ == '__main__':
     arcpy.AddMessage('Setting Map Properties')
-    setMapElements('CURRENT')
-
-
-
-
+    setMapElements(arcpy.mapping.MapDocument('CURRENT'))
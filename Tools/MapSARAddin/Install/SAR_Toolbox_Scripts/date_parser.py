@@ -0,0 +1,275 @@
+#-------------------------------------------------------------------------------
+# Name:        date_parser
+# Purpose:     Fast date / time parsing for CSV and spreadsheet imports.
+#              Precompiled formats, format detection, a memo of parsed
+#              values and Excel serial dates converted a column at a time
+#
+# Author:      SMSR
+# Copyright:   (c) SMSR 2013
+# Licence:
+#     MapSAR wilderness search and rescue GIS data model and related python scripting
+#     Copyright (C) 2012  - Jon Pedder & SMSR
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+#
+# A strptime format is compiled once into a regular expression and a function
+# that builds the datetime from the matched groups, which is several times
+# faster than strptime. The result is the same as strptime for the formats
+# below, except that seconds after the minutes are read where the format has
+# none, as the CSV export writes them. Check in and check out times repeat a
+# lot, so parsed strings are kept in a memo.
+#
+# Run this file directly for the benchmark against strptime.
+
+import datetime, re
+
+# Date / time formats of the import tools, in the order they are offered
+TIME_FORMATS = ['%m/%d/%Y %H:%M',
+                '%m/%d/%Y %I:%M%p',
+                '%m/%d/%Y %I:%M %p',
+                '%m/%d/%y %H:%M',
+                '%m/%d/%y %I:%M%p',
+                '%m/%d/%y %I:%M %p']
+
+# Format the CSV export (export_engine) writes dates in
+EXPORT_FORMAT = '%m/%d/%Y %H:%M:%S'
+
+# CSV lines whose values detect looks at
+SAMPLE_SIZE = 50
+
+# Parsed strings kept by a DateParser, the memo is emptied when full. 0 turns it off
+MEMO_SIZE = 4096
+
+_DIRECTIVES = {'m': r'(\d{1,2})',
+               'd': r'(\d{1,2})',
+               'Y': r'(\d{4})',
+               'y': r'(\d{2})',
+               'H': r'(\d{1,2})',
+               'I': r'(\d{1,2})',
+               'M': r'(\d{1,2})',
+               'S': r'(\d{1,2})',
+               'p': r'([AaPp][Mm])'}
+
+def compileFormat(timeFormat):
+    """ Return (regex, build) for a strptime format using the directives above.
+    build takes the groups of a match and returns the datetime """
+    pattern = []
+    order = []
+    i = 0
+    while i < len(timeFormat):
+        c = timeFormat[i]
+        if c == '%':
+            directive = timeFormat[i + 1:i + 2]
+            if directive not in _DIRECTIVES:
+                raise ValueError('Unsupported directive %{0} in {1}'.format(directive, timeFormat))
+            pattern.append(_DIRECTIVES[directive])
+            order.append(directive)
+            if directive == 'M' and '%S' not in timeFormat:
+                pattern.append(r'(?::(\d{1,2}))?')
+                order.append('S')
+            i += 2
+        elif c.isspace():
+            # strptime lets any run of white space match a space
+            pattern.append(r'\s+')
+            i += 1
+        else:
+            pattern.append(re.escape(c))
+            i += 1
+    regex = re.compile(''.join(pattern) + '$')
+
+    position = dict((directive, n) for n, directive in enumerate(order))
+    iMonth = position.get('m')
+    iDay = position.get('d')
+    iYear = position.get('Y')
+    iShortYear = position.get('y')
+    iHour = position.get('H', position.get('I'))
+    iMinute = position.get('M')
+    iSecond = position.get('S')
+    iAmPm = position.get('p')
+    isTwelveHour = 'I' in position
+
+    def build(groups):
+        if iYear is not None:
+            year = int(groups[iYear])
+        elif iShortYear is not None:
+            # Same pivot as strptime, 69 - 99 are 1900s
+            year = int(groups[iShortYear])
+            year += 1900 if year >= 69 else 2000
+        else:
+            year = 1900
+        hour = int(groups[iHour]) if iHour is not None else 0
+        if isTwelveHour:
+            if hour < 1 or hour > 12:
+                raise ValueError('hour must be in 1..12')
+            if iAmPm is not None and groups[iAmPm].upper() == 'PM':
+                hour = 12 if hour == 12 else hour + 12
+            elif hour == 12:
+                hour = 0
+        return datetime.datetime(year,
+                                 int(groups[iMonth]) if iMonth is not None else 1,
+                                 int(groups[iDay]) if iDay is not None else 1,
+                                 hour,
+                                 int(groups[iMinute]) if iMinute is not None else 0,
+                                 int(groups[iSecond] or 0) if iSecond is not None else 0)
+
+    return regex, build
+
+class DateParser(object):
+    """ Parse date / time strings in timeFormat. Without a format the first value
+    that parses picks it from formats, and it is picked again if a later value
+    does not match. A parser is a converter, call it with the string """
+    def __init__(self, timeFormat=None, formats=TIME_FORMATS, memoSize=MEMO_SIZE):
+        self.isFixed = timeFormat is not None
+        if self.isFixed:
+            formats = [timeFormat]
+        self.formats = [(f,) + compileFormat(f) for f in formats]
+        self.current = self.formats[0] if self.isFixed else None
+        self.memoSize = memoSize
+        self.memo = {}
+
+    @property
+    def timeFormat(self):
+        if self.current is None:
+            return None
+        return self.current[0]
+
+    def _match(self, value):
+        if self.current is not None:
+            match = self.current[1].match(value)
+            if match is not None or self.isFixed:
+                return match
+        for compiled in self.formats:
+            match = compiled[1].match(value)
+            if match is not None:
+                self.current = compiled
+                return match
+        return None
+
+    def detect(self, values, sampleSize=SAMPLE_SIZE):
+        """ Pick the first format that parses every non empty value in the first
+        sampleSize values. Returns the format, or None if no format fits """
+        samples = [v.strip() for v in values[:sampleSize] if v and v.strip()]
+        for compiled in self.formats:
+            if all(compiled[1].match(v) is not None for v in samples):
+                self.current = compiled
+                return compiled[0]
+        return None
+
+    def parse(self, value):
+        result = self.memo.get(value)
+        if result is not None:
+            return result
+        match = self._match(value)
+        if match is None:
+            raise ValueError('time data {0!r} does not match format {1!r}'.format(value, self.timeFormat))
+        result = self.current[2](match.groups())
+        if self.memoSize:
+            if len(self.memo) >= self.memoSize:
+                self.memo.clear()
+            self.memo[value] = result
+        return result
+
+    __call__ = parse
+
+def excelDates(serials, datemode=0, early=None):
+    """ Convert a sequence of Excel serial dates to dates, or datetimes where there
+    is a time part, rounded to the second like xlrd. The arithmetic is done on
+    the whole array and each distinct value is converted once. Values before
+    day 61 of the 1900 date system are passed to early, or raise ValueError """
+    import numpy
+
+    if datemode == 1:
+        epoch = datetime.datetime(1904, 1, 1)
+    else:
+        # Day 60 is the 29th of February 1900 that Excel thinks existed
+        epoch = datetime.datetime(1899, 12, 30)
+
+    values = numpy.asarray(serials, dtype=numpy.float64)
+    if values.size == 0:
+        return []
+    days = numpy.floor(values)
+    seconds = numpy.round((values - days) * 86400.0)
+    wholeDay = seconds == 86400
+    days[wholeDay] += 1
+    seconds[wholeDay] = 0
+
+    unique, inverse = numpy.unique(days * 86400.0 + seconds, return_inverse=True)
+    converted = []
+    for key in unique.tolist():
+        day = int(key // 86400)
+        second = int(key - day * 86400.0)
+        result = epoch + datetime.timedelta(day, second)
+        converted.append(result.date() if second == 0 else result)
+    results = [converted[i] for i in inverse.tolist()]
+
+    if datemode == 0:
+        for i in numpy.nonzero(values < 61)[0].tolist():
+            if early is None:
+                raise ValueError('Excel date {0} is before 1 March 1900'.format(values[i]))
+            results[i] = early(float(values[i]))
+    return results
+
+def benchmark(rows=100000, distinct=500):
+    """ Time check in times with strptime and with DateParser, and Excel serials
+    one at a time against excelDates """
+    import random, time
+
+    random.seed(1)
+    start = datetime.datetime(2013, 6, 1, 6, 0)
+    times = [start + datetime.timedelta(minutes=15 * random.randint(0, distinct)) for n in range(rows)]
+
+    for timeFormat in (TIME_FORMATS[0], TIME_FORMATS[2]):
+        values = [t.strftime(timeFormat) for t in times]
+
+        begin = time.time()
+        expected = [datetime.datetime.strptime(v, timeFormat) for v in values]
+        strptimeTime = time.time() - begin
+
+        parser = DateParser(timeFormat, memoSize=0)
+        begin = time.time()
+        parsed = [parser(v) for v in values]
+        regexTime = time.time() - begin
+        assert parsed == expected
+
+        parser = DateParser()
+        begin = time.time()
+        parsed = [parser(v) for v in values]
+        memoTime = time.time() - begin
+        assert parsed == expected
+
+        print('{0:,} values {1}: strptime {2:.3f} sec, compiled {3:.3f} sec, detected with memo {4:.3f} sec'.format(
+            rows, timeFormat, strptimeTime, regexTime, memoTime))
+
+    serials = [(t - datetime.datetime(1899, 12, 30)).total_seconds() / 86400.0 for t in times]
+    epoch = datetime.datetime(1899, 12, 30)
+    def convert(value):
+        days = int(value)
+        seconds = int(round((value - days) * 86400.0))
+        result = epoch + datetime.timedelta(days, seconds)
+        if seconds == 0:
+            return result.date()
+        return result
+    begin = time.time()
+    single = [convert(value) for value in serials]
+    singleTime = time.time() - begin
+    # Load numpy before timing
+    excelDates([61.0])
+    begin = time.time()
+    assert excelDates(serials) == single
+    arrayTime = time.time() - begin
+    print('{0:,} Excel dates: one at a time {1:.3f} sec, excelDates {2:.3f} sec'.format(rows, singleTime, arrayTime))
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,168 @@
+#-------------------------------------------------------------------------------
+# Name:        ddp_export
+# Purpose:     Export data driven pages of the assignment maps from several
+#              processes, each with its own copy of the map document
+#
+# Author:      SMSR
+# Copyright:   (c) SMSR 2013
+# Licence:
+#     MapSAR wilderness search and rescue GIS data model and related python scripting
+#     Copyright (C) 2012  - Jon Pedder & SMSR
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+#
+# The pages are dealt out to the workers in turn, so every worker gets a mix of
+# small and large assignments. A worker opens the saved map document once and
+# exports its pages one after the other. Anything that is the same on every page,
+# map elements, layers and base data, must be set and saved in the document
+# before the workers start.
+#
+# Exporters have the same interface, exporter = Exporter(*args), then
+# exporter.exportPage(page) returning the file written and exporter.close().
+# FakeExporter writes small files with the real names, so the scheduling and the
+# output names can be checked without ArcGIS. Run this file directly for that.
+
+import os, sys, time
+
+# Error of a page whose assignment is not in the index layer
+NO_ASSIGNMENT = 'No assignment with this number'
+
+def pdfName(folder, page):
+    """ Path of the map for an assignment, the same name the serial export uses """
+    return('{0}/Team_Assignment_Map_{1}.pdf'.format(folder, page))
+
+def partition(pages, workers):
+    """ Deal the pages out to the workers in turn, returns a list of page lists """
+    workers = max(1, min(workers, len(pages)))
+    return([pages[i::workers] for i in range(workers)])
+
+class ArcpyExporter(object):
+    """ Exports pages of a DDP enabled map document """
+    def __init__(self, mxdPath, pdfFolder, mapScale, mxd=None):
+        import arcpy
+        self.pdfFolder = pdfFolder
+        self.mxd = mxd if mxd is not None else arcpy.mapping.MapDocument(mxdPath)
+        self.ddp = self.mxd.dataDrivenPages
+        self.indexLayer = self.ddp.indexLayer
+        if mapScale:
+            arcpy.mapping.ListDataFrames(self.mxd, "MapSAR")[0].scale = mapScale
+
+    def exportPage(self, page):
+        import arcpy
+        # For 10.2 compatibility removed quotes from query
+        iQuery = 'Assignments.Assignment_Number = {0}'.format(page)
+        arcpy.SelectLayerByAttribute_management(self.indexLayer, "NEW_SELECTION", iQuery)
+        if int(arcpy.GetCount_management(self.indexLayer).getOutput(0)) == 0:
+            raise ValueError(NO_ASSIGNMENT)
+        filename = pdfName(self.pdfFolder, page)
+        self.ddp.exportToPDF(filename, "SELECTED")
+        return(filename)
+
+    def close(self):
+        del self.ddp, self.indexLayer, self.mxd
+
+class FakeExporter(object):
+    """ Stands in for ArcpyExporter, writes the page number and process id to a
+    file with the real name. delay is the time a page takes """
+    def __init__(self, mxdPath, pdfFolder, mapScale, mxd=None, delay=0.0):
+        self.pdfFolder = pdfFolder
+        self.delay = delay
+
+    def exportPage(self, page):
+        if self.delay:
+            time.sleep(self.delay)
+        filename = pdfName(self.pdfFolder, page)
+        f = open(filename, 'w')
+        try:
+            f.write('{0} {1}\n'.format(page, os.getpid()))
+        finally:
+            f.close()
+        return(filename)
+
+    def close(self):
+        pass
+
+def _exportShare(share):
+    """ Export one worker's pages, returns (page, file or None, seconds, process id, error) for each """
+    exporterClass, args, pages = share
+    results = []
+    exporter = exporterClass(*args)
+    try:
+        for page in pages:
+            start = time.time()
+            try:
+                filename = exporter.exportPage(page)
+                error = None
+            except Exception as err:
+                filename = None
+                error = str(err)
+            results.append((page, filename, time.time() - start, os.getpid(), error))
+    finally:
+        exporter.close()
+    return(results)
+
+def _setExecutable():
+    """ Inside ArcMap sys.executable is ArcMap.exe, the workers must run python """
+    if os.name == 'nt' and not os.path.basename(sys.executable).lower().startswith('python'):
+        import multiprocessing
+        multiprocessing.set_executable(os.path.join(sys.exec_prefix, 'pythonw.exe'))
+
+def exportPages(pages, workers, exporterClass, args):
+    """ Export pages with exporterClass(*args) in each of workers processes, in
+    this process when workers is 1. Returns the results of every page, sorted
+    by page """
+    pages = sorted(pages)
+    shares = partition(pages, workers)
+    if len(shares) <= 1:
+        return(_exportShare((exporterClass, args, pages)))
+
+    import multiprocessing
+    _setExecutable()
+    pool = multiprocessing.Pool(len(shares))
+    try:
+        parts = pool.map(_exportShare, [(exporterClass, args, share) for share in shares], 1)
+    finally:
+        pool.close()
+        pool.join()
+
+    results = []
+    for part in parts:
+        results.extend(part)
+    return(sorted(results))
+
+def benchmark(pages=24, workers=4, delay=0.05):
+    """ Export pages with FakeExporter serially and with workers processes, check
+    every page was written once under its own name """
+    import shutil, tempfile
+
+    folder = tempfile.mkdtemp()
+    try:
+        pageList = list(range(1, pages + 1))
+        for count in (1, workers):
+            start = time.time()
+            results = exportPages(pageList, count, FakeExporter, (None, folder, None, None, delay))
+            seconds = time.time() - start
+            written = sorted(os.listdir(folder))
+            assert [r[0] for r in results] == pageList
+            assert written == sorted([os.path.basename(pdfName(folder, p)) for p in pageList])
+            processes = len(set([r[3] for r in results]))
+            print('{0} pages, {1} workers: {2:.2f} sec in {3} processes'.format(pages, count, seconds, processes))
+            for name in written:
+                os.remove(os.path.join(folder, name))
+    finally:
+        shutil.rmtree(folder)
+
+if __name__ == '__main__':
+    benchmark()
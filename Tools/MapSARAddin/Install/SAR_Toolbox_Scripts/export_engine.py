@@ -0,0 +1,138 @@
+#-------------------------------------------------------------------------------
+# Name:        export_engine
+# Purpose:     Export MapSAR tables to CSV files that import_engine reads back,
+#              optionally gzip compressed
+#
+# Author:      SMSR
+# Copyright:   (c) SMSR 2013
+# Licence:
+#     MapSAR wilderness search and rescue GIS data model and related python scripting
+#     Copyright (C) 2012  - Jon Pedder & SMSR
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+#
+# The table is read once through a search cursor on the listed fields only, and
+# the lines go through a csv writer on a buffered file. The header is the field
+# names in the order given, dates are written mm/dd/yyyy hh:mm:ss, the first of
+# the import date formats with seconds, so the import tools can match the
+# columns and read the dates back. Dates are formatted from their fields, on
+# Python 2 strftime refuses the 1899-12-30 dates of time only values.
+#
+# Tables are the import_engine interface, ArcpyTable or MemoryTable.
+#
+# Run this file directly for the benchmark.
+
+import csv, datetime, gzip, os
+
+# Bytes buffered before they are written to the file
+BUFFER_SIZE = 1 << 16
+
+def formatDateTime(value):
+    """ value as date_parser.EXPORT_FORMAT, strftime fails before 1900 """
+    return '%02d/%02d/%04d %02d:%02d:%02d' % (value.month, value.day, value.year,
+                                              value.hour, value.minute, value.second)
+
+def formatDate(value):
+    return '%02d/%02d/%04d 00:00:00' % (value.month, value.day, value.year)
+
+def formatText(value):
+    return value.encode('utf-8')
+
+# Text for each type of value, other types are written with str
+_FORMATTERS = {type(None): lambda value: '',
+               datetime.datetime: formatDateTime,
+               datetime.date: formatDate,
+               unicode: formatText,
+               float: repr}
+
+def csvName(filename, compress=False):
+    """ Output file name, .gz is added for compressed files """
+    if compress and not filename.lower().endswith('.gz'):
+        return filename + '.gz'
+    return filename
+
+def writeCSV(rows, fields, f):
+    """ Write the header and a line for each row to the open file f, returns the rows written """
+    writer = csv.writer(f, dialect='excel')
+    writer.writerow(fields)
+    formatters = _FORMATTERS
+    count = 0
+    for row in rows:
+        writer.writerow([formatters.get(type(value), str)(value) for value in row])
+        count += 1
+    return count
+
+def exportTable(table, fields, filename, compress=False):
+    """ Export fields of table to filename, returns (file written, rows) """
+    filename = csvName(filename, compress)
+    output = open(filename, 'wb', BUFFER_SIZE)
+    try:
+        f = gzip.GzipFile(filename, 'wb', 6, output) if compress else output
+        try:
+            with table.searchCursor(fields) as cursor:
+                count = writeCSV(cursor, fields, f)
+        finally:
+            if compress:
+                f.close()
+    finally:
+        output.close()
+    return(filename, count)
+
+def benchmark(rows=200000):
+    """ Export a synthetic Team_Members table plain and compressed, read it back
+    with import_engine, dates to the second """
+    import shutil, tempfile, time
+    import import_engine as engine
+
+    start = datetime.datetime(2013, 6, 1, 6, 0)
+    fields = ['Name', 'isLeader', 'Role', 'InService', 'Check_In', 'Check_Out', 'Team_Name',
+              'Originating_Team', 'Skills', 'Body_Weight', 'Gear_Weight']
+    records = []
+    for i in xrange(rows):
+        records.append(dict(zip(fields, [u'Member {0}'.format(i), i % 6 == 0, u'Searcher', 1,
+                                         start + datetime.timedelta(minutes=15 * (i % 500), seconds=i % 60), None,
+                                         u'Team {0}'.format(i % 40), u'SMSR', u'EMT, "rope", tracking',
+                                         150 + i % 60, 35.5])))
+    # The geodatabase stores a time of day on 30 December 1899
+    records[0]['Check_In'] = datetime.datetime(1899, 12, 30, 14, 25, 30)
+    table = engine.MemoryTable(records)
+
+    folder = tempfile.mkdtemp()
+    try:
+        for compress in (False, True):
+            begin = time.time()
+            filename, count = exportTable(table, ['OID@'] + fields, os.path.join(folder, 'Team_Members.csv'), compress)
+            seconds = time.time() - begin
+            size = os.path.getsize(filename)
+            print('{0:,} rows{1}: {2:.2f} sec, {3:,.0f} rows a sec, {4:,} bytes'.format(
+                count, ' gzip' if compress else '', seconds, count / seconds, size))
+
+        # Read the plain file back, the dates in the detected format
+        schema = engine.TableSchema('Team_Members', ('OID@', 'OID@', engine.integer()),
+                                    [('Name', 'Name', engine.text()), ('Check_In', 'Check_In', engine.dateTime())])
+        result = engine.ImportResult()
+        f = open(os.path.join(folder, 'Team_Members.csv'), 'rb')
+        try:
+            readBack = list(engine.readCSV(f, schema, result))
+        finally:
+            f.close()
+        assert len(readBack) == rows and not result.errors
+        assert readBack[0][2] == [records[0]['Name'], records[0]['Check_In']]
+        assert readBack[1][2] == [records[1]['Name'], records[1]['Check_In']]
+    finally:
+        shutil.rmtree(folder)
+
+if __name__ == '__main__':
+    benchmark()
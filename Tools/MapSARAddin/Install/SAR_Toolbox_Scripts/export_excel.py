@@ -33,8 +33,11 @@ Convert an table to a MS Excel spreadsheet.
 import arcpy
 import os
 import sys
+import itertools
 import xlwt
 import datetime
+import xlsx_writer
+from xlwt.Cell import BlankCell, NumberCell, StrCell
 
 from arcpy import env
 
@@ -150,8 +153,134 @@ def add_error(id, s=None):
         raise arcpy.ExecuteError, arcpy.GetIDMessage(id)
 
 
+# Excel day 0 for dates after February 1900
+EXCEL_EPOCH = datetime.datetime(1899, 12, 30)
+
+# Data rows of an .xls sheet, after the header row
+XLS_MAX_ROWS = 65535
+
+# Field types written as whole numbers
+INTEGER_TYPES = ('OID', 'Integer', 'SmallInteger')
+
+def number_column(xf):
+    """ Cells of a numeric column """
+    def cell(rowx, colx, value):
+        if value is None:
+            return BlankCell(rowx, colx, xf)
+        return NumberCell(rowx, colx, xf, value)
+    return cell
+
+def text_column(workbook, xf):
+    """ Cells of a text column, strings go in the workbook's shared string table """
+    add_str = workbook.add_str
+    def cell(rowx, colx, value):
+        if value is None or value == '':
+            return BlankCell(rowx, colx, xf)
+        return StrCell(rowx, colx, xf, add_str(value))
+    return cell
+
+def date_column(xfDefault, xfDate, xfTime, xfDateTime):
+    """ Cells of a date column. Midnight is a date, a time on 30 December 1899
+    is a time of day, anything else a date and time """
+    def cell(rowx, colx, value):
+        if value is None:
+            return BlankCell(rowx, colx, xfDefault)
+        if value.hour == 0 and value.minute == 0:
+            xf = xfDate
+        elif value.year == 1899 and value.month == 12 and value.day == 30:
+            xf = xfTime
+        else:
+            xf = xfDateTime
+        delta = value - EXCEL_EPOCH
+        return NumberCell(rowx, colx, xf, delta.days + delta.seconds / 86400.0)
+    return cell
+
+def column_plan(workbook, fields, styles):
+    """ A cell function per field, picked once from the field type with its
+    style registered once in the workbook. styles is a dict of XFStyles keyed
+    by Default, Int, Date, Time and DateTime """
+    xf = dict((key, workbook.add_style(style)) for key, style in styles.items())
+    plan = []
+    for field in fields:
+        if field.type == 'Date':
+            plan.append(date_column(xf['Default'], xf['Date'], xf['Time'], xf['DateTime']))
+        elif field.type in INTEGER_TYPES:
+            plan.append(number_column(xf['Int']))
+        elif field.type in ('Double', 'Single'):
+            plan.append(number_column(xf['Default']))
+        else:
+            plan.append(text_column(workbook, xf['Default']))
+    return plan
+
+def write_rows(worksheet, plan, rows, row_index=1):
+    """ Write rows to worksheet from row_index on, returns the next row index """
+    plan = list(enumerate(plan))
+    last_col = len(plan) - 1
+    for values in rows:
+        row = worksheet.row(row_index)
+        # Sets the column range and height of the row, the cell is replaced below
+        row.set_cell_blank(last_col)
+        for col_index, cell in plan:
+            row.insert_cell(col_index, cell(row_index, col_index, values[col_index]))
+        row_index += 1
+    return row_index
+
+def column_width(field):
+    """ Width of a column in characters """
+    if field.type == 'String':
+        return min(50, field.length)
+    return 16
+
+def column_kind(field):
+    """ xlsx_writer column kind of a field """
+    if field.type == 'Date':
+        return 'date'
+    if field.type in INTEGER_TYPES:
+        return 'integer'
+    if field.type in ('Double', 'Single'):
+        return 'number'
+    return 'text'
+
+def sheet_name(output, number=1):
+    """ Sheet name from the output file name, later sheets of a split table are
+    numbered name_2, name_3 and so on """
+    name = os.path.splitext(os.path.basename(output))[0]
+    if number > 1:
+        suffix = '_{0}'.format(number)
+        return validate_sheet_name(name[:31 - len(suffix)] + suffix)
+    return validate_sheet_name(name)
+
+def add_data_sheet(workbook, name, fields, header_style):
+    """ A sheet with the header row and frozen panes. Rows are written once,
+    write_rows replaces the blank cell that sets the size of each row """
+    worksheet = workbook.add_sheet(name, cell_overwrite_ok=True)
+
+    # Add first (header) row
+    for index, field in enumerate(fields):
+        worksheet.write(0, index, field.name, header_style)
+        worksheet.col(index).width = column_width(field)*256
+
+    # Freeze panes
+    worksheet.set_panes_frozen(True)
+    worksheet.set_horz_split_pos(1)
+    worksheet.set_remove_splits(True)
+    return worksheet
+
+def table_to_xlsx(in_table, output, fields):
+    """ Writes a table to an XLSX file, a row at a time """
+    columns = [(field.name, column_kind(field), column_width(field)) for field in fields]
+    writer = xlsx_writer.XlsxWriter(output, sheet_name(output), columns)
+    try:
+        with arcpy.da.SearchCursor(in_table, [i.name for i in fields]) as cursor:
+            rows = writer.writeRows(cursor)
+    finally:
+        writer.close()
+    return rows
+
 def table_to_excel(in_table, output, fields):
-    """ Writes a table to an XLS file """
+    """ Writes a table to an XLS file, or an XLSX file if output ends in .xlsx.
+    Tables with more rows than an XLS sheet holds go on as many sheets as needed.
+    Returns the number of rows written """
 
     use_field_alias=False
     use_domain_desc=False
@@ -160,34 +289,18 @@ def table_to_excel(in_table, output, fields):
 
     arcpy.env.overwriteOutput = True
 
+    if output.lower().endswith('.xlsx'):
+        return table_to_xlsx(in_table, output, fields)
 
-    if int(arcpy.GetCount_management(in_table)[0]) > 65535:
+    if len(fields) > 255:
         # Input table exceeds the 256 columns limit of the .xls file format.
-        add_error(1531)
-
-    elif len(fields) > 255:
-        # Input table exceeds the 65535 rows limit of the .xls file format.
         add_error(1530)
 
     # Make spreadsheet
     workbook = xlwt.Workbook()
-    worksheet = workbook.add_sheet(validate_sheet_name(os.path.splitext(os.path.basename(output))[0]))
 
-    # Add first (header) row
     header_style = xlwt.easyxf("font: bold on; align: horiz center; pattern: pattern solid, fore-colour 0x16;")
 
-    for index, field in enumerate(fields):
-        worksheet.write(0, index, field.name, header_style)
-        if field.type == 'String':
-            worksheet.col(index).width = min(50, field.length)*256
-        else:
-            worksheet.col(index).width = 16*256
-
-    # Freeze panes
-    worksheet.set_panes_frozen(True)
-    worksheet.set_horz_split_pos(1)
-    worksheet.set_remove_splits(True)
-
     # Set cell format/styles for data types
     styleDefault = xlwt.XFStyle()
 
@@ -203,37 +316,37 @@ def table_to_excel(in_table, output, fields):
     styleInt = xlwt.XFStyle()
     styleInt.num_format_str = '0'
 
+    styles = {'Default': styleDefault, 'Int': styleInt, 'Date': styleDate,
+              'Time': styleTime, 'DateTime': styleDateTime}
+    plan = column_plan(workbook, fields, styles)
+
     field_names = [i.name for i in fields]
-    # Loop through input records
+    # Loop through input records, the converter and style of each column are
+    # picked once from the field type. A full sheet is flushed to the workbook's
+    # record data before the next one is started
 
+    rows = 0
+    sheets = 0
     with arcpy.da.SearchCursor(in_table, field_names) as cursor:
-        row_index = 1
-        for row in cursor:
-            for col_index, value in enumerate(row):
-
-                #if (fields[col_index].domain_desc or fields[col_index].subtype_desc):
-                    #value = fields[col_index].updateValue(row, field_names)
-
-                if isinstance(value, datetime.datetime):
-                    if (value.hour == 0) and (value.minute == 0):
-                        style = styleDate
-                    elif (value.year == 1899) and (value.month == 12) and (value.day == 30):
-                        style = styleTime
-                        value = (value-datetime.datetime(1899, 12,30,0,0,0)).total_seconds()/86400.0
-                    else:
-                        style = styleDateTime
-
-                elif isinstance(value, int):
-                    style = styleInt
-
-                else:
-                    style = styleDefault
-
-                # write to the cell
-                worksheet.write(row_index, col_index, value, style)
-            row_index+=1
+        records = iter(cursor)
+        while True:
+            first = next(records, None)
+            # An empty table still gets its sheet
+            if first is None and sheets > 0:
+                break
+            sheets += 1
+            worksheet = add_data_sheet(workbook, sheet_name(output, sheets), fields, header_style)
+            if first is None:
+                break
+            sheet_rows = itertools.islice(itertools.chain([first], records), XLS_MAX_ROWS)
+            rows += write_rows(worksheet, plan, sheet_rows) - 1
+            worksheet.flush_row_data()
+
+    if sheets > 1:
+        arcpy.AddMessage('{0} rows written on {1} sheets'.format(rows, sheets))
 
     workbook.save(output)
+    return rows
 
 def set_fc(targetTable):
     """ set correct FC based on user input """
@@ -251,13 +364,13 @@ def set_fc(targetTable):
         fList = ['OBJECTID', 'Name', 'isLeader', 'Role', 'InService', 'Check_In', 'Check_Out', 'Team_Name', 'Originating_Team', 'Skills', 'Body_Weight', 'Gear_Weight']
 
     elif targetTable == 'Operational Periods':
-        fc = "Operation_Periods"
+        fc = "Operation_Period"
         fList = ['OBJECTID','Period', 'Start_Date', 'End_Date', 'Weather', 'Incident_Name', 'Incident_Commander', 'Planning_Chief','Operations_Chief', 'Logistics_Chief', \
         'Air_Operations_Chief', 'Transportation_Chief', 'Safety_Message', 'Primary_Comms', 'Emergency_Comms']
 
     elif targetTable == 'Subject Information':
         fc = "PLS_Subject_Information"
-        fList = ['OBJECTID','Display', 'Date', 'Victim_Number', 'Name', 'Incident_Name', 'Description', 'Gender', 'Age', 'Height, Weight', 'Hair_Color', 'Clothing', 'Other']
+        fList = ['OBJECTID','Display', 'Date', 'Victim_Number', 'Name', 'Incident_Name', 'Description', 'Gender', 'Age', 'Height', 'Weight', 'Hair_Color', 'Clothing', 'Other']
 
     # Return field objects rather than strings
     listFields = arcpy.ListFields(fc)
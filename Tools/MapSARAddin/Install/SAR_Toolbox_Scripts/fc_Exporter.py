@@ -19,13 +19,54 @@
 #     along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #-------------------------------------------------------------------------------
 
-import arcpy, csv
+import arcpy, os, time
 from arcpy import env
+import export_engine
+import import_engine as engine
 workspace = arcpy.env.workspace
 
+# Table choice of the tool, table and the fields exported, in column order.
+# The column names are the ones the CSV import (fc_Importer) looks for
+EXPORT_TABLES = [
+    ('Assignments', "Assignments",
+     ['Assignments.Assignment_Number','Assignments.Period','Assignments.Status','Assignments.Team_Name', "Assignments.Description", 'Assignments.Transportation', 'Assignments.Personal_Equipment','Assignments.Team_Equipment','Assignments.Comm_Instructions','Assignments.Debrief_location']),
+    ('Teams', "Teams",
+     ["Team_Name","Team_Type","Status","Leader","Description","Radio_Call_Sign"]),
+    # membersDict[eID] = [eName,eLeader,eRole,eInService,eCheck_In,eCheck_Out,eTeam_Name,eOriginating_Team,eSkills,eBody_Weight,eGear_Weight]
+    ('Team Members', "Team_Members",
+     ["OBJECTID","Name","isLeader","Role","InService","Check_in","Check_Out","Team_Name","Originating_Team","Skills","Body_Weight","Gear_Weight"]),
+    ('Operational Periods', "Operation_Period",
+     ["Period", "Start_Date","End_Date","Weather","Incident_Name","Incident_Commander","Planning_Chief","Operations_Chief","Logistics_Chief","Air_Operations_Chief","Transportation_Chief","Safety_Message","Primary_Comms","Emergency_Comms"]),
+    ('Subject Information', "PLS_Subject_Information",
+     ["Date","Victim_Number","Name","Incident_Name","Description","Gender","Age","Height","Weight","Hair_Color","Clothing","Other"]),
+    ('Reporting Party Information', "RP",
+     ["Date_Time","Name","Cell_Phone","Land_Line","email","Relationship","Notes"])]
+
+# Choice that exports every table above, each to <table>.csv in the folder
+ALL_TABLES = 'All Tables'
+
+def exportCSV(fc, fields, filename):
+    """ Export one table, gzip compressed when filename ends in .gz. False if the
+    file exists and may not be overwritten """
+    if os.path.exists(filename) and not arcpy.env.overwriteOutput:
+        arcpy.AddError("{0} already exists".format(filename))
+        return False
+    start = time.time()
+    compress = filename.lower().endswith('.gz')
+    filename, count = export_engine.exportTable(engine.ArcpyTable(fc), fields, filename, compress)
+    arcpy.AddMessage("{0}: {1} rows exported to {2} in {3:.1f} sec".format(fc, count, filename, time.time() - start))
+    return True
+
+def exportAll(folder, compress=False):
+    """ Export every table of EXPORT_TABLES to <table>.csv in folder, or to
+    <table>.csv.gz when compress """
+    for choice, fc, fields in EXPORT_TABLES:
+        exportCSV(fc, fields, export_engine.csvName("{0}/{1}.csv".format(folder, fc), compress))
+
 # 0. destination Folder - Folder
-# 1. From value list, select table - String
-# 2. Destination file name - string
+# 1. From value list, select table or All Tables - String
+# 2. Destination file name - string, a name ending in .gz is gzip compressed. With
+#    All Tables only the .gz ending is used, each table goes to <table>.csv(.gz)
 # 3. Overwrite file option - boolean
 targetfolder = arcpy.GetParameterAsText(0)
 selectTable = arcpy.GetParameterAsText(1)
@@ -40,34 +81,13 @@ if overwrite == "true":
 # Build filename
 filename = targetfolder+"/"+targetfile
 
-# Select which FC will be exported and assign the fields to selectTable list
-if selectTable == 'Assignments':
-    fc = "Assignments"
-    fields = ['Assignments.Assignment_Number','Assignments.Period','Assignments.Status','Assignments.Team_Name', "Assignments.Description", 'Assignments.Transportation', 'Assignments.Personal_Equipment','Assignments.Team_Equipment','Assignments.Comm_Instructions','Assignments.Debrief_location']
-elif selectTable == 'Teams':
-    fc = "Teams"
-    fields = ["Team_Name","Team_Type","Status","Leader","Description","Radio_Call_Sign"]
-elif selectTable == 'Team Members':
-    fc = "Team_Members"
-    # membersDict[eID] = [eName,eLeader,eRole,eInService,eCheck_In,eCheck_Out,eTeam_Name,eOriginating_Team,eSkills,eBody_Weight,eGear_Weight]
-    fields = ["OBJECTID","Name","isLeader","Role","InService","Check_in","Check_Out","Team_Name","Originating_Team","Skills","Body_Weight","Gear_Weight"]
-elif selectTable == 'Operational Periods':
-    fc = "Operation_Periods"
-    fields = ["Period", "Start_Date","End_Date","Weather","Incident_Name","Incident_Commander","Planning_Chief","Operations_Chief","Logistics_Chief","Air_Operations_Chief","Transportation_Chief","Safety_Message","Primary_Comms","Emergency_Comms"]
-elif selectTable == 'Subject Information':
-    fc = "PLS_Subject_Information"
-    fields = ["Date","Victim_Number","Name","Incident_Name","Description","Gender","Age","Height","Weight","Hair_Color","Clothing","Other"]
-elif selectTable == 'Reporting Party Information':
-    fc = "RP"
-    fields = ["Date_Time","Name","Cell_Phone","Land_Line","email","Relationship","Notes"]
+# Select which FC will be exported and the fields to export
+tables = dict((choice, (fc, fields)) for choice, fc, fields in EXPORT_TABLES)
+if selectTable == ALL_TABLES:
+    exportAll(targetfolder, targetfile.lower().endswith('.gz'))
+elif selectTable in tables:
+    fc, fields = tables[selectTable]
+    exportCSV(fc, fields, filename)
 else:
     # If nothing matched drop out
-    Arcpy.Message("There is a problem with your selection")
-    fc = ""
-    fields = []
-
-
-# Process: Export Feature Attribute to ASCII...
-rows = arcpy.SearchCursor(fc)
-arcpy.ExportXYv_stats(fc,fields, "COMMA", filename, "ADD_FIELD_NAMES")
-
+    arcpy.AddError("There is a problem with your selection")
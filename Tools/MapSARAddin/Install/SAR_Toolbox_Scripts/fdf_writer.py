@@ -0,0 +1,337 @@
+#-------------------------------------------------------------------------------
+# Name:        fdf_writer
+# Purpose:     Write ICS 204 task assignment forms as Adobe FDF files. The field
+#              template is compiled once and each form is written in one piece
+#
+# Author:      SMSR
+# Copyright:   (c) SMSR 2013
+# Of Note:     Original FDF file concept, credit Don Ferguson
+# Licence:
+#     MapSAR wilderness search and rescue GIS data model and related python scripting
+#     Copyright (C) 2012  - Jon Pedder & SMSR
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+#
+# A form is rendered from a record, a dict of values keyed by the field names of
+# the MapSAR tables. Fields whose key is missing from the record are left off the
+# form, so a record without period information simply has no period fields.
+# Team members are in record['Members'] as {role: member values}.
+#
+# Run this file directly for the 1,000 form benchmark.
+
+import datetime, os, re
+
+# Template the FDF fields are merged into
+PDF_TEMPLATE = 'Task_Assignment_Template.pdf'
+
+# ICS 204 form field and the record key it is filled from, in form order
+TASK_FORM_FIELDS = [('IncidentName', 'Incident_Name'),
+                    ('Weather', 'Weather'),
+                    ('IC', 'Incident_Commander'),
+                    ('PreparedBy', 'Planning_Chief'),
+                    ('Operations', 'Operations_Chief'),
+                    ('Logistics', 'Logistics_Chief'),
+                    ('AirOps', 'Air_Operations_Chief'),
+                    ('SafetyMessage', 'Safety_Message'),
+                    ('PrimaryComs', 'Primary_Comms'),
+                    ('EmergencyComs', 'Emergency_Comms'),
+                    ('StartDate', 'Start_Date'),
+                    ('AssignmentNum', 'Assignment_Number'),
+                    ('AssignDescription', 'Description'),
+                    ('AssignMileage', 'Mileage'),
+                    ('AssignStatus', 'Status'),
+                    ('AssignPeriod', 'Period'),
+                    ('AssignTeam', 'Team_Name'),
+                    ('AssignTransportation', 'Transportation'),
+                    ('AssignPersonalEquipment', 'Personal_Equipment'),
+                    ('AssignTeamEquipment', 'Team_Equipment'),
+                    ('AssignComInstructions', 'Comm_Instructions'),
+                    ('Assignlocation', 'DeBrief_Location'),
+                    ('TeamType', 'Team_Type'),
+                    ('TeamCallSign', 'Radio_Call_Sign')]
+
+# Fields written after the team members
+PREPARED_FIELDS = [('PrepDate', 'PrepDate'),
+                   ('PrepTime', 'PrepTime')]
+
+# Position of each value in a team member list, as read by AssignmentLookups.members
+MEMBER_NAME, MEMBER_ROLE, MEMBER_TEAM, MEMBER_ORIGTEAM, MEMBER_SKILLS, MEMBER_WEIGHT = range(6)
+
+_HEADER = ('%FDF-1.2\n'
+           '%????\n'
+           '1 0 obj<</FDF<</F({0})/Fields 2 0 R>>>>\n'
+           'endobj\n'
+           '2 0 obj[\n'
+           '\n').format(PDF_TEMPLATE)
+
+_FOOTER = (']\n'
+           'endobj\n'
+           'trailer\n'
+           '<</Root 1 0 R>>\n'
+           '%%EO\n')
+
+# Characters that end or break a PDF literal string
+_SPECIAL = re.compile(r'[\\()\r\n]')
+
+# Text that goes into a literal string as it is, ASCII without specials
+_PLAIN = re.compile(r'[^\\()\r\n\x80-\xff]*$')
+
+def escapeText(text):
+    """ Escape the characters that end or break a PDF literal string """
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)').replace('\r', '\\r').replace('\n', '\\n')
+
+def compileTemplate(fields):
+    """ Turn (form field, record key) pairs into (field prefix, record key) pairs
+    with the FDF text up to the value already built """
+    return [('<</T({0})/V'.format(escapeText(field)), key) for field, key in fields]
+
+_formFields = compileTemplate(TASK_FORM_FIELDS)
+_preparedFields = compileTemplate(PREPARED_FIELDS)
+
+def pdfString(value):
+    """ value as a PDF string. ASCII text is a literal string, anything else is
+    written as UTF-16 with a byte order mark so accented names survive """
+    if isinstance(value, str):
+        if _PLAIN.match(value) is not None:
+            return '(' + value + ')'
+        value = value.decode('utf-8', 'replace')
+    try:
+        value = value.encode('ascii')
+    except UnicodeEncodeError:
+        return '<FEFF{0}>'.format(value.encode('utf-16-be').encode('hex').upper())
+    if _SPECIAL.search(value) is None:
+        return '(' + value + ')'
+    return '(' + escapeText(value) + ')'
+
+def formatValue(value):
+    """ Text for a field value. NULL text, empty values and numbers that are not
+    positive are left blank, as clearNulls did """
+    if value is None:
+        return ''
+    if isinstance(value, basestring):
+        if 'NULL' in value:
+            return ''
+        return value
+    if isinstance(value, (int, long, float)) and not isinstance(value, bool):
+        if not value > 0:
+            return ''
+        return str(value)
+    return unicode(value)
+
+# Field values kept as PDF strings, most incident and period values are the same
+# on every form. The memo is emptied when full
+MEMO_SIZE = 4096
+_memo = {}
+
+def fieldText(value):
+    """ PDF string of a field value, pdfString(formatValue(value)) """
+    # The type is part of the key, True == 1 but they are written differently
+    key = (value.__class__, value)
+    text = _memo.get(key)
+    if text is None:
+        text = pdfString(formatValue(value))
+        if len(_memo) >= MEMO_SIZE:
+            _memo.clear()
+        _memo[key] = text
+    return text
+
+def _memberOrder(role):
+    """ Team Leader first, then Team Member.1, Team Member.2 ... """
+    if role == 'Team Leader':
+        return (0, 0)
+    try:
+        return (1, int(role.rsplit('.', 1)[1]))
+    except (IndexError, ValueError):
+        return (2, role)
+
+# Field prefixes of each team member role, compiled the first time the role is seen
+_MEMBER_SUFFIXES = ('name', 'roll', 'team', 'origteam', 'skillsandweight')
+_rolePrefixes = {}
+
+def _memberPrefixes(role):
+    prefixes = _rolePrefixes.get(role)
+    if prefixes is None:
+        escaped = escapeText(role)
+        prefixes = tuple(['<</T({0}.{1})/V'.format(escaped, suffix) for suffix in _MEMBER_SUFFIXES])
+        _rolePrefixes[role] = prefixes
+    return prefixes
+
+def _memberFields(parts, members):
+    for role in sorted(members, key=_memberOrder):
+        member = members[role]
+        name, roll, team, origteam, skillsandweight = _memberPrefixes(role)
+        parts.append(name + fieldText(member[MEMBER_NAME]) + '>>\n')
+        if member[MEMBER_ROLE] is not None:
+            parts.append(roll + fieldText(member[MEMBER_ROLE]) + '>>\n')
+        parts.append(team + fieldText(member[MEMBER_TEAM]) + '>>\n')
+        parts.append(origteam + fieldText(member[MEMBER_ORIGTEAM]) + '>>\n')
+        weight = member[MEMBER_WEIGHT]
+        if weight is not None and weight > 0:
+            skills = u'{0} - weight = {1}'.format(formatValue(member[MEMBER_SKILLS]), weight)
+            parts.append(skillsandweight + pdfString(skills) + '>>\n')
+        else:
+            parts.append(skillsandweight + fieldText(member[MEMBER_SKILLS]) + '>>\n')
+
+def _templateFields(parts, template, record):
+    # The memo is looked up here, most values are in it
+    memo = _memo
+    for prefix, key in template:
+        if key in record:
+            value = record[key]
+            text = memo.get((value.__class__, value))
+            if text is None:
+                text = fieldText(value)
+            parts.append(prefix + text + '>>\n')
+
+def renderForm(record):
+    """ Complete FDF text for one record """
+    parts = [_HEADER]
+    _templateFields(parts, _formFields, record)
+    if record.get('Members'):
+        _memberFields(parts, record['Members'])
+    _templateFields(parts, _preparedFields, record)
+    parts.append(_FOOTER)
+    return ''.join(parts)
+
+def writeForm(filename, record):
+    """ Render and write one form with a single write """
+    text = renderForm(record)
+    f = open(filename, 'wb')
+    try:
+        f.write(text)
+    finally:
+        f.close()
+    return(filename)
+
+def writeForms(forms):
+    """ Write every (filename, record) in forms. Returns the filenames in the same
+    order as forms """
+    return [writeForm(filename, record) for filename, record in forms]
+
+def prepStamp(now=None):
+    """ PrepDate and PrepTime values for the time a form is made """
+    if now is None:
+        now = datetime.datetime.now()
+    return {'PrepDate': now.strftime("%m-%d-%Y"), 'PrepTime': now.strftime("%H.%M %p")}
+
+def benchmark(forms=1000, rounds=5):
+    """ Time 1,000 forms from synthetic records, the old per field writes against
+    the compiled template. Best of rounds, written to files and formatted in
+    memory, as creating the files can take most of the time """
+    import shutil, tempfile, time
+
+    records = []
+    for n in range(1, forms + 1):
+        record = {'Incident_Name': 'Benchmark Search', 'Weather': 'Clear, winds 5-10 (gusts 20)',
+                  'Incident_Commander': 'IC Name', 'Planning_Chief': 'Plans Name', 'Operations_Chief': 'Ops Name',
+                  'Logistics_Chief': 'Logs Name', 'Air_Operations_Chief': None, 'Safety_Message': 'Carry water\nCheck in hourly',
+                  'Primary_Comms': 'SAR 1', 'Emergency_Comms': 'SAR 2', 'Start_Date': datetime.datetime(2013, 2, 20, 8, 0),
+                  'Assignment_Number': n, 'Description': 'Hasty search of trail segment {0}'.format(n), 'Mileage': 2.5,
+                  'Status': 'Planned', 'Period': 1, 'Team_Name': 'Team {0}'.format(n), 'Transportation': 'Foot',
+                  'Personal_Equipment': '24 hour pack', 'Team_Equipment': 'Radio', 'Comm_Instructions': 'Check in on SAR 1',
+                  'DeBrief_Location': 'Base', 'Team_Type': 'Ground', 'Radio_Call_Sign': 'Team {0}'.format(n)}
+        record.update(prepStamp())
+        record['Members'] = {'Team Leader': [u'Leader {0}'.format(n), 'Leader', record['Team_Name'], 'SMSR', 'EMT', 180],
+                             'Team Member.1': [u'Jos\xe9 {0}'.format(n), None, record['Team_Name'], 'SMSR', 'Tracker', 0],
+                             'Team Member.2': [u'Member {0}'.format(n), 'Medic', record['Team_Name'], 'SMSR', 'NULL', 165]}
+        records.append(record)
+
+    def legacyClearNulls(values):
+        """ clearNulls as it was """
+        for i in range(len(values)):
+            valueType = type(values[i])
+            if valueType is str or valueType is unicode:
+                if 'NULL' in values[i]:
+                    values[i] = ''
+            elif valueType is int or valueType is float or valueType is long:
+                if not values[i] > 0:
+                    values[i] = None
+        return(values)
+
+    def legacyText(value):
+        if isinstance(value, unicode):
+            return value.encode('utf-8')
+        return value
+
+    def legacyForm(txt, record):
+        """ One write per field to the open file txt after clearNulls, the way the
+        forms used to be written, without escaping """
+        for line in _HEADER.splitlines(True):
+            txt.write(line)
+        fields = [(field, key) for field, key in TASK_FORM_FIELDS if key in record]
+        values = legacyClearNulls([record[key] for field, key in fields])
+        for (field, key), value in zip(fields, values):
+            txt.write('<</T({0})/V({1})>>\n'.format(field, legacyText(value)))
+        for role, member in record['Members'].iteritems():
+            member = legacyClearNulls(list(member))
+            txt.write('<</T({0}.name)/V({1})>>\n'.format(role, legacyText(member[MEMBER_NAME])))
+            if member[MEMBER_ROLE] != None:
+                txt.write('<</T({0}.roll)/V({1})>>\n'.format(role, legacyText(member[MEMBER_ROLE])))
+            txt.write('<</T({0}.team)/V({1})>>\n'.format(role, legacyText(member[MEMBER_TEAM])))
+            txt.write('<</T({0}.origteam)/V({1})>>\n'.format(role, legacyText(member[MEMBER_ORIGTEAM])))
+            if member[MEMBER_WEIGHT] > 0:
+                txt.write('<</T({0}.skillsandweight)/V({1} - weight = {2})>>\n'.format(role, legacyText(member[MEMBER_SKILLS]), member[MEMBER_WEIGHT]))
+            elif member[MEMBER_WEIGHT] == None:
+                txt.write('<</T({0}.skillsandweight)/V({1})>>\n'.format(role, legacyText(member[MEMBER_SKILLS])))
+        for field, key in PREPARED_FIELDS:
+            txt.write('<</T({0})/V({1})>>\n'.format(field, record[key]))
+        for line in _FOOTER.splitlines(True):
+            txt.write(line)
+
+    class Sink(object):
+        """ Stands in for the file, to time the formatting alone """
+        def __init__(self):
+            self.write = [].append
+
+    def legacyWrite(tasks):
+        for filename, record in tasks:
+            txt = open(filename, 'w')
+            legacyForm(txt, record)
+            txt.close()
+
+    def legacyFormat():
+        for record in records:
+            legacyForm(Sink(), record)
+
+    def compiledFormat():
+        for record in records:
+            renderForm(record)
+
+    # Each way writes new files in a folder of its own
+    folder = tempfile.mkdtemp()
+    try:
+        results = {}
+        for n in range(rounds):
+            for name, run in (('legacy', legacyFormat), ('compiled', compiledFormat)):
+                start = time.time()
+                run()
+                results[name + ' format'] = min(results.get(name + ' format', 1e9), time.time() - start)
+            for name, write in (('legacy', legacyWrite), ('compiled', writeForms)):
+                path = os.path.join(folder, '{0}{1}'.format(name, n))
+                os.mkdir(path)
+                tasks = [(os.path.join(path, 'Assignment_Task_{0}_.fdf'.format(r['Assignment_Number'])), r) for r in records]
+                start = time.time()
+                write(tasks)
+                results[name] = min(results.get(name, 1e9), time.time() - start)
+    finally:
+        shutil.rmtree(folder)
+
+    print('{0} forms, one write per field: {1:.3f} sec, formatting {2:.3f} sec'.format(
+        forms, results['legacy'], results['legacy format']))
+    print('{0} forms, compiled template: {1:.3f} sec, formatting {2:.3f} sec'.format(
+        forms, results['compiled'], results['compiled format']))
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,317 @@
+#-------------------------------------------------------------------------------
+# Name:        import_engine
+# Purpose:     Import CSV files into MapSAR tables from a per table schema.
+#              Supports UPDATE, APPEND and OVERWRITE ALL
+#
+# Author:      SMSR
+# Copyright:   (c) SMSR 2013
+# Licence:
+#     MapSAR wilderness search and rescue GIS data model and related python scripting
+#     Copyright (C) 2012  - Jon Pedder & SMSR
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+#
+# A TableSchema names the table, the key column used to match CSV lines to
+# records and the CSV column, field and converter of every other value. The CSV
+# is read once, a line at a time, and every import touches the table with a
+# single cursor.
+#
+# The table itself is reached through a small interface, searchCursor(fields),
+# updateCursor(fields), insertCursor(fields) and truncate(). ArcpyTable uses the da cursors,
+# MemoryTable keeps the records in a list so imports can be checked without
+# ArcGIS.
+
+import csv, itertools
+import date_parser
+
+# CSV values that mean no value
+NULL_VALUES = ('', 'NULL')
+
+# Rows inserted between progress messages
+BATCH_SIZE = 500
+
+def isNull(value):
+    return value is None or value.strip().upper() in NULL_VALUES
+
+def text(default=None):
+    """ Converter for text fields """
+    def convert(value):
+        if isNull(value):
+            return default
+        return value
+    return convert
+
+def integer(default=None):
+    """ Converter for integer fields, accepts 5 or 5.0 """
+    def convert(value):
+        if isNull(value):
+            return default
+        return int(float(value))
+    return convert
+
+def number(default=None):
+    """ Converter for double fields """
+    def convert(value):
+        if isNull(value):
+            return default
+        return float(value)
+    return convert
+
+def boolean(default=None):
+    """ Converter for 0 / 1 flag fields, accepts TRUE / FALSE, YES / NO or a number """
+    def convert(value):
+        if isNull(value):
+            return default
+        flag = value.strip().upper()
+        if flag in ('TRUE', 'YES', 'Y'):
+            return 1
+        if flag in ('FALSE', 'NO', 'N'):
+            return 0
+        return int(float(flag))
+    return convert
+
+def dateTime(timeFormat=None, default=None):
+    """ Converter for date fields in timeFormat (a strptime format) or in the
+    format the CSV export writes, so exported files import whatever format is
+    chosen. Without a format readCSV detects it from the first lines of the
+    file. Uses a DateParser, so share one converter between the date columns
+    of a table """
+    if timeFormat is None:
+        parser = date_parser.DateParser()
+    else:
+        parser = date_parser.DateParser(formats=[timeFormat, date_parser.EXPORT_FORMAT])
+    def convert(value):
+        if isNull(value):
+            return default
+        return parser(value.strip())
+    convert.parser = parser
+    return convert
+
+class TableSchema(object):
+    """ How a CSV file maps to a table.
+    key is (CSV column, field, converter), the field may be OID@.
+    columns is a list of (CSV column, field, converter).
+    derived is a list of (field, function), the function gets a dict of the
+    converted values by field and returns the value of the derived field.
+    operations lists the imports the table allows """
+    def __init__(self, table, key, columns, derived=None, operations=('UPDATE', 'APPEND', 'OVERWRITE ALL')):
+        self.table = table
+        self.keyColumn, self.keyField, self.keyConverter = key
+        self.columns = columns
+        self.derived = derived or []
+        self.operations = operations
+        self.fields = [field for column, field, converter in columns] + [field for field, function in self.derived]
+
+class ImportResult(object):
+    """ Counts for one import """
+    def __init__(self):
+        self.read = 0
+        self.matched = 0
+        self.changed = 0
+        self.inserted = 0
+        self.skipped = 0
+        self.errors = []
+
+    def error(self, lineNumber, err):
+        self.skipped += 1
+        self.errors.append((lineNumber, err))
+
+    def summary(self):
+        return '{0} lines read, {1} records matched, {2} changed, {3} added, {4} skipped'.format(
+            self.read, self.matched, self.changed, self.inserted, self.skipped)
+
+def detectFormats(plan, lines):
+    """ Set the format of each date converter in plan without one from the values
+    of its columns in lines """
+    samples = {}
+    for p, converter in plan:
+        parser = getattr(converter, 'parser', None)
+        if parser is not None and not parser.isFixed:
+            samples.setdefault(id(parser), (parser, []))[1].extend([line[p] for line in lines if p < len(line)])
+    for parser, values in samples.values():
+        parser.detect(values, len(values))
+
+def readCSV(csvFile, schema, result):
+    """ Yield (line number, key, values) for each CSV line, values in schema.fields
+    order. Lines that fail to convert are counted in result and left out.
+    Date formats are detected from the first SAMPLE_SIZE lines """
+    reader = csv.reader(csvFile, dialect='excel')
+    header = [column.strip().upper() for column in next(reader)]
+
+    def position(column):
+        try:
+            return header.index(column.upper())
+        except ValueError:
+            raise ValueError('The CSV file has no {0} column'.format(column))
+
+    keyPosition = position(schema.keyColumn)
+    plan = [(position(column), converter) for column, field, converter in schema.columns]
+    columnFields = [field for column, field, converter in schema.columns]
+
+    sample = list(itertools.islice(reader, date_parser.SAMPLE_SIZE))
+    detectFormats(plan, sample)
+
+    for lineNumber, line in enumerate(itertools.chain(sample, reader), 2):
+        if not line:
+            continue
+        result.read += 1
+        try:
+            key = schema.keyConverter(line[keyPosition])
+            values = [converter(line[p]) for p, converter in plan]
+            if schema.derived:
+                byField = dict(zip(columnFields, values))
+                values.extend([function(byField) for field, function in schema.derived])
+        except (ValueError, IndexError, TypeError) as err:
+            result.error(lineNumber, err)
+            continue
+        yield lineNumber, key, values
+
+def updateTable(table, schema, rows, result):
+    """ Apply the CSV values to the records with a matching key in a single
+    cursor pass. Empty CSV values leave the field as it is """
+    updates = {}
+    for lineNumber, key, values in rows:
+        if key is None:
+            result.error(lineNumber, ValueError('No {0} value'.format(schema.keyColumn)))
+            continue
+        updates[key] = values
+
+    matchedKeys = set()
+    with table.updateCursor([schema.keyField] + schema.fields) as cursor:
+        for row in cursor:
+            values = updates.get(row[0])
+            if values is None:
+                continue
+            matchedKeys.add(row[0])
+            result.matched += 1
+            isChanged = False
+            for i, value in enumerate(values):
+                if value is not None and row[i + 1] != value:
+                    row[i + 1] = value
+                    isChanged = True
+            if isChanged:
+                cursor.updateRow(row)
+                result.changed += 1
+
+    # CSV lines with no matching record
+    result.skipped += len(updates) - len(matchedKeys)
+
+def insertTable(table, schema, rows, result, log=None):
+    """ Add a record for every CSV line through one insert cursor """
+    if schema.keyField == 'OID@':
+        fields = schema.fields
+    else:
+        fields = [schema.keyField] + schema.fields
+
+    with table.insertCursor(fields) as cursor:
+        for lineNumber, key, values in rows:
+            if schema.keyField != 'OID@':
+                values = [key] + values
+            try:
+                cursor.insertRow(values)
+            except Exception as err:
+                result.error(lineNumber, err)
+                continue
+            result.inserted += 1
+            if log and result.inserted % BATCH_SIZE == 0:
+                log('{0} records added to {1}'.format(result.inserted, schema.table))
+
+def importCSV(csvFile, schema, operation, table, log=None):
+    """ Import an open CSV file into table. Returns an ImportResult """
+    if operation not in schema.operations:
+        raise ValueError('{0} is not available for {1}'.format(operation, schema.table))
+
+    result = ImportResult()
+    rows = readCSV(csvFile, schema, result)
+    if operation == 'UPDATE':
+        updateTable(table, schema, rows, result)
+    else:
+        if operation == 'OVERWRITE ALL':
+            if log:
+                log('Deleting all records from {0}'.format(schema.table))
+            table.truncate()
+        insertTable(table, schema, rows, result, log)
+
+    return result
+
+class ArcpyTable(object):
+    """ A table or layer in the current workspace or map """
+    def __init__(self, name):
+        self.name = name
+
+    def searchCursor(self, fields):
+        import arcpy
+        return arcpy.da.SearchCursor(self.name, fields)
+
+    def updateCursor(self, fields):
+        import arcpy
+        return arcpy.da.UpdateCursor(self.name, fields)
+
+    def insertCursor(self, fields):
+        import arcpy
+        return arcpy.da.InsertCursor(self.name, fields)
+
+    def truncate(self):
+        import MapSARfunctions as mapsar
+        mapsar.truncateTable(self.name)
+
+class _MemoryCursor(object):
+    def __init__(self, table, fields):
+        self.table = table
+        self.fields = fields
+        self._current = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        for record in self.table.records:
+            self._current = record
+            yield [record.get(field) for field in self.fields]
+
+    def updateRow(self, row):
+        self._current.update(zip(self.fields, row))
+
+    def insertRow(self, row):
+        if len(row) != len(self.fields):
+            raise ValueError('Expected {0} values'.format(len(self.fields)))
+        record = {'OID@': self.table.nextOID}
+        self.table.nextOID += 1
+        record.update(zip(self.fields, row))
+        self.table.records.append(record)
+
+class MemoryTable(object):
+    """ Stand in for a table, records are dicts of field values with OID@ as the
+    object id. Has the same interface as ArcpyTable """
+    def __init__(self, records=None):
+        self.records = []
+        self.nextOID = 1
+        for record in records or []:
+            self.insertCursor(list(record.keys())).insertRow(list(record.values()))
+
+    def searchCursor(self, fields):
+        return _MemoryCursor(self, fields)
+
+    def updateCursor(self, fields):
+        return _MemoryCursor(self, fields)
+
+    def insertCursor(self, fields):
+        return _MemoryCursor(self, fields)
+
+    def truncate(self):
+        self.records = []
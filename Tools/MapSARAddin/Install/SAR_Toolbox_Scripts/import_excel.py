@@ -27,87 +27,15 @@
 import arcpy
 from arcpy import env
 import datetime, xlrd, os
+import itertools
 
-import MapSARfunctions as mapsar
-arcpy.env.workspace
+import date_parser
 
-def updateAAvalues():
-    """ Manually updates values created with Attribute Assistant """
-    import arcpy
-    from arcpy import env
-    workspace = arcpy.env.workspace
+import MapSARfunctions as mapsar
 
-    # Team Members
-    fc = 'Team_Members'
-    fields = ['Total_Weight', 'Body_Weight','Gear_Weight']
-    arcpy.AddMessage('Updating {0} values'.format(fc))
-    try:
-        with arcpy.da.UpdateCursor(fc,fields ) as rows:
-            for row in rows:
-                row[0] = row[1] + row[2]
-                rows.updateRow(row)
-        del rows,row
-    except:
-        arcpy.AddWarning('Passing on {0} due to error'.format(fc))
-
-    # Teams
-    fc = 'Teams'
-    fields = ['Status', 'Team_Available','Team_Name']
-    arcpy.AddMessage('Updating {0} values'.format(fc))
-    try:
-        with arcpy.da.UpdateCursor(fc,fields ) as rows:
-            for row in rows:
-                if row[0] != 'Unavailable':
-                    row[1] = row[2]
-                else:
-                    row[1] = '<NULL>'
-                rows.updateRow(row)
-        del rows,row, fc, fields
-    except:
-        arcpy.AddWarning('Passing on {0} due to error'.format(fc))
-
-
-    # Periods
-    fc = 'Operation_Period'
-    fields = ['PeriodText', 'Period']
-    arcpy.AddMessage('Updating {0} values'.format(fc))
-    try:
-        with arcpy.da.UpdateCursor(fc,fields ) as rows:
-            for row in rows:
-                row[0] = row[1]
-                rows.updateRow(row)
-        del rows,row, fc, fields
-    except:
-        arcpy.AddWarning('Passing on {0} due to error'.format(fc))
-
-    # Clues
-    fc = 'Clues_Point'
-    fields = ['Clue_Number','Clue_NumText']
-    arcpy.AddMessage('Updating {0} values'.format(fc))
-    try:
-        with arcpy.da.UpdateCursor(fc,fields) as rows:
-            for row in rows:
-                if row[0] != None:
-                    row[1] = str(row[0])
-                    rows.updateRow(row)
-        del rows,row, fc, fields
-    except:
-        arcpy.AddWarning('Passing on {0} due to error'.format(fc))
-
-    # Assignments
-    fc = 'hidden_assignments'
-    fields = ['Assignment_Number','AssignNumText','Mileage','SHAPE_Length']
-    arcpy.AddMessage('Updating {0} values'.format(fc))
-    try:
-        with arcpy.da.UpdateCursor(fc,fields) as rows:
-            for row in rows:
-                if row[0] != None:
-                    row[1] = str(row[0])
-                row[2] = (row[3] * 0.00062137119) / 2
-                rows.updateRow(row)
-        del rows,row, fc, fields
-    except:
-        arcpy.AddWarning('Passing on {0} due to error'.format(fc))
+# Spreadsheet rows read and date converted at a time
+ROW_CHUNK = 4096
+arcpy.env.workspace
 
 def set_fc(targetTable):
     """ set correct FC based on user input """
@@ -119,7 +47,7 @@ def set_fc(targetTable):
     elif targetTable == 'Team Members':
         fc = 'Team_Members'
     elif targetTable == 'Operational Periods':
-        fc = "Operation_Periods"
+        fc = "Operation_Period"
     elif targetTable == 'Subject Information':
         fc = "PLS_Subject_Information"
 
@@ -141,7 +69,8 @@ def exceptionReport(importError,action):
 def open_spreadsheet(in_excel, sheet_name):
     """ Open the excel file, return worksheet and workbook. """
     try:
-        workbook = xlrd.open_workbook(in_excel)
+        # on_demand only loads the sheet that is used
+        workbook = xlrd.open_workbook(in_excel, on_demand=True)
         worksheet = workbook.sheet_by_index(0)
         return worksheet, workbook
 
@@ -163,23 +92,146 @@ def cell_value(cell, datemode):
     if cell.ctype == xlrd.XL_CELL_BOOLEAN:  return cell.value == 1
     return cell.value
 
+def date_converter(datemode):
+    """ Return a function converting an Excel date number to a date, or a datetime
+    when it has a time part. Same result as cell_value, with the epoch worked
+    out once instead of for every cell """
+    if datemode == 1:
+        epoch = datetime.datetime(1904, 1, 1)
+    else:
+        # Day 60 is the 29th of February 1900 that Excel thinks existed
+        epoch = datetime.datetime(1899, 12, 30)
+
+    def convert(value):
+        if datemode == 0 and value < 61:
+            # Rare early dates, leave them to xlrd
+            return cell_value(xlrd.sheet.Cell(xlrd.XL_CELL_DATE, value), datemode)
+        days = int(value)
+        seconds = int(round((value - days) * 86400.0))
+        if seconds == 86400:
+            days += 1
+            seconds = 0
+        result = epoch + datetime.timedelta(days, seconds)
+        if seconds == 0:
+            return result.date()
+        return result
+
+    return convert
+
+def read_header(worksheet):
+    """ Return the field names in the first row, read_rows yields values in this order """
+    return worksheet.row_values(0)
+
 def read_rows(workbook,worksheet):
-    """ workbook,worksheet,fieldList - Reads in spreafdsheet rows and returns data"""
-    valueList = []
-    fieldList = worksheet.row_values(0)
-    for row in range(2,worksheet.nrows):
-        # create dictionary of the row values
-        values = [ cell_value(c, workbook.datemode) for c in worksheet.row(row) ]
-        data = dict(zip(fieldList, values))
-        valueList.append(data)
-    return valueList
-
-def write_data(fc,data,action):
+    """ Yield a tuple of values for each spreadsheet row, in the same order as the
+    fields from read_header. Values are read from the sheet's type and value
+    arrays one row at a time, no Cell objects are created and the sheet is
+    never held as a list of rows. The date cells of each ROW_CHUNK rows are
+    converted in one call to date_parser.excelDates """
+    convert_date = date_converter(workbook.datemode)
+    for start in range(2, worksheet.nrows, ROW_CHUNK):
+        chunk = []
+        dateCells = []
+        serials = []
+        for row in range(start, min(start + ROW_CHUNK, worksheet.nrows)):
+            values = []
+            for col, (ctype, value) in enumerate(zip(worksheet.row_types(row), worksheet.row_values(row))):
+                if ctype == xlrd.XL_CELL_DATE:
+                    dateCells.append((values, col))
+                    serials.append(value)
+                elif ctype == xlrd.XL_CELL_EMPTY:
+                    value = None
+                elif ctype == xlrd.XL_CELL_BOOLEAN:
+                    value = value == 1
+                values.append(value)
+            chunk.append(values)
+        if serials:
+            for (values, col), date in zip(dateCells, date_parser.excelDates(serials, workbook.datemode, convert_date)):
+                values[col] = date
+        for values in chunk:
+            yield tuple(values)
+
+def field_value(value):
+    """ Value as stored by a cursor, spreadsheet dates become datetimes """
+    if isinstance(value, datetime.date) and not isinstance(value, datetime.datetime):
+        return datetime.datetime(value.year, value.month, value.day)
+    return value
+
+def match_fields(fc,fieldList):
+    """ Spreadsheet columns that are editable fields of fc. Returns the field
+    names and the matching column positions """
+    fc_fields = dict((f.name.upper(), f.name) for f in arcpy.ListFields(fc) if f.editable and f.type not in ('OID', 'Geometry'))
+    fields = []
+    columns = []
+    for i, name in enumerate(fieldList):
+        if name.upper() in fc_fields:
+            fields.append(fc_fields[name.upper()])
+            columns.append(i)
+        elif name != 'OBJECTID':
+            arcpy.AddWarning('Skipping column {0}, it is not a field of {1}'.format(name, fc))
+    return fields, columns
+
+def update_rows(fc,fieldList,rows,action,oids=None):
+    """ Update existing records of fc from the spreadsheet rows, matched on OBJECTID.
+    The rows are keyed by OBJECTID first, then fc is updated in a single cursor
+    pass. Empty spreadsheet cells leave the field as it is. Returns the number
+    of rows matched, changed and skipped, the OBJECTIDs changed are added to oids """
+    if 'OBJECTID' not in fieldList:
+        arcpy.AddWarning('No OBJECTID column in the spreadsheet, nothing to update')
+        return 0, 0, 0
+    keyIndex = fieldList.index('OBJECTID')
+
+    fields, columns = match_fields(fc,fieldList)
+
+    updates = {}
+    skipped = 0
+    for values in rows:
+        if values[keyIndex] in (None, ''):
+            skipped += 1
+            continue
+        updates[int(values[keyIndex])] = [field_value(values[i]) for i in columns]
+
+    matched = 0
+    changed = 0
+    with arcpy.da.UpdateCursor(fc, ['OID@'] + fields) as cursor:
+        for row in cursor:
+            newValues = updates.get(row[0])
+            if newValues is None:
+                continue
+            matched += 1
+            isChanged = False
+            for i, value in enumerate(newValues):
+                if value is not None and row[i + 1] != value:
+                    row[i + 1] = value
+                    isChanged = True
+            if isChanged:
+                try:
+                    cursor.updateRow(row)
+                    changed += 1
+                    if oids is not None:
+                        oids.append(row[0])
+                except Exception as err:
+                    errors = 'Error updating data to OBJECTID {0}: {1}'.format(row[0], err)
+                    arcpy.AddWarning(errors)
+                    exceptionReport(errors,action)
+
+    # Spreadsheet rows with no matching record
+    skipped += len(updates) - matched
+
+    return matched, changed, skipped
+
+def write_data(fc,fieldList,rows,action):
+    """ Write the rows from read_rows to fc. fieldList names the value in each
+    position. Returns the OBJECTIDs of the records added or changed """
     arcpy.AddMessage('FC is {0}'.format(fc))
-    # If the list has no rows, warn and exit
-    if len(data) == 0:
+    oids = []
+    # If the sheet has no rows, warn and exit
+    try:
+        first = next(rows)
+    except StopIteration:
         arcpy.AddIDMessage('WARNING', 117)
-        return
+        return oids
+    rows = itertools.chain([first], rows)
 
     # Read in FC field names
     fc_fields = [f.name for f in arcpy.ListFields(fc)]
@@ -189,60 +241,35 @@ def write_data(fc,data,action):
 
         if action == 'OVERWRITE ALL':
             # whack all records in fc
-            cursor = arcpy.UpdateCursor(fc)
-            for row in cursor:
-                cursor.deleteRow(row)
-            del cursor,row
-
-        rows = arcpy.InsertCursor(fc)
-        for row in range(len(data)):
-            try:
-                lineItem = data[row]
-                row = rows.newRow()
-                for l in lineItem.keys():
-                    print l,lineItem[l]
-                    arcpy.AddMessage('Field {0}, Value {1}'.format(l, lineItem[l]))
-                    if l != 'OBJECTID':
-                        print l,lineItem[l]
-                        row.setValue(l,lineItem[l])
-                rows.insertRow(row)
-            except:
-                errors = 'Error appending data to OBJECTID {0} for Field {1}, with value {2}'.format(int(lineItem['OBJECTID']),l, lineItem[l])
-                arcpy.AddWarning(errors)
-                exceptionReport(errors,action)
+            arcpy.AddMessage('Deleting all records from {0}'.format(fc))
+            mapsar.truncateTable(fc)
+
+        fields, columns = match_fields(fc,fieldList)
+        values = (tuple([field_value(row[i]) for i in columns]) for row in rows)
+        inserted, failed = mapsar.insertRows(fc, fields, values, oids=oids)
+        for rowNumber, err in failed:
+            errors = 'Error appending spreadsheet row {0}: {1}'.format(rowNumber + 2, err)
+            arcpy.AddWarning(errors)
+            exceptionReport(errors,action)
     # Update
     elif action == 'UPDATE':
         mxd = arcpy.mapping.MapDocument('CURRENT')
         df = arcpy.mapping.ListDataFrames(mxd, "MapSAR")[0]
         lyr = arcpy.mapping.ListLayers(mxd, fc, df)[0]
 
-        FieldID = arcpy.AddFieldDelimiters(fc,'OBJECTID')
-
-        for i in range(len(data)):
-            lineItem = data[i]
-            query = '{0} = {1}'.format(FieldID,int(lineItem['OBJECTID']))
-            arcpy.SelectLayerByAttribute_management (lyr, "NEW_SELECTION",query)
+        # A selection on the layer would limit the cursor to the selected records
+        arcpy.SelectLayerByAttribute_management(lyr, "CLEAR_SELECTION")
 
-            result = int(arcpy.GetCount_management(fc).getOutput(0))
-            if result == 1:
-                try:
-                    rows = arcpy.UpdateCursor(fc)
-                    for row in rows:
-                        for l in lineItem.keys():
-                            arcpy.AddMessage('Updating Field {0}'.format(lineItem))
-                            if l != 'OBJECTID':
-                                if not (lineItem[l] is None):
-                                    row.setValue(l,lineItem[l])
-                        rows.updateRow(row)
-                    del rows, row
-                except:
-                    errors = 'Error updating data to OBJECTID {0} for Field {1}, with value {2}'.format(int(lineItem['OBJECTID']),l, lineItem[l])
-                    arcpy.AddWarning(errors)
-                    exceptionReport(errors,action)
+        matched, changed, skipped = update_rows(fc,fieldList,rows,action,oids)
+        arcpy.AddMessage('{0} rows matched, {1} changed, {2} skipped'.format(matched, changed, skipped))
 
         del mxd,df,lyr
 
+    return oids
+
 def main():
+    # exceptionReport names the error file after these
+    global in_excel, targetTable
     in_excel = arcpy.GetParameterAsText(0)
     targetTable = arcpy.GetParameterAsText(1)
 
@@ -251,15 +278,16 @@ def main():
     sheet_num = 0
 
     worksheet, workbook = open_spreadsheet(in_excel, sheet_num)
-    data = read_rows(workbook,worksheet)
+    fieldList = read_header(worksheet)
+    rows = read_rows(workbook,worksheet)
 
     fc = set_fc(targetTable)
     arcpy.AddMessage('table is ' + fc)
-    write_data(fc,data,action)
-    del data, workbook, worksheet, fc
+    oids = write_data(fc,fieldList,rows,action)
+    del rows, workbook, worksheet
 
-    # Update any calculated fielf values and update domains
-    updateAAvalues()
+    # Update any calculated field values of the imported records and update domains
+    mapsar.updateAAvalues({mapsar.DERIVED_LAYERS.get(fc, fc): oids})
     arcpy.AddMessage('Updating Value Lists')
     mapsar.updateValueLists('script')
 
@@ -0,0 +1,272 @@
+#-------------------------------------------------------------------------------
+# Name:        xlsx_writer
+# Purpose:     Write a table to an Excel .xlsx workbook a row at a time, for
+#              tables too large for the .xls format
+#
+# Author:      SMSR
+# Copyright:   (c) SMSR 2013
+# Licence:
+#     MapSAR wilderness search and rescue GIS data model and related python scripting
+#     Copyright (C) 2012  - Jon Pedder & SMSR
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+#
+# An .xlsx file is a zip of XML parts. The rows of the sheet are written to a
+# temporary file as they come from the cursor, with the text of each cell in
+# the cell itself rather than in a shared string table, so nothing grows with
+# the number of rows. The file is added to the zip when the workbook is closed.
+#
+# Columns are described by (name, kind, width), kind is one of the keys of
+# CELL_STYLES, width is in characters.
+#
+# Run this file directly to write a million row test sheet.
+
+import datetime, math, os, re, tempfile, zipfile
+from xml.sax.saxutils import escape, quoteattr
+
+# Style index of each kind of cell, the order of cellXfs in _STYLES. Date
+# columns pick date, time or datetime per value
+CELL_STYLES = {'text': 0, 'number': 0, 'integer': 2, 'date': 3}
+HEADER_STYLE = 1
+TIME_STYLE = 4
+DATETIME_STYLE = 5
+
+# Excel day 0 for dates after February 1900
+EXCEL_EPOCH = datetime.datetime(1899, 12, 30)
+
+# Bytes of sheet XML held before they are written to the temporary file
+BUFFER_SIZE = 1 << 20
+
+_CONTENT_TYPES = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                  '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                  '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                  '<Default Extension="xml" ContentType="application/xml"/>'
+                  '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+                  '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                  '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+                  '</Types>')
+
+_ROOT_RELS = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+              '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+              '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+              '</Relationships>')
+
+_WORKBOOK = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+             '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+             'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+             '<sheets><sheet name={0} sheetId="1" r:id="rId1"/></sheets>'
+             '</workbook>')
+
+_WORKBOOK_RELS = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                  '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                  '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+                  '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+                  '</Relationships>')
+
+# Same look as the .xls export, bold centered header on a grey fill
+_STYLES = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+           '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+           '<numFmts count="3">'
+           '<numFmt numFmtId="164" formatCode="YYYY-MM-DD"/>'
+           '<numFmt numFmtId="165" formatCode="h:mm"/>'
+           '<numFmt numFmtId="166" formatCode="YYYY-MM-DD h:mm"/>'
+           '</numFmts>'
+           '<fonts count="2">'
+           '<font><sz val="10"/><name val="Arial"/></font>'
+           '<font><b/><sz val="10"/><name val="Arial"/></font>'
+           '</fonts>'
+           '<fills count="3">'
+           '<fill><patternFill patternType="none"/></fill>'
+           '<fill><patternFill patternType="gray125"/></fill>'
+           '<fill><patternFill patternType="solid"><fgColor indexed="22"/></patternFill></fill>'
+           '</fills>'
+           '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+           '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+           '<cellXfs count="6">'
+           '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+           '<xf numFmtId="0" fontId="1" fillId="2" borderId="0" xfId="0" applyFont="1" applyFill="1" applyAlignment="1">'
+           '<alignment horizontal="center"/></xf>'
+           '<xf numFmtId="1" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+           '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+           '<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+           '<xf numFmtId="166" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+           '</cellXfs>'
+           '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+           '</styleSheet>')
+
+_SHEET_START = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                '<sheetViews><sheetView workbookViewId="0">'
+                '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+                '</sheetView></sheetViews>')
+
+_SHEET_END = '</sheetData></worksheet>'
+
+# Characters XML 1.0 does not allow
+_INVALID_XML = re.compile(u'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+# Largest sheet of the .xlsx format
+MAX_ROWS = 1048576
+MAX_COLUMNS = 16384
+
+def columnLetters(index):
+    """ Column name of a 0 based column index, 0 is A, 26 is AA """
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+def textCell(ref, value):
+    if value is None or value == '':
+        return ''
+    if not isinstance(value, basestring):
+        value = unicode(value)
+    return u'<c r="{0}" t="inlineStr"><is><t xml:space="preserve">{1}</t></is></c>'.format(
+        ref, escape(_INVALID_XML.sub(u'', value)))
+
+def numberText(value):
+    """ Text of a number as the sheet XML takes it, None for nan and infinity """
+    if isinstance(value, float):
+        if math.isinf(value) or math.isnan(value):
+            return None
+        return repr(value)
+    if isinstance(value, bool):
+        return str(int(value))
+    return str(value)
+
+def numberCell(ref, value, style=0):
+    if value is None:
+        return ''
+    text = numberText(value)
+    if text is None:
+        return ''
+    if style:
+        return '<c r="{0}" s="{1}"><v>{2}</v></c>'.format(ref, style, text)
+    return '<c r="{0}"><v>{1}</v></c>'.format(ref, text)
+
+def dateCell(ref, value):
+    """ Midnight is a date, a time on 30 December 1899 is a time of day, anything
+    else a date and time, as in the .xls export """
+    if value is None:
+        return ''
+    if value.hour == 0 and value.minute == 0:
+        style = CELL_STYLES['date']
+    elif value.year == 1899 and value.month == 12 and value.day == 30:
+        style = TIME_STYLE
+    else:
+        style = DATETIME_STYLE
+    delta = value - EXCEL_EPOCH
+    return numberCell(ref, delta.days + delta.seconds / 86400.0, style)
+
+class XlsxWriter(object):
+    """ A workbook with one sheet. Write rows with writeRows, then close """
+    def __init__(self, output, sheetName, columns):
+        if len(columns) > MAX_COLUMNS:
+            raise ValueError('{0} columns, an .xlsx sheet holds {1}'.format(len(columns), MAX_COLUMNS))
+        self.output = output
+        self.sheetName = sheetName
+        self.columns = columns
+        self.rows = 0
+        letters = [columnLetters(i) for i in range(len(columns))]
+        self._plan = []
+        for letter, (name, kind, width) in zip(letters, columns):
+            if kind == 'date':
+                self._plan.append((letter, dateCell, None))
+            elif kind == 'text':
+                self._plan.append((letter, textCell, None))
+            else:
+                self._plan.append((letter, numberCell, CELL_STYLES[kind]))
+
+        handle, self._sheetFile = tempfile.mkstemp(suffix='.xml')
+        os.close(handle)
+        self._sheet = open(self._sheetFile, 'wb', BUFFER_SIZE)
+
+        widths = ''.join(['<col min="{0}" max="{0}" width="{1}" customWidth="1"/>'.format(i + 1, width)
+                          for i, (name, kind, width) in enumerate(columns)])
+        header = ''.join([u'<c r="{0}1" s="{1}" t="inlineStr"><is><t>{2}</t></is></c>'.format(letter, HEADER_STYLE, escape(name))
+                          for letter, (name, kind, width) in zip(letters, columns)])
+        self._write(u'{0}<cols>{1}</cols><sheetData><row r="1">{2}</row>'.format(_SHEET_START, widths, header))
+
+    def _write(self, text):
+        self._sheet.write(text.encode('utf-8'))
+
+    def writeRows(self, rows):
+        """ Add rows, sequences of values in column order. Returns the rows written """
+        written = 0
+        plan = list(enumerate(self._plan))
+        for values in rows:
+            if self.rows + 1 >= MAX_ROWS:
+                raise ValueError('An .xlsx sheet holds {0} rows'.format(MAX_ROWS - 1))
+            self.rows += 1
+            r = str(self.rows + 1)
+            cells = []
+            for i, (letter, cell, style) in plan:
+                if style is None:
+                    cells.append(cell(letter + r, values[i]))
+                else:
+                    cells.append(cell(letter + r, values[i], style))
+            self._write(u'<row r="{0}">{1}</row>'.format(r, u''.join(cells)))
+            written += 1
+        return written
+
+    def close(self):
+        """ Finish the sheet and write the workbook """
+        self._write(_SHEET_END)
+        self._sheet.close()
+        try:
+            book = zipfile.ZipFile(self.output, 'w', zipfile.ZIP_DEFLATED)
+            try:
+                book.writestr('[Content_Types].xml', _CONTENT_TYPES)
+                book.writestr('_rels/.rels', _ROOT_RELS)
+                book.writestr('xl/workbook.xml', _WORKBOOK.format(quoteattr(self.sheetName)).encode('utf-8'))
+                book.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+                book.writestr('xl/styles.xml', _STYLES)
+                book.write(self._sheetFile, 'xl/worksheets/sheet1.xml')
+            finally:
+                book.close()
+        finally:
+            os.remove(self._sheetFile)
+
+def benchmark(rows=1000000):
+    """ Write rows of a GPS track vertex table and report the time and peak memory """
+    import time
+
+    def vertices():
+        start = datetime.datetime(2013, 6, 1, 6, 0)
+        for i in xrange(rows):
+            yield (i + 1, u'Track {0}'.format(i // 5000), start + datetime.timedelta(seconds=5 * i),
+                   -119.5 + i * 1e-7, 37.25 + i * 1e-7, 1500.0 + i % 300)
+
+    columns = [('OBJECTID', 'integer', 16), ('Name', 'text', 20), ('DateTime', 'date', 16),
+               ('Longitude', 'number', 16), ('Latitude', 'number', 16), ('Elevation', 'number', 16)]
+    output = os.path.join(tempfile.gettempdir(), 'xlsx_writer_benchmark.xlsx')
+    begin = time.time()
+    writer = XlsxWriter(output, 'GPS_Tracks', columns)
+    writer.writeRows(vertices())
+    writer.close()
+    seconds = time.time() - begin
+    message = '{0:,} rows in {1:.1f} sec, {2:,} bytes'.format(rows, seconds, os.path.getsize(output))
+    try:
+        import resource
+        message += ', peak memory {0:,} KB'.format(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    except ImportError:
+        pass
+    os.remove(output)
+    print(message)
+
+if __name__ == '__main__':
+    benchmark()